@@ -0,0 +1,935 @@
+"""
+Vectorised batch simulation for Cyberpunk Hacker Duel.
+
+BatchSimulation advances many independent games of the same level in
+lockstep. Every entity is held in NumPy arrays with one element per game, and
+each of GameSimulation's rules - player movement and wall sliding, wall and
+firewall damage, the decoy, the scanner, the firewall's per-level behaviour,
+data shards, the security node and the extra pursuers of later levels - is
+applied to all games at once. It's
+meant for balancing runs that need thousands of games, so instead of an event
+queue every game keeps counters such as wall_hits, damage_taken and won_tick.
+
+Games start from real GameSimulation states, so mazes, shards and start
+positions come from the same generation code. Their tuning (firewall speed,
+scanner speed, decoy cooldown...) is read from those states into per-game
+arrays that can be changed before or during a run:
+
+    batch = BatchSimulation.new(1024, level=2, seed=1)
+    batch.scanner_speed[:] = np.linspace(3, 8, batch.count)
+    for _ in range(7200):
+        batch.step(inputs)  # INPUT_* bitmask per game (or one for all)
+    print(batch.won.mean(), batch.damage_taken.mean())
+
+With 1024 games a batch does over 100,000 game-ticks a second on one core up
+to level 4, and several hundred thousand up to level 3. From level 5 the
+extra scanners pathing around the walls to decoys, through each game's
+FlowField, bring it under that: about 95,000 on level 5 and 75,000 on level
+8. Smaller batches are slower per game-tick.
+
+All random draws come from one NumPy generator for the whole batch, so a game
+follows the same rules with the same probabilities as GameSimulation, but not
+the exact run GameSimulation would give for its seed. Shard rotation is only
+cosmetic and isn't simulated.
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from game_simulation import (
+    GameSimulation, LOGIC_DT, REFERENCE_FPS, VIEWPORT_WIDTH,
+    INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN, INPUT_DECOY, INPUT_DISABLE_WALLS
+)
+from game_state import DataShard, GameState, PursuerState
+from navigation import NAV_CELL_SIZE, FlowField
+from pursuers import (
+    overlap_times, segment_meets_circle, send_back, move_firewalls, move_scanners, firewall_hits,
+    scanner_hits, near, flow_waypoints
+)
+
+# Per-game arrays and the GameState part (None for GameState itself) and
+# field each one is read from
+FIELDS = {
+    'player_x': ('player', 'x'),
+    'player_y': ('player', 'y'),
+    'player_prev_x': ('player', 'prev_x'),
+    'player_prev_y': ('player', 'prev_y'),
+    'start_x': ('player', 'start_x'),
+    'start_y': ('player', 'start_y'),
+    'player_speed': ('player', 'speed'),
+    'dead': ('player', 'dead'),
+    'health': ('player', 'health'),
+    'max_health': ('player', 'max_health'),
+    'damage_cooldown': ('player', 'damage_cooldown'),
+    'damage_cooldown_duration': ('player', 'damage_cooldown_duration'),
+    'score': ('player', 'score'),
+    'node_x': ('node', 'x'),
+    'node_y': ('node', 'y'),
+    'node_radius': ('node', 'radius'),
+    'firewall_x': ('firewall', 'x'),
+    'firewall_y': ('firewall', 'y'),
+    'firewall_prev_x': ('firewall', 'prev_x'),
+    'firewall_prev_y': ('firewall', 'prev_y'),
+    'firewall_width': ('firewall', 'width'),
+    'firewall_height': ('firewall', 'height'),
+    'firewall_speed': ('firewall', 'speed'),
+    'firewall_vertical_speed': ('firewall', 'vertical_speed'),
+    'firewall_direction': ('firewall', 'vertical_direction'),
+    'decoy_active': ('decoy', 'active'),
+    'decoy_x': ('decoy', 'x'),
+    'decoy_y': ('decoy', 'y'),
+    'decoy_duration': ('decoy', 'duration'),
+    'decoy_max_duration': ('decoy', 'max_duration'),
+    'decoy_cooldown': ('decoy', 'cooldown'),
+    'decoy_max_cooldown': ('decoy', 'max_cooldown'),
+    'decoy_can_use': ('decoy', 'can_use'),
+    'decoy_count': ('decoy', 'count'),
+    'scanner_active': ('scanner', 'active'),
+    'scanner_x': ('scanner', 'x'),
+    'scanner_y': ('scanner', 'y'),
+    'scanner_prev_x': ('scanner', 'prev_x'),
+    'scanner_prev_y': ('scanner', 'prev_y'),
+    'scanner_radius': ('scanner', 'radius'),
+    'scanner_speed': ('scanner', 'speed'),
+    'walls_visible': ('walls', 'visible'),
+    'walls_timer_active': ('walls', 'timer_active'),
+    'walls_timer': ('walls', 'timer'),
+    'walls_hide_duration': ('walls', 'hide_duration'),
+    'shard_spawn_timer': ('shards', 'spawn_timer'),
+    'shard_spawn_interval': ('shards', 'spawn_interval'),
+    'won': (None, 'game_won'),
+}
+
+# Per-game counters of what happened since the batch started
+COUNTERS = ('wall_hits', 'firewall_hits', 'scanner_hits', 'damage_taken', 'player_resets', 'deaths',
+            'shards_collected', 'walls_disabled')
+
+# Every cell of this size lists the walls that a query rect with its top-left
+# corner in the cell could touch, so a collision test only looks at those
+CANDIDATE_CELL_SIZE = 80
+# The lists also cover walls a rect could reach by moving this far, so a short
+# sweep only needs the lists of one cell
+SWEEP_SLACK = 10
+
+# Positions tried per data shard spawn, like GameSimulation.spawn_data_shard()
+SHARD_SPAWN_ATTEMPTS = 50
+
+
+def new_states(count, level, rng, configure=None):
+    """
+    States of count fresh games started on level, each generated by a
+    GameSimulation seeded from the random.Random rng
+    """
+    states = []
+    for _ in range(count):
+        sim = GameSimulation(rng.randrange(2 ** 32))
+        if configure is not None:
+            configure(sim.state)
+        sim.reset_level(level)
+        states.append(sim.state)
+    return states
+
+
+class BatchSimulation:
+    """N games of one level advanced together by GameSimulation's rules"""
+
+    def __init__(self, states, seed=None):
+        """Continue the given GameStates, which must all be on the same level"""
+        first = states[0]
+        self.count = len(states)
+        self.level = first.current_level
+        self.world_width = first.world_width
+        self.world_height = first.world_height
+        self.player_size = first.player.size
+        self.shard_size = first.shards.size
+        self.max_shards = first.shards.max_count
+        self.states = list(states)  # Kept for state(), which reuses their walls
+        self.rng = np.random.default_rng(seed)
+        self.ticks = 0  # Ticks advanced since the batch started
+        self.games = np.arange(self.count)
+
+        for name, (part, field) in FIELDS.items():
+            owner = first if part is None else getattr(first, part)
+            dtype = bool if type(owner).__dataclass_fields__[field].type is bool else np.float64
+            setattr(self, name, np.zeros(self.count, dtype=dtype))
+        for name in COUNTERS:
+            setattr(self, name, np.zeros(self.count, dtype=np.int64))
+        self.won_tick = np.zeros(self.count, dtype=np.int64)  # Batch tick each game reached the node on, -1 if not yet
+
+        # Data shards: a fixed number of slots per game
+        self.shard_x = np.zeros((self.count, self.max_shards))
+        self.shard_y = np.zeros((self.count, self.max_shards))
+        self.shard_active = np.zeros((self.count, self.max_shards), dtype=bool)
+
+        # Scanner navigation: a FlowField per game, and the waypoint it gave
+        # for the scanner's and decoy's cells when last asked
+        self.flows = [None] * self.count
+        self.has_walls = np.zeros(self.count, dtype=bool)
+        self.flow_cell = np.zeros(self.count, dtype=np.int64)
+        self.flow_target = np.zeros(self.count, dtype=np.int64)
+        self.waypoint_x = np.zeros(self.count)
+        self.waypoint_y = np.zeros(self.count)
+        self.has_waypoint = np.zeros(self.count, dtype=bool)
+
+        # Extra pursuers: a row of each game's, which all have the same number
+        self.pursuer_firewalls = np.zeros((self.count, len(first.pursuers.firewalls)), first.pursuers.firewalls.dtype)
+        self.pursuer_scanners = np.zeros((self.count, len(first.pursuers.scanners)), first.pursuers.scanners.dtype)
+        # Their waypoints toward the decoy, sharing the scanner's FlowField,
+        # and the cells of each scanner and of the target when last asked (-2
+        # if not) along with which scanners were near enough to steer
+        shape = self.pursuer_scanners.shape
+        self.pursuer_flow_cells = np.full(shape, -2, dtype=np.int64)
+        self.pursuer_flow_target = np.full(self.count, -2, dtype=np.int64)
+        self.pursuer_near = np.zeros(shape, dtype=bool)
+        self.pursuer_waypoint_x = np.zeros(shape)
+        self.pursuer_waypoint_y = np.zeros(shape)
+        self.pursuer_steering = np.zeros(shape, dtype=bool)
+
+        # Walls: a fixed number of slots per game in flat arrays, after wall 0,
+        # a stand-in that overlaps nothing and fills unused slots
+        cell = CANDIDATE_CELL_SIZE
+        self.cells_x = -(-self.world_width // cell)
+        self.cells_y = -(-self.world_height // cell)
+        self.wall_capacity = 0
+        self.wall_candidates = np.zeros((self.count * self.cells_x * self.cells_y, 1), dtype=np.int32)
+
+        self.replace(self.games, states)
+
+    @classmethod
+    def new(cls, count, level=1, seed=None, configure=None):
+        """
+        count fresh games started on level, each generated by its own seeded
+        GameSimulation. configure(state) is called on every new state before
+        reset_level(), e.g. to change the wall count.
+        """
+        rng = random.Random(seed)
+        return cls(new_states(count, level, rng, configure), rng.randrange(2 ** 32))
+
+    def replace(self, games, states):
+        """
+        Swap the given games for new ones continuing from states, on the same
+        level as the batch. Their counters start again from zero.
+        """
+        games = np.asarray(games, dtype=np.int64)
+        for state in states:
+            if (state.current_level, state.world_width, state.world_height) != \
+                    (self.level, self.world_width, self.world_height):
+                raise ValueError("All games in a batch must be on the same level")
+            if (len(state.pursuers.firewalls), len(state.pursuers.scanners)) != \
+                    (self.pursuer_firewalls.shape[1], self.pursuer_scanners.shape[1]):
+                raise ValueError("All games in a batch must have the same number of pursuers")
+        for game, state in zip(games.tolist(), states):
+            self.states[game] = state
+
+        for name, (part, field) in FIELDS.items():
+            getattr(self, name)[games] = [getattr(state if part is None else getattr(state, part), field)
+                                          for state in states]
+        for name in COUNTERS:
+            getattr(self, name)[games] = 0
+        self.won_tick[games] = np.where(self.won[games], self.ticks, -1)
+
+        self.shard_active[games] = False
+        for game, state in zip(games.tolist(), states):
+            for slot, shard in enumerate(state.shards.active):
+                self.shard_x[game, slot] = shard.x
+                self.shard_y[game, slot] = shard.y
+                self.shard_active[game, slot] = True
+            self.pursuer_firewalls[game] = state.pursuers.firewalls
+            self.pursuer_scanners[game] = state.pursuers.scanners
+
+        for game in games.tolist():
+            self.flows[game] = None
+        self.has_walls[games] = [not state.walls.maze.empty for state in states]
+        self.flow_cell[games] = -2  # Not asked yet
+        self.pursuer_flow_target[games] = -2
+        self._index_walls(games)
+
+    def _index_walls(self, games):
+        """
+        Copy the walls of the given games into the flat arrays and index them
+        by candidate cell. Unlike GameSimulation, a batch generates each
+        game's whole maze once, when the game starts: players and shard spawns
+        range over the whole world, and one candidate table over it is what
+        lets every game be tested in one pass. The mazes still only keep the
+        chunks they have room for, and wall_rects() reads the walls back from
+        the arrays rather than generating them again.
+        """
+        wall_lists = [np.array([tuple(rect) for rect in self.states[game].walls.maze.all_walls()],
+                               dtype=np.float64).reshape(-1, 4) for game in games.tolist()]
+        capacity = max(map(len, wall_lists), default=0)
+        if capacity > self.wall_capacity:
+            # Make room for the largest maze and copy every game's walls again
+            if len(games) < self.count:
+                kept = [self.wall_rects(game) for game in range(self.count)]
+                for game, walls in zip(games.tolist(), wall_lists):
+                    kept[game] = walls
+                games, wall_lists = self.games, kept
+            self.wall_capacity = capacity
+            self.wall_left, self.wall_top, self.wall_right, self.wall_bottom = (
+                np.full(1 + self.count * capacity, -10.0 ** 6) for _ in range(4))
+        capacity = self.wall_capacity
+
+        # Each game's walls go in its own slots
+        counts = np.array([len(walls) for walls in wall_lists], dtype=np.int64)
+        wall_game = np.repeat(games, counts)
+        wall_ids = 1 + wall_game * capacity + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+        rects = np.concatenate(wall_lists) if wall_lists else np.zeros((0, 4))
+        slots = (1 + games[:, None] * capacity + np.arange(capacity)).ravel()
+        for array in (self.wall_left, self.wall_top, self.wall_right, self.wall_bottom):
+            array[slots] = -10.0 ** 6
+        self.wall_left[wall_ids] = rects[:, 0]
+        self.wall_top[wall_ids] = rects[:, 1]
+        self.wall_right[wall_ids] = rects[:, 0] + rects[:, 2]
+        self.wall_bottom[wall_ids] = rects[:, 1] + rects[:, 3]
+
+        # A query rect at left overlaps a wall when wall left - query size < left < wall right
+        # (or touches it at the low end, for sweeps that start against a wall)
+        query_size = max(self.player_size, self.shard_size * 2) + SWEEP_SLACK
+        cell = CANDIDATE_CELL_SIZE
+        cells_per_game = self.cells_x * self.cells_y
+        first_x = np.clip((rects[:, 0] - query_size) // cell, 0, self.cells_x - 1).astype(np.int64)
+        last_x = np.clip((rects[:, 0] + rects[:, 2] - 1) // cell, 0, self.cells_x - 1).astype(np.int64)
+        first_y = np.clip((rects[:, 1] - query_size) // cell, 0, self.cells_y - 1).astype(np.int64)
+        last_y = np.clip((rects[:, 1] + rects[:, 3] - 1) // cell, 0, self.cells_y - 1).astype(np.int64)
+        cell_ids, pair_walls = [], []
+        for offset_x in range(int((last_x - first_x).max(initial=0)) + 1):
+            for offset_y in range(int((last_y - first_y).max(initial=0)) + 1):
+                covered = (first_x + offset_x <= last_x) & (first_y + offset_y <= last_y)
+                cell_ids.append((wall_game * cells_per_game + (first_y + offset_y) * self.cells_x
+                                 + first_x + offset_x)[covered])
+                pair_walls.append(wall_ids[covered])
+        cell_ids = np.concatenate(cell_ids)
+        pair_walls = np.concatenate(pair_walls)
+
+        # Rank each wall within its cell to find its slot in the table
+        order = np.argsort(cell_ids, kind='stable')
+        cell_ids, pair_walls = cell_ids[order], pair_walls[order]
+        ranks = np.arange(len(cell_ids)) - np.searchsorted(cell_ids, cell_ids)
+        width = int(ranks.max(initial=0)) + 1
+        if width > self.wall_candidates.shape[1]:
+            grown = np.zeros((len(self.wall_candidates), width), dtype=np.int32)
+            grown[:, :self.wall_candidates.shape[1]] = self.wall_candidates
+            self.wall_candidates = grown
+        self.wall_candidates[(games[:, None] * cells_per_game + np.arange(cells_per_game)).ravel()] = 0
+        self.wall_candidates[cell_ids, ranks] = pair_walls
+
+    def wall_rects(self, game):
+        """A game's walls as rows of (left, top, width, height)"""
+        if not self.wall_capacity:
+            return np.zeros((0, 4))
+        slots = slice(1 + game * self.wall_capacity, 1 + (game + 1) * self.wall_capacity)
+        left, top = self.wall_left[slots], self.wall_top[slots]
+        used = left > -10.0 ** 6
+        return np.stack((left, top, self.wall_right[slots] - left, self.wall_bottom[slots] - top), -1)[used]
+
+    def _candidates(self, games, left, top):
+        """
+        Walls that rects no larger than the query size at the given top-left
+        corners could touch, as wall ids in a last axis. games broadcasts
+        against left and top.
+        """
+        cell = CANDIDATE_CELL_SIZE
+        cell_x = np.clip(left // cell, 0, self.cells_x - 1).astype(np.int64)
+        cell_y = np.clip(top // cell, 0, self.cells_y - 1).astype(np.int64)
+        return self.wall_candidates[games * (self.cells_x * self.cells_y) + cell_y * self.cells_x + cell_x]
+
+    def _hits_wall(self, games, left, top, size):
+        """
+        Whether size x size rects at the given top-left corners overlap a wall
+        of their game. games broadcasts against left and top.
+        """
+        candidates = self._candidates(games, left, top)
+        left = left[..., None]
+        top = top[..., None]
+        return ((self.wall_left[candidates] < left + size) & (left < self.wall_right[candidates]) &
+                (self.wall_top[candidates] < top + size) & (top < self.wall_bottom[candidates])).any(-1)
+
+    def _chance(self, probability, frames):
+        """chance() rolled for every game"""
+        return self.rng.random(self.count) < 1 - (1 - probability) ** frames
+
+    def step(self, inputs=0, dt=LOGIC_DT):
+        """Advance every game by one tick. inputs is an INPUT_* bitmask per game, or one for all."""
+        inputs = np.broadcast_to(np.asarray(inputs, dtype=np.int64), (self.count,))
+        self.ticks += 1
+        frames = dt * REFERENCE_FPS
+
+        # Positions at the start of the tick, for the firewall's swept collision
+        self.player_prev_x, self.player_prev_y = self.player_x, self.player_y
+        self.firewall_prev_x, self.firewall_prev_y = self.firewall_x, self.firewall_y
+        self.scanner_prev_x, self.scanner_prev_y = self.scanner_x, self.scanner_y
+        for records in (self.pursuer_firewalls, self.pursuer_scanners):
+            records['prev_x'], records['prev_y'] = records['x'], records['y']
+
+        playing = ~self.won
+        self._spawn_decoy(playing & (inputs & INPUT_DECOY != 0) & self.decoy_can_use)
+        self._disable_walls(playing & (inputs & INPUT_DISABLE_WALLS != 0) & (self.score >= 5))
+        self._move_player(inputs, frames, playing)
+
+        # Update damage cooldown timer
+        self.damage_cooldown = np.where(self.damage_cooldown > 0, self.damage_cooldown - dt, self.damage_cooldown)
+
+        # Only the first death of a level sends the player back, as in GameSimulation
+        died = (self.health <= 0) & ~self.dead
+        if died.any():
+            self.dead |= died
+            self._reset_player_position(died)
+            self.health = np.where(died, self.max_health, self.health)
+            self.deaths += died
+
+        self._update_decoy(dt)
+        self._update_scanner(frames)
+        self._update_pursuers(frames)
+        self._update_environment(dt)
+        self._update_data_shards(dt)
+        self._check_shard_collection()
+        self._update_firewall(frames)
+
+        # Check collision with security node
+        reached = ~self.won & self._node_collisions()
+        self.won |= reached
+        self.won_tick[reached] = self.ticks
+
+        # Check collision with the firewalls only if game isn't won
+        self._reset_player_position(~self.won & (self._firewall_collisions() | self._pursuer_collisions()))
+
+    def _move_player(self, inputs, frames, playing):
+        """Move players according to their held movement keys, sliding along walls"""
+        player_x, player_y = self.player_x, self.player_y
+        speed = self.player_speed * frames
+        size = self.player_size
+        half = size / 2
+
+        # Calculate potential new positions within the world (right wins over left, down over up)
+        new_x = np.where(inputs & INPUT_LEFT != 0, np.maximum(half, player_x - speed), player_x)
+        new_x = np.where(inputs & INPUT_RIGHT != 0, np.minimum(self.world_width - size, player_x + speed), new_x)
+        new_y = np.where(inputs & INPUT_UP != 0, np.maximum(half, player_y - speed), player_y)
+        new_y = np.where(inputs & INPUT_DOWN != 0, np.minimum(self.world_height - size, player_y + speed), new_y)
+
+        # One axis at a time, so a wall in the way of one still lets players
+        # slide along it on the other
+        self.player_x = self._sweep_players(new_x, playing & (new_x != player_x))
+        self.player_y = self._sweep_players(new_y, playing & (new_y != player_y), vertical=True)
+
+    def _sweep_players(self, new, moving, vertical=False):
+        """
+        sweep_player() for the games in moving: where players moving in a
+        straight line along one axis (y if vertical, otherwise x) to new stop
+        on it, and wall damage for the ones that ran into a wall. The other
+        games' players stay put.
+        """
+        position = self.player_y if vertical else self.player_x
+        moved = np.where(moving, new, position)
+        checked = moving & self.walls_visible & self.has_walls
+        if not checked.any():
+            return moved
+        size = self.player_size
+        half = size / 2
+        start, new_start = position - half, new - half  # Box edges along the way
+        across = (self.player_x if vertical else self.player_y) - half
+
+        # Walls from the candidate cells of the area swept through. Short
+        # moves stay within the slack of the cell they start in, and longer
+        # ones look up points along the way at most a cell apart.
+        distance = np.abs(new_start - start)
+        reach = distance[checked].max()
+        points = np.linspace(0, 1, int(np.ceil(reach / CANDIDATE_CELL_SIZE)) + 1) if reach > SWEEP_SLACK else 0
+        along = np.minimum(start, new_start)[:, None] + distance[:, None] * points
+        corners = (across[:, None], along) if vertical else (along, across[:, None])
+        candidates = self._candidates(self.games[:, None], *corners).reshape(self.count, -1)
+        wall_low, wall_high, side_low, side_high = (
+            (self.wall_top, self.wall_bottom, self.wall_left, self.wall_right) if vertical else
+            (self.wall_left, self.wall_right, self.wall_top, self.wall_bottom))
+        wall_low, wall_high = wall_low[candidates], wall_high[candidates]
+
+        # Walls in the way are beside the path and ahead of the box, not ones
+        # it's already in, as in Maze.sweep(). Box positions touching them
+        # are negated going backward, so the nearest is the minimum both ways.
+        forward = new_start > start
+        ahead = np.where(forward[:, None], wall_low >= (start + size)[:, None], wall_high <= start[:, None])
+        in_way = ahead & (side_low[candidates] < (across + size)[:, None]) & (across[:, None] < side_high[candidates])
+        nearest = np.where(in_way, np.where(forward[:, None], wall_low - size, -wall_high), np.inf).min(-1)
+        stop = np.where(forward, np.minimum(new_start, nearest), np.maximum(new_start, -nearest))
+        hit = checked & (stop != new_start)
+
+        # Deal 1 damage when colliding with walls if damage cooldown expired
+        damaged = hit & (self.damage_cooldown <= 0)
+        if damaged.any():
+            self.health -= damaged
+            self.damage_cooldown = np.where(damaged, self.damage_cooldown_duration / 2, self.damage_cooldown)
+            self.wall_hits += damaged
+            self.damage_taken += damaged
+        return np.where(hit, stop + half, moved)
+
+    def _reset_player_position(self, games):
+        self.player_x = np.where(games, self.start_x, self.player_x)
+        self.player_y = np.where(games, self.start_y, self.player_y)
+        self.player_prev_x = np.where(games, self.player_x, self.player_prev_x)
+        self.player_prev_y = np.where(games, self.player_y, self.player_prev_y)
+        self.player_resets += games
+
+    def _spawn_decoy(self, games):
+        if not games.any():
+            return
+        self.decoy_active |= games
+        self.decoy_x = np.where(games, self.player_x, self.decoy_x)
+        self.decoy_y = np.where(games, self.player_y, self.decoy_y)
+        self.decoy_duration = np.where(games, self.decoy_max_duration, self.decoy_duration)
+        self.decoy_can_use &= ~games
+        self.decoy_cooldown = np.where(games, self.decoy_max_cooldown, self.decoy_cooldown)
+        self.decoy_count += games
+
+        # A second decoy onwards brings a scanner after it
+        if self.level > 1:
+            self._spawn_scanner(games & (self.decoy_count >= 2))
+
+    def _spawn_scanner(self, games):
+        """
+        Spawn scanners from the firewall. Unlike GameSimulation.spawn_scanner()
+        this keeps each game's scanner_speed, so it can be tuned per game.
+        """
+        if self.level == 1 or not games.any():
+            return
+        self.scanner_active |= games
+        self.scanner_x = np.where(games, self.firewall_x + self.firewall_width // 2, self.scanner_x)
+        spawn_y = self.rng.integers(50, self.world_height - 50, size=self.count, endpoint=True)
+        self.scanner_y = np.where(games, spawn_y, self.scanner_y)
+        self.scanner_prev_x = np.where(games, self.scanner_x, self.scanner_prev_x)
+        self.scanner_prev_y = np.where(games, self.scanner_y, self.scanner_prev_y)
+
+    def _disable_walls(self, games):
+        games = games & self.walls_visible
+        if games.any():
+            self.walls_visible &= ~games
+            self.walls_timer_active |= games
+            self.walls_timer = np.where(games, 0, self.walls_timer)
+            self.score -= games * 5
+            self.walls_disabled += games
+
+    def _update_decoy(self, dt):
+        self.decoy_duration = np.where(self.decoy_active, self.decoy_duration - dt, self.decoy_duration)
+        self.decoy_active &= self.decoy_duration > 0
+        self.decoy_cooldown = np.where(self.decoy_can_use, self.decoy_cooldown, self.decoy_cooldown - dt)
+        self.decoy_can_use |= self.decoy_cooldown <= 0
+
+    def _update_scanner(self, frames):
+        # Scanners stop when their decoy disappears
+        self.scanner_active &= self.decoy_active
+
+        # Long ticks are split into about one move per reference frame, as in
+        # GameSimulation.update_scanner()
+        moves = max(1, round(frames))
+        for _ in range(moves):
+            if not self.scanner_active.any():
+                return
+            self._move_scanners(frames / moves)
+
+    def _move_scanners(self, frames):
+        """Move the active scanners toward their decoys, and catch the decoys they reach on the way"""
+        tracking = self.scanner_active
+        rng = self.rng
+        count = self.count
+        scanner_x, scanner_y = self.scanner_x, self.scanner_y
+
+        # Direction to the decoy's centre
+        half_player = self.player_size // 2
+        decoy_center_x = self.decoy_x + half_player
+        decoy_center_y = self.decoy_y + half_player
+        dx = decoy_center_x - scanner_x
+        dy = decoy_center_y - scanner_y
+        distance = np.maximum(0.1, np.sqrt(dx * dx + dy * dy))
+
+        # Path around visible walls toward the decoy, or straight for it
+        steering = self._scanner_waypoints(tracking & self.walls_visible & self.has_walls,
+                                           decoy_center_x, decoy_center_y)
+        to_x = self.waypoint_x - scanner_x
+        to_y = self.waypoint_y - scanner_y
+        waypoint_distance = np.maximum(0.1, np.sqrt(to_x * to_x + to_y * to_y))
+        dx = np.where(steering, to_x / waypoint_distance, dx / distance)
+        dy = np.where(steering, to_y / waypoint_distance, dy / distance)
+        scanner_speed = self.scanner_speed * frames
+
+        if self.level == 2:
+            # Level 2: simple, somewhat inaccurate tracking at constant speed
+            dx = dx + rng.uniform(-0.2, 0.2, count)
+            dy = dy + rng.uniform(-0.2, 0.2, count)
+            new_dist = np.maximum(0.1, np.sqrt(dx * dx + dy * dy))
+            dx = dx / new_dist
+            dy = dy / new_dist
+            step_x = dx * scanner_speed
+            step_y = dy * scanner_speed
+        else:
+            # Level 3+: speed varies with distance, and half the time the
+            # scanner aims slightly ahead of the decoy
+            speed_factor = np.clip(distance / 200, 0.8, 1.5)
+            pred_dx = decoy_center_x + rng.integers(-10, 30, size=count, endpoint=True) - scanner_x
+            pred_dy = decoy_center_y + rng.integers(-20, 20, size=count, endpoint=True) - scanner_y
+            pred_dist = np.maximum(0.1, np.sqrt(pred_dx * pred_dx + pred_dy * pred_dy))
+            blend_x = (dx + (pred_dx / pred_dist)) / 2
+            blend_y = (dy + (pred_dy / pred_dist)) / 2
+            final_dist = np.maximum(0.1, np.sqrt(blend_x * blend_x + blend_y * blend_y))
+            predict = (rng.random(count) > 0.5) & ~steering
+            dx = np.where(predict, blend_x / final_dist, dx)
+            dy = np.where(predict, blend_y / final_dist, dy)
+            step_x = dx * scanner_speed * speed_factor
+            step_y = dy * scanner_speed * speed_factor
+
+        scanner_x = np.where(tracking, scanner_x + step_x, scanner_x)
+        scanner_y = np.where(tracking, scanner_y + step_y, scanner_y)
+        if self.level > 2:
+            # Occasional sharp movements
+            sharp = tracking & self._chance(0.05, frames)
+            scanner_x = np.where(sharp, scanner_x + dx * self.scanner_speed * 1.5, scanner_x)
+            scanner_y = np.where(sharp, scanner_y + dy * self.scanner_speed * 1.5, scanner_y)
+        from_x, from_y = self.scanner_x, self.scanner_y
+        self.scanner_x, self.scanner_y = scanner_x, scanner_y
+
+        # Scanners that reach their decoy anywhere along the way destroy it and themselves
+        caught = tracking & segment_meets_circle(from_x, from_y, scanner_x, scanner_y, decoy_center_x,
+                                                 decoy_center_y, self.scanner_radius + half_player)
+        self.decoy_active &= ~caught
+        self.scanner_active &= ~caught
+
+    def _scanner_waypoints(self, games, target_x, target_y):
+        """
+        Update the waypoints of the given games' scanners on their way to the
+        targets, asking their FlowFields only where the scanner or target has
+        moved to another cell. Returns the games that have a waypoint.
+        """
+        if not games.any():
+            return games
+        cell = self._nav_cells(self.scanner_x, self.scanner_y)
+        target = self._nav_cells(target_x, target_y)
+        stale = games & ((cell != self.flow_cell) | (target != self.flow_target))
+        for game in np.flatnonzero(stale).tolist():
+            nav = self.states[game].walls.maze.nav_grid(float(target_x[game]), float(target_y[game]))
+            flow = self.flows[game]
+            if flow is None or flow.nav is not nav:
+                flow = self.flows[game] = FlowField(nav)
+            flow.set_target(float(target_x[game]), float(target_y[game]))
+            waypoint = flow.waypoint(float(self.scanner_x[game]), float(self.scanner_y[game]))
+            self.has_waypoint[game] = waypoint is not None
+            if waypoint is not None:
+                self.waypoint_x[game], self.waypoint_y[game] = waypoint
+        self.flow_cell = np.where(stale, cell, self.flow_cell)
+        self.flow_target = np.where(stale, target, self.flow_target)
+        return games & self.has_waypoint
+
+    def _nav_cells(self, x, y):
+        """
+        Cells of a NavGrid over the whole world for every point, -1 outside
+        it. The grids Maze.nav_grid() gives line up with these.
+        """
+        size = NAV_CELL_SIZE
+        columns = -(-self.world_width // size)
+        rows = -(-self.world_height // size)
+        inside = (0 <= x) & (x < columns * size) & (0 <= y) & (y < rows * size)
+        return np.where(inside, (y // size + 1) * (columns + 2) + x // size + 1, -1).astype(np.int64)
+
+    def _update_pursuers(self, frames):
+        """GameSimulation.update_pursuers() for every game, all pursuers of each kind at once"""
+        rng = self.rng
+        firewalls, scanners = self.pursuer_firewalls, self.pursuer_scanners
+        column = (slice(None), None)
+        decoy = self.decoy_active[column]
+        if firewalls.size:
+            move_firewalls(firewalls, frames, rng, self.world_width, self.world_height,
+                           self.player_x[column], self.player_y[column], decoy,
+                           self.decoy_x[column], self.decoy_y[column])
+        if not scanners.size:
+            return
+
+        # Split into about one move per reference frame, as in GameSimulation
+        half_player = self.player_size // 2
+        moves = max(1, round(frames))
+        for _ in range(moves):
+            from_x, from_y = scanners['x'].copy(), scanners['y'].copy()
+            player_x, player_y = (self.player_x + half_player)[column], (self.player_y + half_player)[column]
+            decoy_x, decoy_y = (self.decoy_x + half_player)[column], (self.decoy_y + half_player)[column]
+            decoy = self.decoy_active[column]
+
+            # After the decoy around the walls where one is out, otherwise straight at the player
+            waypoint_x, waypoint_y, steering = self._pursuer_waypoints(decoy_x[:, 0], decoy_y[:, 0])
+            move_scanners(scanners, frames / moves, rng, np.where(decoy, decoy_x, player_x),
+                          np.where(decoy, decoy_y, player_y), waypoint_x, waypoint_y, steering)
+            caught = decoy & scanner_hits(scanners, from_x, from_y, decoy_x, decoy_y, half_player)
+            lost = caught.any(1)
+            self.decoy_active &= ~lost
+            self.scanner_active &= ~lost
+
+            # Scanners deal 5 damage when the damage cooldown has expired
+            hit = ~self.won[column] & scanner_hits(scanners, from_x, from_y, player_x, player_y, half_player)
+            damaged = hit.any(1) & (self.damage_cooldown <= 0)
+            if damaged.any():
+                self.health -= damaged * 5
+                self.damage_cooldown = np.where(damaged, self.damage_cooldown_duration, self.damage_cooldown)
+                self.scanner_hits += damaged
+                self.damage_taken += damaged * 5
+            sent = caught | hit
+            if sent.any():
+                send_back(scanners, sent, rng, self.world_width, self.world_height)
+
+    def _pursuer_waypoints(self, target_x, target_y):
+        """
+        Waypoints toward the decoys for the extra scanners of the games with
+        one out among visible walls, from the FlowFields their scanners use.
+        A game's FlowField is only asked again once one of its scanners or
+        its target has moved to another cell, or a scanner has come within
+        or gone out of steering range, since until then it'd give the same.
+        """
+        scanners = self.pursuer_scanners
+        scanner_x, scanner_y = scanners['x'], scanners['y']
+        close = near(scanner_x, scanner_y, target_x[:, None], target_y[:, None])
+        steer = self.decoy_active & self.walls_visible & self.has_walls & close.any(1)
+        cell = self._nav_cells(scanner_x, scanner_y)
+        target = self._nav_cells(target_x, target_y)
+        stale = steer & ((target != self.pursuer_flow_target) | (cell != self.pursuer_flow_cells).any(1) |
+                         (close != self.pursuer_near).any(1))
+        for game in np.flatnonzero(stale).tolist():
+            x, y = float(target_x[game]), float(target_y[game])
+            nav = self.states[game].walls.maze.nav_grid(x, y)
+            flow = self.flows[game]
+            if flow is None or flow.nav is not nav:
+                flow = self.flows[game] = FlowField(nav)
+            flow.set_target(x, y)
+            self.pursuer_waypoint_x[game], self.pursuer_waypoint_y[game], self.pursuer_steering[game] = \
+                flow_waypoints(flow, scanner_x[game], scanner_y[game], x, y)
+        self.pursuer_flow_cells[stale] = cell[stale]
+        self.pursuer_near[stale] = close[stale]
+        # Games that stop steering ask again when they start
+        self.pursuer_flow_target = np.where(steer, target, -2)
+        steer = steer[:, None]
+        return (np.where(steer, self.pursuer_waypoint_x, 0.0), np.where(steer, self.pursuer_waypoint_y, 0.0),
+                steer & self.pursuer_steering)
+
+    def _update_environment(self, dt):
+        timing = self.walls_timer_active
+        self.walls_timer = np.where(timing, self.walls_timer + dt, self.walls_timer)
+        done = timing & (self.walls_timer >= self.walls_hide_duration)
+        self.walls_visible |= done
+        self.walls_timer_active &= ~done
+
+    def _update_data_shards(self, dt):
+        self.shard_spawn_timer += dt
+        due = ((self.shard_spawn_timer >= self.shard_spawn_interval) &
+               (self.shard_active.sum(1) < self.max_shards))
+        if due.any():
+            self._spawn_data_shards(np.flatnonzero(due))
+            self.shard_spawn_timer[due] = 0
+
+    def _spawn_data_shards(self, games):
+        """Try SHARD_SPAWN_ATTEMPTS random positions for one new shard in each of the games"""
+        rng = self.rng
+        shape = (len(games), SHARD_SPAWN_ATTEMPTS)
+        x = rng.integers(50, self.world_width - 50, size=shape, endpoint=True).astype(np.float64)
+        y = rng.integers(50, self.world_height - 50, size=shape, endpoint=True).astype(np.float64)
+
+        # Not too close to the player, the node or other shards, nor in a wall
+        column = (slice(None), None)
+        valid = (np.sqrt((x - self.player_x[games][column]) ** 2 + (y - self.player_y[games][column]) ** 2) >= 100)
+        valid &= np.sqrt((x - self.node_x[games][column]) ** 2 + (y - self.node_y[games][column]) ** 2) >= 100
+        for slot in range(self.max_shards):
+            near = np.sqrt((x - self.shard_x[games, slot][column]) ** 2 +
+                           (y - self.shard_y[games, slot][column]) ** 2) < 80
+            valid &= ~(near & self.shard_active[games, slot][column])
+        size = self.shard_size
+        valid &= ~self._hits_wall(games[column], x - size, y - size, size * 2)
+
+        # The first valid position of each game goes into its first free slot
+        placed = valid.any(1)
+        games = games[placed]
+        attempt = valid[placed].argmax(1)
+        slot = self.shard_active[games].argmin(1)
+        self.shard_x[games, slot] = x[placed, attempt]
+        self.shard_y[games, slot] = y[placed, attempt]
+        self.shard_active[games, slot] = True
+
+    def _check_shard_collection(self):
+        half_player = self.player_size // 2
+        center_x = (self.player_x + half_player)[:, None]
+        center_y = (self.player_y + half_player)[:, None]
+        reach = half_player + self.shard_size
+        collected = self.shard_active & (
+            np.sqrt((center_x - self.shard_x) ** 2 + (center_y - self.shard_y) ** 2) < reach)
+        counts = collected.sum(1)
+        self.shard_active &= ~collected
+        self.score += counts
+        self.shards_collected += counts
+
+    def _bounce(self, y, direction):
+        """Firewall vertical directions after reaching the top or bottom of the world at y"""
+        return np.where(y <= 0, 1, np.where(y + self.firewall_height >= self.world_height, -1, direction))
+
+    def _update_firewall(self, frames):
+        """Move firewalls based on the level and decoy presence"""
+        rng = self.rng
+        count = self.count
+        level = self.level
+        firewall_x, firewall_y = self.firewall_x, self.firewall_y
+        firewall_height = self.firewall_height
+        direction = self.firewall_direction
+        firewall_speed = self.firewall_speed * frames
+        vertical_speed = self.firewall_vertical_speed * frames
+
+        # Chasing a decoy: faster the further away it is, and stronger at higher levels
+        decoy = self.decoy_active
+        dx = self.decoy_x - firewall_x
+        dy = self.decoy_y - (firewall_y + firewall_height / 2)
+        distance = np.sqrt(dx * dx + dy * dy)
+        speed_factor = np.clip(distance / 300, 1.0, 2.0)
+        chase_x = firewall_x + np.sign(dx) * (firewall_speed * speed_factor * (1.0 + level * 0.2))
+        vert_step = vertical_speed * np.clip(np.abs(dy) / 200, 0.5, 1.5) * (0.5 + level * 0.25)
+        chase_y = np.where(np.abs(dy) > 10, np.where(dy > 0, firewall_y + vert_step, firewall_y - vert_step),
+                           firewall_y)
+        chase_y = np.where(self._chance(0.2, frames), chase_y + rng.uniform(-1.0, 1.0, count), chase_y)
+
+        # Normal movement depends on the level
+        if level == 1:
+            # Simple rightward movement with basic vertical bouncing
+            new_x = firewall_x + firewall_speed
+            new_y = firewall_y + vertical_speed * direction
+            new_direction = self._bounce(new_y, direction)
+        elif level == 2:
+            # Occasional speed variations, faster vertical movement and direction changes
+            variation = np.where(rng.random(count) > 0.95, rng.uniform(0.8, 1.2, count), 1.0)
+            new_x = firewall_x + firewall_speed * variation
+            new_y = firewall_y + (vertical_speed * 1.5) * direction
+            new_direction = np.where(self._chance(0.02, frames), -direction, direction)
+            new_direction = self._bounce(new_y, new_direction)
+        else:
+            # Level 3+: tracks the player some of the time
+            factor = np.where(self.player_x > firewall_x + VIEWPORT_WIDTH / 2, 1.3, 0.9)
+            new_x = firewall_x + firewall_speed * np.where(rng.random(count) > 0.7, factor, 1.0)
+            center_y = firewall_y + firewall_height / 2
+            toward = np.where(self.player_y > center_y, firewall_y + vertical_speed * 2,
+                              np.where(self.player_y < center_y, firewall_y - vertical_speed * 2, firewall_y))
+            onward = firewall_y + vertical_speed * 2 * direction
+            track = rng.random(count) > 0.5
+            new_y = np.where(track, toward, onward)
+            new_direction = np.where(track, direction, self._bounce(onward, direction))
+
+        # Firewalls leaving the world come back on the left at a random height
+        wrap = ~decoy & (new_x > self.world_width)
+        if wrap.any():
+            new_x = np.where(wrap, -self.firewall_width, new_x)
+            heights = (self.world_height - firewall_height).astype(np.int64)
+            new_y = np.where(wrap, rng.integers(0, heights, endpoint=True), new_y)
+            # No sweeping across the jump
+            self.firewall_prev_x = np.where(wrap, new_x, self.firewall_prev_x)
+            self.firewall_prev_y = np.where(wrap, new_y, self.firewall_prev_y)
+
+        self.firewall_x = np.where(decoy, chase_x, new_x)
+        self.firewall_y = np.where(decoy, chase_y, new_y)
+        self.firewall_direction = np.where(decoy, direction, new_direction)
+
+    def _node_collisions(self):
+        """check_node_collision() for every game"""
+        size = self.player_size
+        player_left = np.trunc(self.player_x)
+        player_top = np.trunc(self.player_y)
+        square_size = self.node_radius * 2
+        node_left = self.node_x - square_size // 2
+        node_top = self.node_y - square_size // 2
+        return ((player_left < node_left + square_size) & (node_left < player_left + size) &
+                (player_top < node_top + square_size) & (node_top < player_top + size))
+
+    def _firewall_collisions(self):
+        """check_firewall_collision() for every game, dealing firewall damage"""
+        player_x, player_y = self.player_prev_x, self.player_prev_y
+        firewall_x, firewall_y = self.firewall_prev_x, self.firewall_prev_y
+
+        # The players' movement as seen from the firewalls
+        dx = (self.player_x - player_x) - (self.firewall_x - firewall_x)
+        dy = (self.player_y - player_y) - (self.firewall_y - firewall_y)
+        first_x, last_x = overlap_times(player_x, self.player_size, firewall_x, self.firewall_width, dx)
+        first_y, last_y = overlap_times(player_y, self.player_size, firewall_y, self.firewall_height, dy)
+        collision = (np.maximum(first_x, first_y) < np.minimum(last_x, last_y)) & ~self.won
+        self._firewall_damage(collision)
+        return collision
+
+    def _pursuer_collisions(self):
+        """check_pursuer_collision() for every game, dealing firewall damage"""
+        firewalls = self.pursuer_firewalls
+        if not firewalls.size:
+            return False
+        column = (slice(None), None)
+        collision = firewall_hits(firewalls, self.player_prev_x[column], self.player_prev_y[column],
+                                  self.player_x[column], self.player_y[column], self.player_size).any(1)
+        collision &= ~self.won
+        self._firewall_damage(collision)
+        return collision
+
+    def _firewall_damage(self, collision):
+        """Firewalls deal 5 damage to the colliding players whose damage cooldown has expired"""
+        damaged = collision & (self.damage_cooldown <= 0)
+        if damaged.any():
+            self.health -= damaged * 5
+            self.damage_cooldown = np.where(damaged, self.damage_cooldown_duration, self.damage_cooldown)
+            self.firewall_hits += damaged
+            self.damage_taken += damaged * 5
+
+    def state(self, index):
+        """
+        The GameState of one game, e.g. to draw it or continue it in a
+        GameSimulation. The batch draws every game's pursuer moves from its one
+        generator, so a game with extra pursuers gets a generator of its own,
+        seeded from the batch's seed, the game and the tick - the same state
+        whenever it's asked for, without drawing from the batch's stream.
+        """
+        state = self.states[index].copy()
+        for name, (part, field) in FIELDS.items():
+            owner = state if part is None else getattr(state, part)
+            field_type = type(owner).__dataclass_fields__[field].type
+            setattr(owner, field, field_type(getattr(self, name)[index]))
+        # Shards spawn at whole-pixel positions, which DataShard packs as integers
+        state.shards.active = [DataShard(int(x), int(y), 0.0, 0.0) for x, y, active in zip(
+            self.shard_x[index].tolist(), self.shard_y[index].tolist(), self.shard_active[index]) if active]
+        firewalls, scanners = self.pursuer_firewalls[index].copy(), self.pursuer_scanners[index].copy()
+        rng = None
+        if len(firewalls) or len(scanners):
+            seed = np.random.SeedSequence(self.rng.bit_generator.seed_seq.entropy, spawn_key=(index, self.ticks))
+            rng = np.random.default_rng(seed)
+        state.pursuers = PursuerState(firewalls, scanners, rng)
+        state.ticks += self.ticks
+        return state
+
+
+def run_batch(games=1024, ticks=7200, level=1, seed=None):
+    """
+    Run a batch driven by random inputs, like run_headless() but all games at
+    once. Returns the number of game-ticks simulated per second. Afterwards,
+    outside the timing, every game's state() has to come back the same from
+    to_bytes() and carry on for a tick in a GameSimulation.
+    """
+    batch = BatchSimulation.new(games, level, seed)
+    rng = np.random.default_rng(seed)
+
+    movement = np.array((INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN,
+                         INPUT_RIGHT | INPUT_UP, INPUT_RIGHT | INPUT_DOWN))
+    inputs = np.full(games, INPUT_RIGHT)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        # Change direction a few times per second and occasionally use abilities
+        change = rng.random(games) < 0.025
+        inputs = np.where(change, movement[rng.integers(0, len(movement), games)], inputs)
+        batch.step(inputs | np.where(rng.random(games) < 0.005, INPUT_DECOY, 0))
+    elapsed = time.perf_counter() - start
+
+    for index in range(games):
+        data = batch.state(index).to_bytes()
+        state, _ = GameState.from_bytes(data)
+        if state.to_bytes() != data:
+            raise RuntimeError(f"Game {index}'s state didn't round-trip through to_bytes()")
+        sim = GameSimulation()
+        sim.state = state
+        sim.step(INPUT_RIGHT)
+    return games * ticks / max(elapsed, 1e-9)
+
+
+if __name__ == '__main__':
+    level = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    rate = run_batch(games, ticks=1200, level=level, seed=0)
+    print(f"Batch simulation (level {level}, {games} games): {rate:,.0f} game-ticks/second")
@@ -0,0 +1,269 @@
+"""
+Benchmarks for the draw_* and update_* functions in cyberpunk_hacker.py.
+
+Every function is driven against the offscreen dummy video driver with a
+seeded RNG, a fixed 60 FPS frame time and controlled numbers of walls,
+particles and shards. For each call it reports throughput, mean time, how many
+pygame.Surface objects it creates and its peak Python allocation.
+
+    python benchmark.py                        # all scenarios
+    python benchmark.py level10 -k draw_       # one scenario, matching functions
+    python benchmark.py --save baseline.json   # record results
+    python benchmark.py --compare baseline.json --tolerance 0.25
+
+With --compare the exit status is 1 if any function got slower than the saved
+run by more than the tolerance.
+"""
+import argparse
+import inspect
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+
+class CountingSurface(pygame.Surface):
+    """pygame.Surface that counts how many times it's constructed"""
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        CountingSurface.created += 1
+        super().__init__(*args, **kwargs)
+
+
+# Installed before the game is imported so every pygame.Surface(...) it makes is counted
+pygame.Surface = CountingSurface
+
+import cyberpunk_hacker as game
+from game_state import ENVIRONMENT_MAZE, DataShard
+from maze import BASE_AREA
+
+
+Scenario = namedtuple('Scenario', 'level walls particles decoy_particles shards pursuers')
+
+SCENARIOS = {
+    'level1': Scenario(level=1, walls=None, particles=150, decoy_particles=50, shards=10, pursuers=0),
+    # Stress scenarios: level 3 is the largest shipped world, level 10 scales it further
+    'level3': Scenario(level=3, walls=600, particles=1000, decoy_particles=300, shards=40, pursuers=0),
+    'level10': Scenario(level=10, walls=4000, particles=10000, decoy_particles=2000, shards=300, pursuers=400),
+}
+
+# Called with these arguments instead of none
+CALL_ARGS = {
+    'draw_decoy_tutorial': (False,),
+    'draw_shard_tutorial': (False,),
+}
+
+
+class FixedClock:
+    """Stands in for pygame.time.Clock so dt-based updates always see one 60 FPS frame"""
+
+    def __init__(self, frame_ms=1000 / 60):
+        self.frame_ms = frame_ms
+
+    def get_time(self):
+        return self.frame_ms
+
+    def tick(self, framerate=0):
+        return self.frame_ms
+
+    def get_fps(self):
+        return 1000 / self.frame_ms
+
+
+def place_walls(count):
+    """Replace the level's maze with one of about count walls spread over the world"""
+    state = game.sim.state
+    state.walls.base_count = max(1, round(count * BASE_AREA / (state.world_width * state.world_height)))
+    game.sim.generate_maze_walls()
+
+
+def setup_scenario(scenario, seed):
+    """Put the game into a reproducible state with everything drawable active and on screen"""
+    game.seed_run(seed)
+    game.clock = FixedClock()
+    sim = game.sim
+    rng = sim.rng
+    state = sim.state
+
+    state.current_environment = ENVIRONMENT_MAZE
+    game.reset_level(scenario.level)
+    if scenario.walls is not None:
+        place_walls(scenario.walls)
+        game.wall_layer.bake(state.walls.maze, (*game.WALL_COLOR, 200))
+
+    # Player mid-world with the decoy, scanner and node in view
+    player, decoy, scanner = state.player, state.decoy, state.scanner
+    player.x, player.y = state.world_width // 2, state.world_height // 2
+    decoy.active = True
+    decoy.can_use = True
+    decoy.x, decoy.y = player.x + 120, player.y - 80
+    decoy.duration = decoy.max_duration
+    scanner.active = True
+    scanner.x, scanner.y = player.x - 150, player.y + 60
+    state.node.x, state.node.y = player.x + 250, player.y + 100
+    state.firewall.x, state.firewall.y = player.x - 300, player.y - 150
+    sim.save_previous_positions()
+    game.interpolate_positions(1.0)
+    game.camera_x = max(0, min(state.world_width - game.VIEWPORT_WIDTH, player.x - game.VIEWPORT_WIDTH // 2))
+    game.camera_y = max(0, min(state.world_height - game.VIEWPORT_HEIGHT, player.y - game.VIEWPORT_HEIGHT // 2))
+
+    # Extra pursuers, half of them firewalls: a quarter in view, the rest where they spawned
+    sim.spawn_pursuers(scenario.pursuers // 2, scenario.pursuers - scenario.pursuers // 2)
+    for records in (state.pursuers.firewalls, state.pursuers.scanners):
+        in_view = records[::4]
+        in_view['x'] = [game.camera_x + rng.randint(0, game.VIEWPORT_WIDTH) for _ in range(len(in_view))]
+        in_view['y'] = [game.camera_y + rng.randint(0, game.VIEWPORT_HEIGHT) for _ in range(len(in_view))]
+    sim.save_previous_positions()
+    game.interpolate_positions(1.0)
+
+    # Shards: a quarter in view, the rest anywhere in the world
+    state.shards.active = []
+    for i in range(scenario.shards):
+        if i % 4 == 0:
+            x = game.camera_x + rng.randint(0, game.VIEWPORT_WIDTH)
+            y = game.camera_y + rng.randint(0, game.VIEWPORT_HEIGHT)
+        else:
+            x = rng.randint(0, state.world_width)
+            y = rng.randint(0, state.world_height)
+        state.shards.active.append(DataShard(x, y, rng.uniform(0, 360), rng.uniform(-2, 2)))
+
+    # Particles already faded in, so they're all drawn
+    game.particles.clear()
+    game.spawn_particles(scenario.particles)
+    game.particles.alpha[:game.particles.count] = game.particle_rng.uniform(30, 255, game.particles.count)
+    game.particles.fade_in[:] = False
+    game.decoy_ready_particles.clear()
+    for _ in range(scenario.decoy_particles):
+        game.spawn_decoy_ready_particles()
+        if len(game.decoy_ready_particles) >= scenario.decoy_particles:
+            break
+    game.decoy_ready_particles.lifetime[:] = 1e9  # Keep them alive for the whole run
+
+    # Messages and effects that are otherwise only shown briefly
+    game.show_alert = True
+    game.showing_upgrade = True
+    game.upgrade_timer = game.upgrade_duration / 2
+    game.transition_timer = game.transition_duration / 4
+    game.screen_shake = False
+
+
+def benchmarked_functions(pattern=None):
+    names = []
+    for name, func in inspect.getmembers(game, inspect.isfunction):
+        if not name.startswith(('draw_', 'update_')) or getattr(func, '__module__', None) != game.__name__:
+            continue
+        if pattern and pattern not in name:
+            continue
+        names.append(name)
+    return names
+
+
+def measure(name, scenario, seed, min_time, warmup_time, alloc_calls):
+    setup_scenario(scenario, seed)
+    func = getattr(game, name)
+    args = CALL_ARGS.get(name, ())
+
+    # Warm up caches (sprites, text, grid tiles) so the timing reflects steady state
+    deadline = time.perf_counter() + warmup_time
+    while time.perf_counter() < deadline:
+        func(*args)
+
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0
+    while elapsed < min_time:
+        func(*args)
+        calls += 1
+        elapsed = time.perf_counter() - start
+
+    # Allocations in a separate pass, since tracemalloc slows everything down
+    surfaces_before = CountingSurface.created
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(alloc_calls):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func(*args)
+        allocated += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+
+    return {
+        'ops_per_sec': calls / elapsed,
+        'mean_us': elapsed / calls * 1e6,
+        'surfaces_per_call': (CountingSurface.created - surfaces_before) / alloc_calls,
+        'py_kib_per_call': allocated / alloc_calls / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenarios', nargs='*', help=f"scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('-k', dest='pattern', help='only functions whose name contains this')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--min-time', type=float, default=0.3, help='seconds to time each function for')
+    parser.add_argument('--warmup', type=float, default=0.2, help='seconds of untimed calls first')
+    parser.add_argument('--alloc-calls', type=int, default=10, help='calls to measure allocations over')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier --save to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown for --compare (0.25 = 25%%)')
+    args = parser.parse_args()
+    for scenario_name in args.scenarios:
+        if scenario_name not in SCENARIOS:
+            parser.error(f"unknown scenario {scenario_name!r}, choose from {', '.join(SCENARIOS)}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for scenario_name in args.scenarios or list(SCENARIOS):
+        scenario = SCENARIOS[scenario_name]
+        setup_scenario(scenario, args.seed)
+        state = game.sim.state
+        print(f"\n{scenario_name}: world {state.world_width}x{state.world_height}, {len(state.walls.maze.all_walls())} walls, "
+              f"{len(game.particles)} particles, {len(game.decoy_ready_particles)} decoy particles, "
+              f"{len(state.shards.active)} shards, "
+              f"{len(state.pursuers.firewalls) + len(state.pursuers.scanners)} extra pursuers")
+        print(f"  {'function':<30}{'ops/s':>10}{'mean us':>10}{'surfaces':>10}{'py KiB':>9}")
+
+        results[scenario_name] = {}
+        for name in benchmarked_functions(args.pattern):
+            result = measure(name, scenario, args.seed, args.min_time, args.warmup, args.alloc_calls)
+            results[scenario_name][name] = result
+            line = (f"  {name:<30}{result['ops_per_sec']:>10.0f}{result['mean_us']:>10.1f}"
+                    f"{result['surfaces_per_call']:>10.1f}{result['py_kib_per_call']:>9.1f}")
+
+            previous = (baseline or {}).get(scenario_name, {}).get(name)
+            if previous:
+                slowdown = result['mean_us'] / previous['mean_us'] - 1
+                line += f"  {slowdown:+.0%}"
+                if slowdown > args.tolerance:
+                    line += "  REGRESSION"
+                    regressions.append((scenario_name, name, slowdown))
+            print(line)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.save}")
+
+    if regressions:
+        print(f"\n{len(regressions)} function(s) slower than {args.compare} by more than {args.tolerance:.0%}:")
+        for scenario_name, name, slowdown in regressions:
+            print(f"  {scenario_name} {name}: {slowdown:+.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
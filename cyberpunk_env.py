@@ -0,0 +1,401 @@
+"""
+Reinforcement learning environments for Cyberpunk Hacker Duel.
+
+CyberpunkHackerVectorEnv plays num_envs games at once in one BatchSimulation
+and follows the Gymnasium vector API: every call takes and returns arrays
+with one row per game, and games that end are reset automatically.
+CyberpunkHackerEnv is a single game with the gymnasium.Env API. Gymnasium is
+optional - when it's installed CyberpunkHackerEnv is a gymnasium.Env and both
+environments describe themselves with Gymnasium spaces, otherwise they work
+the same without the space objects.
+
+    env = CyberpunkHackerVectorEnv(num_envs=256, level=2)
+    observations, infos = env.reset(seed=0)
+    for _ in range(1000):
+        observations, rewards, terminated, truncated, infos = env.step(policy(observations))
+
+Actions are (move, decoy, disable walls) triples: move is 0 for none or
+1-8 for the eight directions clockwise from up (see MOVE_INPUTS), and the
+other two press Q and E when 1. Every step runs FRAME_SKIP logic ticks.
+
+Observations are either 'vector' - the OBSERVATION_FEATURES, the data
+shard slots and a LOCAL_GRID x LOCAL_GRID grid of player-sized cells
+around the player, 1 where a visible wall or the edge of the world is - or
+'rgb', a small top-down image around the player rendered offscreen in the
+game's colours.
+
+Rewards are for getting closer to the node, collecting shards and reaching
+the node, minus a little for damage taken. Games end when the node is
+reached, and are cut off after max_steps steps.
+"""
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+
+from batch_simulation import BatchSimulation, new_states
+from game_simulation import (
+    LOGIC_HZ, VIEWPORT_WIDTH, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN, INPUT_DECOY, INPUT_DISABLE_WALLS
+)
+from game_state import PLAYER_SIZE, ShardState
+
+try:
+    import gymnasium
+    from gymnasium import spaces
+except ImportError:  # Everything but the spaces works without it
+    gymnasium = None
+
+# Logic ticks per environment step (30 decisions a second)
+FRAME_SKIP = 4
+# Steps before a game is cut off (two minutes of game time)
+MAX_STEPS = 120 * LOGIC_HZ // FRAME_SKIP
+
+# Inputs held for each move action: none, then clockwise from up
+MOVE_INPUTS = np.array((
+    0, INPUT_UP, INPUT_UP | INPUT_RIGHT, INPUT_RIGHT, INPUT_DOWN | INPUT_RIGHT,
+    INPUT_DOWN, INPUT_DOWN | INPUT_LEFT, INPUT_LEFT, INPUT_UP | INPUT_LEFT
+))
+
+REWARD_PROGRESS = 0.01  # Per pixel closer to the node
+REWARD_SHARD = 1.0
+REWARD_DAMAGE = -0.1  # Per health point lost
+REWARD_NODE = 10.0
+
+# Extra firewalls and extra scanners (from level 4) in a 'vector' observation:
+# this many of each kind, nearest the player first
+PURSUER_SLOTS = 4
+
+# Scalar features at the start of a 'vector' observation. Positions are
+# relative to the player's centre, in viewport widths.
+OBSERVATION_FEATURES = (
+    'player_x', 'player_y',  # Absolute, as a fraction of the world size
+    'health', 'score',  # Fraction of max health, shards / 5
+    'decoy_can_use', 'decoy_cooldown', 'decoy_active', 'decoy_dx', 'decoy_dy',
+    'walls_visible', 'walls_timer',  # Fraction of the hide time left
+    'node_dx', 'node_dy',
+    'firewall_dx', 'firewall_dy', 'firewall_width', 'firewall_height',
+    'scanner_active', 'scanner_dx', 'scanner_dy',
+    # Firewalls by their centres; slots beyond the level's pursuers are inactive
+    *(f'{kind}_{slot}_{name}' for kind in ('pursuer_firewall', 'pursuer_scanner') for slot in range(PURSUER_SLOTS)
+      for name in ('active', 'dx', 'dy')),
+)  # Then active, dx and dy for every data shard slot
+
+# Local wall grid: cells the size of the player
+LOCAL_GRID = 11
+LOCAL_CELL = PLAYER_SIZE
+
+# Walls are rasterised at this many pixels per cell to cut observations from
+OCCUPANCY_RESOLUTION = 10
+EMPTY, WALL, OUTSIDE = 0, 1, 2
+
+# 'rgb' observations: RGB_SIZE x RGB_SIZE pixels, one per occupancy cell
+RGB_SIZE = 64
+
+# Codes of the things drawn in 'rgb' observations, after the occupancy codes,
+# and the game's colour for each (cyberpunk_hacker.py)
+SHARD, NODE, DECOY, SCANNER, FIREWALL, PLAYER = range(3, 9)
+COLORS = np.array((
+    (0, 0, 0), (180, 0, 255), (40, 40, 40),  # Empty, wall, outside the world
+    (0, 255, 255), (255, 50, 50), (100, 150, 255), (255, 255, 0), (255, 120, 0), (0, 100, 255),
+), dtype=np.uint8)
+
+OBSERVATIONS = ('vector', 'rgb')
+
+
+class CyberpunkHackerVectorEnv:
+    """num_envs games of one level stepped together"""
+    metadata = {'render_modes': ['rgb_array'], 'render_fps': LOGIC_HZ / FRAME_SKIP}
+
+    def __init__(self, num_envs=64, level=1, observation='vector', max_steps=MAX_STEPS, autoreset=True):
+        if observation not in OBSERVATIONS:
+            raise ValueError(f"observation must be one of {', '.join(OBSERVATIONS)}, not {observation!r}")
+        self.num_envs = num_envs
+        self.level = level
+        self.observation = observation
+        self.max_steps = max_steps
+        self.autoreset = autoreset  # Start a new game as soon as one ends
+        self.rng = None  # random.Random the games are generated from, set by reset()
+        self.batch = None
+
+        # Room around the world in the occupancy raster for windows near the edge
+        self.margin = max(RGB_SIZE, LOCAL_GRID * LOCAL_CELL // OCCUPANCY_RESOLUTION) // 2 + 1
+
+        self.single_observation_space = self.observation_space = None
+        self.single_action_space = self.action_space = None
+        if gymnasium is not None:
+            if observation == 'rgb':
+                self.single_observation_space = spaces.Box(0, 255, (RGB_SIZE, RGB_SIZE, 3), np.uint8)
+            else:
+                size = observation_size(ShardState().max_count)
+                self.single_observation_space = spaces.Box(-np.inf, np.inf, (size,), np.float32)
+            self.single_action_space = spaces.MultiDiscrete([len(MOVE_INPUTS), 2, 2])
+            self.observation_space = spaces.Box(
+                self.single_observation_space.low[None].repeat(num_envs, 0),
+                self.single_observation_space.high[None].repeat(num_envs, 0),
+                dtype=self.single_observation_space.dtype)
+            self.action_space = spaces.MultiDiscrete(np.tile([len(MOVE_INPUTS), 2, 2], (num_envs, 1)))
+
+    def reset(self, seed=None, options=None):
+        """Start new games in every environment. Returns (observations, infos)."""
+        if seed is not None or self.rng is None:
+            self.rng = random.Random(seed)
+        states = new_states(self.num_envs, self.level, self.rng)
+        self.batch = batch = BatchSimulation(states, self.rng.randrange(2 ** 32))
+        self.steps = np.zeros(self.num_envs, dtype=np.int64)
+
+        # Occupancy raster of every game, with the margin outside the world
+        resolution = OCCUPANCY_RESOLUTION
+        self.rows = -(-batch.world_height // resolution)
+        self.columns = -(-batch.world_width // resolution)
+        self.occupancy = np.full((self.num_envs, self.rows + 2 * self.margin, self.columns + 2 * self.margin),
+                                 OUTSIDE, dtype=np.uint8)
+        self._rasterise(batch.games)
+        self.node_distance = self._node_distance()
+        return self._observe(), {}
+
+    def step(self, actions):
+        """
+        Apply one (move, decoy, disable walls) action per game for FRAME_SKIP
+        ticks. Returns (observations, rewards, terminated, truncated, infos).
+        Games that ended are reset straight away when autoreset is on. As
+        with Gymnasium's vector environments, infos['final_observation'] and
+        infos['final_info'] are then object arrays holding those games' last
+        observations and infos, None for the others, and
+        infos['_final_observation'] and infos['_final_info'] mark which
+        games they are.
+        """
+        batch = self.batch
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs, 3)
+        moves = MOVE_INPUTS[actions[:, 0]]
+        presses = np.where(actions[:, 1] != 0, INPUT_DECOY, 0) | np.where(actions[:, 2] != 0, INPUT_DISABLE_WALLS, 0)
+
+        damage_before = batch.damage_taken.copy()
+        shards_before = batch.shards_collected.copy()
+        won_before = batch.won.copy()
+        # Q and E are presses, so they only go with the first tick
+        batch.step(moves | presses)
+        for _ in range(FRAME_SKIP - 1):
+            batch.step(moves)
+        self.steps += 1
+
+        node_distance = self._node_distance()
+        rewards = (REWARD_PROGRESS * (self.node_distance - node_distance) +
+                   REWARD_SHARD * (batch.shards_collected - shards_before) +
+                   REWARD_DAMAGE * (batch.damage_taken - damage_before) +
+                   REWARD_NODE * (batch.won & ~won_before))
+        self.node_distance = node_distance
+        terminated = batch.won.copy()
+        truncated = (self.steps >= self.max_steps) & ~terminated
+
+        observations = self._observe()
+        infos = {}
+        ended = terminated | truncated
+        if self.autoreset and ended.any():
+            final_observations = np.empty(self.num_envs, dtype=object)
+            final_infos = np.empty(self.num_envs, dtype=object)
+            for game in np.flatnonzero(ended).tolist():
+                final_observations[game] = observations[game]
+                final_infos[game] = {}
+            infos['final_observation'], infos['_final_observation'] = final_observations, ended
+            infos['final_info'], infos['_final_info'] = final_infos, ended.copy()
+            self._reset_games(np.flatnonzero(ended))
+            observations = self._observe()
+        return observations, rewards.astype(np.float32), terminated, truncated, infos
+
+    def render(self):
+        """RGB images of every game, whatever the observation type"""
+        return self._render_rgb()
+
+    def close(self):
+        self.batch = None
+        self.occupancy = None
+
+    def _reset_games(self, games):
+        self.batch.replace(games, new_states(len(games), self.level, self.rng))
+        self.steps[games] = 0
+        self._rasterise(games)
+        self.node_distance[games] = self._node_distance()[games]
+
+    def _rasterise(self, games):
+        """
+        Draw the walls of the given games into the occupancy raster, from the
+        batch's copy of them rather than generating the mazes again
+        """
+        resolution = OCCUPANCY_RESOLUTION
+        margin = self.margin
+        occupancy = self.occupancy
+        occupancy[games, margin:margin + self.rows, margin:margin + self.columns] = EMPTY
+        for game in games.tolist():
+            cells = occupancy[game]
+            for left, top, width, height in self.batch.wall_rects(game).astype(np.int64).tolist():
+                cells[margin + top // resolution:margin + (top + height - 1) // resolution + 1,
+                      margin + left // resolution:margin + (left + width - 1) // resolution + 1] = WALL
+
+    def _player_center(self):
+        batch = self.batch
+        half = batch.player_size / 2
+        return batch.player_x + half, batch.player_y + half
+
+    def _node_distance(self):
+        center_x, center_y = self._player_center()
+        return np.sqrt((self.batch.node_x - center_x) ** 2 + (self.batch.node_y - center_y) ** 2)
+
+    def _window(self, center_x, center_y, size):
+        """
+        size x size occupancy codes centred on each game's point, with walls
+        that are currently disabled cleared
+        """
+        resolution = OCCUPANCY_RESOLUTION
+        left = np.floor(center_x / resolution).astype(np.int64) - size // 2 + self.margin
+        top = np.floor(center_y / resolution).astype(np.int64) - size // 2 + self.margin
+        left = np.clip(left, 0, self.occupancy.shape[2] - size)
+        top = np.clip(top, 0, self.occupancy.shape[1] - size)
+        offsets = np.arange(size)
+        window = self.occupancy[self.batch.games[:, None, None], (top[:, None] + offsets)[:, :, None],
+                                (left[:, None] + offsets)[:, None, :]]
+        hidden = (window == WALL) & ~self.batch.walls_visible[:, None, None]
+        window[hidden] = EMPTY
+        return window, (left - self.margin) * resolution, (top - self.margin) * resolution
+
+    def _observe(self):
+        if self.observation == 'rgb':
+            return self._render_rgb()
+
+        batch = self.batch
+        center_x, center_y = self._player_center()
+        scale = 1 / VIEWPORT_WIDTH
+
+        def relative(x, y, active=True):
+            return (np.where(active, (x - center_x) * scale, 0), np.where(active, (y - center_y) * scale, 0))
+
+        features = [
+            batch.player_x / batch.world_width, batch.player_y / batch.world_height,
+            batch.health / batch.max_health, batch.score / 5,
+            batch.decoy_can_use, batch.decoy_cooldown.clip(0) / batch.decoy_max_cooldown, batch.decoy_active,
+            *relative(batch.decoy_x + batch.player_size / 2, batch.decoy_y + batch.player_size / 2, batch.decoy_active),
+            batch.walls_visible,
+            np.where(batch.walls_timer_active, 1 - batch.walls_timer / batch.walls_hide_duration, 0),
+            *relative(batch.node_x, batch.node_y),
+            *relative(batch.firewall_x + batch.firewall_width / 2, batch.firewall_y + batch.firewall_height / 2),
+            batch.firewall_width * scale, batch.firewall_height * scale,
+            batch.scanner_active, *relative(batch.scanner_x, batch.scanner_y, batch.scanner_active),
+        ]
+        firewalls, scanners = batch.pursuer_firewalls, batch.pursuer_scanners
+        for x, y in ((firewalls['x'] + firewalls['width'] / 2, firewalls['y'] + firewalls['height'] / 2),
+                     (scanners['x'], scanners['y'])):
+            # Nearest first, every game having the same number of each kind
+            order = np.argsort((x - center_x[:, None]) ** 2 + (y - center_y[:, None]) ** 2, axis=1)
+            x, y = np.take_along_axis(x, order, 1), np.take_along_axis(y, order, 1)
+            for slot in range(PURSUER_SLOTS):
+                if slot < x.shape[1]:
+                    features += [np.ones(self.num_envs), *relative(x[:, slot], y[:, slot])]
+                else:
+                    features += [np.zeros(self.num_envs)] * 3
+        for slot in range(batch.max_shards):
+            active = batch.shard_active[:, slot]
+            features += [active, *relative(batch.shard_x[:, slot], batch.shard_y[:, slot], active)]
+
+        # Player-sized cells around the player, blocked if any part of them is
+        cell = LOCAL_CELL // OCCUPANCY_RESOLUTION
+        window, _, _ = self._window(center_x, center_y, LOCAL_GRID * cell)
+        grid = (window != EMPTY).reshape(self.num_envs, LOCAL_GRID, cell, LOCAL_GRID, cell).any(axis=(2, 4))
+
+        return np.concatenate([np.stack(features, axis=1), grid.reshape(self.num_envs, -1)],
+                              axis=1).astype(np.float32)
+
+    def _render_rgb(self):
+        """Top-down RGB_SIZE x RGB_SIZE images around each player, one pixel per occupancy cell"""
+        batch = self.batch
+        resolution = OCCUPANCY_RESOLUTION
+        center_x, center_y = self._player_center()
+        image, left, top = self._window(center_x, center_y, RGB_SIZE)
+
+        # World position of each pixel's left/top edge
+        pixel_x = left[:, None] + np.arange(RGB_SIZE) * resolution
+        pixel_y = top[:, None] + np.arange(RGB_SIZE) * resolution
+
+        def paint(x, y, width, height, code, active=None):
+            columns = (pixel_x + resolution > x[:, None]) & (pixel_x < (x + width)[:, None])
+            rows = (pixel_y + resolution > y[:, None]) & (pixel_y < (y + height)[:, None])
+            if active is not None:
+                rows &= active[:, None]
+            image[rows[:, :, None] & columns[:, None, :]] = code
+
+        shard_half = batch.shard_size / 2
+        for slot in range(batch.max_shards):
+            paint(batch.shard_x[:, slot] - shard_half, batch.shard_y[:, slot] - shard_half,
+                  batch.shard_size, batch.shard_size, SHARD, batch.shard_active[:, slot])
+        paint(batch.node_x - batch.node_radius, batch.node_y - batch.node_radius,
+              batch.node_radius * 2, batch.node_radius * 2, NODE)
+        paint(batch.decoy_x, batch.decoy_y, batch.player_size, batch.player_size, DECOY, batch.decoy_active)
+        paint(batch.scanner_x - batch.scanner_radius, batch.scanner_y - batch.scanner_radius,
+              batch.scanner_radius * 2, batch.scanner_radius * 2, SCANNER, batch.scanner_active)
+        paint(batch.firewall_x, batch.firewall_y, batch.firewall_width, batch.firewall_height, FIREWALL)
+        for slot in range(batch.pursuer_scanners.shape[1]):
+            scanner = batch.pursuer_scanners[:, slot]
+            paint(scanner['x'] - scanner['radius'], scanner['y'] - scanner['radius'],
+                  scanner['radius'] * 2, scanner['radius'] * 2, SCANNER)
+        for slot in range(batch.pursuer_firewalls.shape[1]):
+            firewall = batch.pursuer_firewalls[:, slot]
+            paint(firewall['x'], firewall['y'], firewall['width'], firewall['height'], FIREWALL)
+        paint(batch.player_x, batch.player_y, batch.player_size, batch.player_size, PLAYER)
+        return COLORS[image]
+
+
+def observation_size(max_shards):
+    """Length of a 'vector' observation"""
+    return len(OBSERVATION_FEATURES) + 3 * max_shards + LOCAL_GRID * LOCAL_GRID
+
+
+class CyberpunkHackerEnv(gymnasium.Env if gymnasium is not None else object):
+    """A single game with the gymnasium.Env API"""
+    metadata = CyberpunkHackerVectorEnv.metadata
+
+    def __init__(self, level=1, observation='vector', max_steps=MAX_STEPS, render_mode=None):
+        self.render_mode = render_mode
+        self.env = CyberpunkHackerVectorEnv(1, level, observation, max_steps, autoreset=False)
+        self.observation_space = self.env.single_observation_space
+        self.action_space = self.env.single_action_space
+
+    def reset(self, seed=None, options=None):
+        observations, info = self.env.reset(seed, options)
+        return observations[0], info
+
+    def step(self, action):
+        observations, rewards, terminated, truncated, info = self.env.step(np.asarray(action)[None])
+        return observations[0], float(rewards[0]), bool(terminated[0]), bool(truncated[0]), info
+
+    def render(self):
+        if self.render_mode == 'rgb_array':
+            return self.env.render()[0]
+        return None
+
+    def close(self):
+        self.env.close()
+
+
+def measure(num_envs=256, level=1, observation='vector', steps=500, seed=0):
+    """Steps per second (counting every environment) with random actions"""
+    env = CyberpunkHackerVectorEnv(num_envs, level, observation)
+    env.reset(seed=seed)
+    rng = np.random.default_rng(seed)
+    actions = np.zeros((num_envs, 3), dtype=np.int64)
+    start = time.perf_counter()
+    for _ in range(steps):
+        actions[:, 0] = rng.integers(0, len(MOVE_INPUTS), num_envs)
+        actions[:, 1] = rng.random(num_envs) < 0.01
+        env.step(actions)
+    elapsed = time.perf_counter() - start
+    return num_envs * steps / max(elapsed, 1e-9)
+
+
+if __name__ == '__main__':
+    num_envs = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    observation = sys.argv[2] if len(sys.argv) > 2 else 'vector'
+    level = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    rate = measure(num_envs, level, observation)
+    print(f"{num_envs} environments, level {level}, {observation} observations: {rate:,.0f} steps/second")
@@ -4,17 +4,26 @@ import math
 import sys
 import os
 
+import numpy as np
+
+from dirty_rects import DirtyRectCompositor, IdleThrottle
+from game_simulation import (
+    GameSimulation, VIEWPORT_WIDTH, VIEWPORT_HEIGHT, BASE_WORLD_WIDTH, BASE_WORLD_HEIGHT,
+    LOGIC_DT, REFERENCE_FPS,
+    INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN, INPUT_DECOY, INPUT_DISABLE_WALLS,
+    EVENT_WALL_HIT, EVENT_FIREWALL_HIT, EVENT_PLAYER_RESET, EVENT_PLAYER_DIED,
+    EVENT_SHARD_COLLECTED, EVENT_DECOY_SPAWNED, EVENT_SCANNER_SPAWNED, EVENT_WALLS_DISABLED,
+    EVENT_NODE_REACHED, EVENT_SCANNER_HIT
+)
+from particle_system import ParticleSystem
+from profiler import FrameProfiler
+from render_cache import GridLayer, ParticleSprites, StaticNoise, SurfaceCache, TextCache, WallLayer
+from replay import ReplayPlayer, SessionRecorder, default_recording_path, load as load_recording
+
 # Initialize pygame
 pygame.init()
 pygame.mixer.init()  # Initialize sound mixer
 
-# Screen dimensions (viewport)
-VIEWPORT_WIDTH, VIEWPORT_HEIGHT = 800, 600
-# Base world dimensions (entire game world) - will be scaled based on level
-BASE_WORLD_WIDTH, BASE_WORLD_HEIGHT = 1600, 1200
-# Initialize world dimensions with base values
-WORLD_WIDTH, WORLD_HEIGHT = BASE_WORLD_WIDTH, BASE_WORLD_HEIGHT
-
 screen = pygame.display.set_mode((VIEWPORT_WIDTH, VIEWPORT_HEIGHT))
 pygame.display.set_caption("Cyberpunk Hacker Duel")
 
@@ -89,6 +98,17 @@ except Exception as e:
     text_font = get_system_font(16)
     start_font = get_system_font(28, bold=True)
 
+# Rendered text surfaces, so unchanged HUD text and messages aren't re-rasterised every frame
+text_cache = TextCache(max_entries=256)
+
+# Pre-rendered entity sprites (player, node, decoy, shards, scanner). Pulses and
+# rotations are snapped to ATLAS_STEPS levels so the number of sprites stays bounded.
+sprite_atlas = SurfaceCache(max_entries=1024)
+ATLAS_STEPS = 16
+SHARD_ROTATION_STEPS = 64  # Per 120 degrees - a triangle looks the same after a third of a turn
+DECOY_STATIC_VARIANTS = 8
+PURSUER_FLICKER_STEPS = 4  # Flicker alphas each extra firewall's sprite comes in
+
 # Camera settings
 camera_x, camera_y = 0, 0
 camera_smoothness = 0.1  # Lower = smoother (0-1)
@@ -108,6 +128,10 @@ STATIC_COLOR = (200, 200, 200)  # White/gray for static effect
 SHARD_COLOR = (0, 255, 255)  # Cyan for data shards
 SCORE_COLOR = (50, 255, 100)  # Neon green for score
 PARTICLE_COLOR = (0, 255, 0)  # Green for ambient particles
+# Extra pursuers look like the firewall and scanner of their behaviour
+# profile's level: firewall color and flicker intensity, and scanner color
+PURSUER_FIREWALL_LOOKS = {1: ((255, 120, 0), 20), 2: ((255, 80, 0), 25), 3: ((255, 30, 0), 30)}
+PURSUER_SCANNER_COLORS = {2: (255, 255, 0), 3: (255, 50, 50)}
 
 # Screen shake settings
 screen_shake = False
@@ -182,119 +206,85 @@ except Exception as e:
     print(f"Error initializing sound system: {e}")
     print("Warning: Sound system initialization failed. Running without audio.")
 
-# Ambient particles
-particles = []
-max_particles = 150
+def play_sound(sound):
+    """Play a sound effect if sound is enabled, ignoring playback errors"""
+    if sound_enabled:
+        try:
+            sound.play()
+        except:
+            pass
+
+# Gameplay state and rules live in the headless simulation; everything below
+# is presentation state that only the renderer cares about
+sim = GameSimulation()
+
+# Ambient particles - stored as NumPy arrays, so capacity is cheap
+max_particles = 20000
 particle_spawn_rate = 5  # particles per frame
+particles = ParticleSystem(max_particles)
+
+# Cosmetic randomness (particles, glitches, flicker, screen shake) has its own
+# streams so it never disturbs the gameplay stream in sim.rng. seed_run()
+# seeds all of them from one seed.
+cosmetic_rng = random.Random()
+particle_rng = np.random.default_rng()  # Random source for vectorised particle spawning
+run_seed = None  # Set by --seed; None picks a fresh seed for every run
+
+# Particles for trailing effect when decoy is ready
+decoy_ready_particles = ParticleSystem(max_particles)
 
-# Player settings
-player_size = 30
-# Center the player in the world initially
-player_x = WORLD_WIDTH // 4 - player_size // 2  # Start in the first quarter of the map
-player_y = WORLD_HEIGHT - 200  # Starting position
-player_speed = 5
-player_start_x = WORLD_WIDTH // 4 - player_size // 2
-player_start_y = WORLD_HEIGHT - 200
-player_dead = False
-
-# Player health settings
-player_max_health = 100
-player_health = player_max_health
-player_health_regen = 0  # Health regeneration per second (can be implemented later)
-damage_cooldown = 0  # Cooldown between damage events
-damage_cooldown_duration = 1.0  # Seconds of invulnerability after taking damage
-
-# Define decoy particles list for trailing effect when decoy is ready
-decoy_ready_particles = []
+# Pre-baked sprites both particle systems are stamped with
+particle_sprites = ParticleSprites()
 
 # Variables to track previous player position for trail effects
 prev_player_x = 0
 prev_player_y = 0
 
-# Security node settings
-node_x = WORLD_WIDTH - 150  # Position it on the right side of the world
-node_y = WORLD_HEIGHT // 2   # Center it vertically
-node_radius = 20
+# Security node pulse settings
 node_pulse_time = 0
 node_pulse_interval = 0.5  # seconds
 node_current_color = NODE_COLOR_BRIGHT
 node_is_bright = True
 
-# Firewall settings
-firewall_width = 8  # Start with level 1 width
-firewall_height = 200  # Start with a shorter firewall that can be dodged
-firewall_x = 0
-firewall_y = WORLD_HEIGHT // 2 - 100  # Position it in the middle of the screen initially
-firewall_speed = 3  # Start with level 1 speed
+# Firewall appearance
 firewall_alpha_base = 200
 firewall_flicker_intensity = 20  # Start with level 1 flicker intensity
-firewall_vertical_speed = 1  # Speed at which the firewall moves vertically
-firewall_vertical_direction = 1  # 1 = down, -1 = up
 firewall_alert_time = 0
 show_alert = False
 alert_duration = 2  # seconds
 
-# Decoy settings
-decoy_active = False
-decoy_x = 0
-decoy_y = 0
-decoy_duration = 0
-decoy_max_duration = 2  # seconds
-decoy_cooldown = 0
-decoy_max_cooldown = 5  # seconds
+# Decoy appearance and tutorials
 decoy_alpha = 200
-decoy_can_use = True
-decoy_count = 0  # Track how many times decoy has been used
-decoy_upgraded = False  # Track if decoy has been upgraded
 show_decoy_tutorial = True  # Flag to show tutorial only on first use
 tutorial_active = False  # Flag to indicate tutorial is currently displayed
 show_shard_tutorial = True  # Flag to show shard tutorial only on first collection
 shard_tutorial_active = False  # Flag to indicate shard tutorial is currently displayed
 
-# Scanner settings
-scanner_active = False
-scanner_x = 0
-scanner_y = 0
-scanner_radius = 5
-scanner_speed = 6
+# Scanner appearance
 scanner_trail = []  # Store positions for trail effect
 max_trail_length = 15
 scanner_flicker_intensity = 40
 
-# Environment settings
-ENVIRONMENT_OPEN = 0
-ENVIRONMENT_MAZE = 1
-current_environment = ENVIRONMENT_MAZE  # Always use maze environment
-environment_timer = 0
-environment_change_interval = 15  # seconds (no longer used for automatic switching)
+# Environment transition effect
 environment_transition = False
 transition_duration = 0.5  # seconds
 transition_timer = 0
-# Wall settings
-walls = []  # List to store wall rectangles
-wall_width = 10
-wall_height = 50
-num_walls = 20
-wall_alpha = 0  # For fade-in effect
-walls_visible = True  # New variable to track if walls are visible
-wall_timer_active = False  # New variable to track if wall timer is active
-wall_timer = 0  # Timer for walls reappearing
-wall_hide_duration = 15  # How long walls stay hidden in seconds
-
-# Data shard settings
-data_shards = []  # List to store active data shards
-max_shards = 3  # Maximum number of shards at once
-shard_size = 15  # Size of the triangular shards
-shard_spawn_timer = 0
-shard_spawn_interval = 5  # seconds
+transition_static = StaticNoise(VIEWPORT_WIDTH, VIEWPORT_HEIGHT, STATIC_COLOR)  # Frames are built on first use
+
+# Data shard appearance
 shard_glow_intensity = 0
 shard_glow_direction = 1
 shard_pulse_speed = 0.03
-player_score = 0  # Player's score from collecting data shards
 showing_upgrade = False
 upgrade_timer = 0
 upgrade_duration = 2  # seconds
 
+# Wall rendering - static geometry is baked into wall_layer a chunk at a time
+# as it nears the view
+wall_layer = WallLayer()
+wall_glitch_surf = pygame.Surface((sim.state.walls.height, 5), pygame.SRCALPHA)
+wall_glitch_surf.fill((*WALL_COLOR, 200))
+
 # Grid settings
 grid_spacing = 40
 grid_alpha_base = 40  # Base transparency
@@ -303,15 +293,56 @@ grid_pulse_direction = 1
 grid_pulse_speed = 0.5
 grid_jitter = 3  # Max pixel jitter
 
-# Game state
-game_won = False
-current_level = 1  # Track the current level
-max_level = 3  # Maximum number of levels in the game
+# Pre-jittered grid tiles, rotated every frame for the flicker
+grid_layer = GridLayer(VIEWPORT_WIDTH, VIEWPORT_HEIGHT, grid_spacing, grid_jitter, rng=cosmetic_rng)
+grid_layer.bake(GRID_COLOR)
+
+# Level completion screen state
 level_completed = False  # Track if level is completed but not yet progressed
+level_button_rect = None  # Continue button on the level complete screen
+
+# Interpolated positions of moving entities for the frame being drawn
+render_player_x, render_player_y = sim.state.player.x, sim.state.player.y
+render_firewall_x, render_firewall_y = sim.state.firewall.x, sim.state.firewall.y
+render_scanner_x, render_scanner_y = sim.state.scanner.x, sim.state.scanner.y
+render_pursuer_firewalls = render_pursuer_scanners = (np.zeros(0), np.zeros(0))  # x and y arrays
+
+# Fixed-timestep logic state
+logic_accumulator = 0  # Elapsed time not yet consumed by logic ticks
+pending_actions = 0  # Q/E presses waiting for the next logic tick
+MAX_FRAME_TIME = 0.25  # Cap on time simulated per frame so a stall can't snowball
 
 # Clock for controlling FPS
 clock = pygame.time.Clock()
 FPS = 60
+IDLE_FPS = 15  # Static screens nobody is interacting with (e.g. a kiosk on the title screen)
+IDLE_AFTER = 30  # Seconds without input before an animated static screen slows down
+
+# Display updates - static screens only push the regions they changed
+compositor = DirtyRectCompositor(screen.get_rect())
+idle_throttle = IdleThrottle(active_fps=FPS, idle_fps=IDLE_FPS, idle_after=IDLE_AFTER)
+INPUT_EVENT_TYPES = (pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP)
+
+# Tutorials darken the frozen game frame underneath them; after this many
+# frames it's fully black and only the tutorial box still changes
+tutorial_overlay = pygame.Surface((VIEWPORT_WIDTH, VIEWPORT_HEIGHT), pygame.SRCALPHA)
+tutorial_overlay.fill((0, 0, 0, 180))  # Dark semi-transparent background
+OVERLAY_SETTLE_FRAMES = 8
+
+# Frame profiler - F3 toggles timing and its overlay, stats are dumped on exit if it was used
+profiler = FrameProfiler()
+profiler_font = pygame.font.SysFont('monospace', 13)  # The stats table needs fixed-width digits
+profile_dump_path = 'frame_profile.csv'  # .json for JSON output
+
+# Session recording and replay
+recording_enabled = True  # --no-record turns recording off
+record_path = None  # --record PATH; by default every session gets a new file in recordings/
+recorder = None  # SessionRecorder of the session being played
+replay_recording = None  # Recording loaded with --replay
+replay = None  # ReplayPlayer driving the simulation instead of the keyboard
+
+# Snapshot of the simulation at the start of the current level - R restores it
+level_start = None
 
 # Coordinate conversion functions
 def world_to_screen(world_x, world_y):
@@ -331,16 +362,19 @@ def update_camera():
     global camera_x, camera_y
     
     # Calculate target camera position (center on player)
-    target_camera_x = player_x - VIEWPORT_WIDTH // 2 + player_size // 2
-    target_camera_y = player_y - VIEWPORT_HEIGHT // 2 + player_size // 2
+    target_camera_x = render_player_x - VIEWPORT_WIDTH // 2 + sim.state.player.size // 2
+    target_camera_y = render_player_y - VIEWPORT_HEIGHT // 2 + sim.state.player.size // 2
     
     # Clamp camera to world boundaries
-    target_camera_x = max(0, min(WORLD_WIDTH - VIEWPORT_WIDTH, target_camera_x))
-    target_camera_y = max(0, min(WORLD_HEIGHT - VIEWPORT_HEIGHT, target_camera_y))
+    target_camera_x = max(0, min(sim.state.world_width - VIEWPORT_WIDTH, target_camera_x))
+    target_camera_y = max(0, min(sim.state.world_height - VIEWPORT_HEIGHT, target_camera_y))
     
-    # Smoothly interpolate towards target
-    camera_x += (target_camera_x - camera_x) * camera_smoothness
-    camera_y += (target_camera_y - camera_y) * camera_smoothness
+    # Smoothly interpolate towards target - camera_smoothness is per reference
+    # frame, so scale it by elapsed time to follow at the same pace at any FPS
+    frames = clock.get_time() / 1000 * REFERENCE_FPS
+    smoothing = 1 - (1 - camera_smoothness) ** frames
+    camera_x += (target_camera_x - camera_x) * smoothing
+    camera_y += (target_camera_y - camera_y) * smoothing
 
 def is_visible_on_screen(world_x, world_y, width, height):
     """Check if an object is visible on screen"""
@@ -380,249 +414,99 @@ def trigger_screen_shake(duration=0.3, intensity=5):
 
 def spawn_particles(count=5):
     """Spawn new ambient particles"""
-    for _ in range(count):
-        # Spawn particles in visible area around camera
-        x = random.randint(int(camera_x), int(camera_x + VIEWPORT_WIDTH))
-        y = random.randint(int(camera_y), int(camera_y + VIEWPORT_HEIGHT))
-        size = random.uniform(1.0, 3.0)
-        lifetime = random.uniform(2.0, 5.0)  # seconds
-        fade_speed = random.uniform(0.3, 0.7)
-        particles.append({
-            'x': x,
-            'y': y,
-            'size': size,
-            'alpha': 0,  # Start invisible and fade in
-            'fade_in': True,
-            'fade_speed': fade_speed,
-            'lifetime': lifetime,
-            'age': 0
-        })
+    # Spawn particles in visible area around camera
+    particles.spawn(
+        x=particle_rng.integers(int(camera_x), int(camera_x + VIEWPORT_WIDTH), size=count, endpoint=True),
+        y=particle_rng.integers(int(camera_y), int(camera_y + VIEWPORT_HEIGHT), size=count, endpoint=True),
+        size=particle_rng.uniform(1.0, 3.0, count),
+        lifetime=particle_rng.uniform(2.0, 5.0, count),  # seconds
+        color=PARTICLE_COLOR,
+        alpha=0,  # Start invisible and fade in
+        fade_speed=particle_rng.uniform(0.3, 0.7, count),
+        fade_in=True
+    )
 
 def update_particles():
     """Update all particles (fade in/out, remove old ones)"""
-    global particles
+    dt = clock.get_time() / 1000
     
     # Only spawn new particles occasionally
-    if random.random() < 0.3:
+    if cosmetic_rng.random() < 0.3:
         spawn_particles(1)
     
-    for i in range(len(particles) - 1, -1, -1):
-        particle = particles[i]
-        
-        # Update age
-        particle['age'] += clock.get_time() / 1000
-        
-        # Check if particle should be removed
-        if particle['age'] >= particle['lifetime']:
-            particles.pop(i)
-            continue
-            
-        # Update fade effect
-        if particle['fade_in']:
-            # Fade in
-            particle['alpha'] += particle['fade_speed'] * (clock.get_time() / 1000) * 255
-            if particle['alpha'] >= 255:
-                particle['alpha'] = 255
-                particle['fade_in'] = False
-        else:
-            # Start fading out in the second half of lifetime
-            if particle['age'] > particle['lifetime'] / 2:
-                particle['alpha'] -= particle['fade_speed'] * (clock.get_time() / 1000) * 255
-                particle['alpha'] = max(0, particle['alpha'])
+    # Age particles and remove the ones past their lifetime
+    particles.advance(dt)
+    
+    count = particles.count
+    alpha = particles.alpha[:count]
+    fade_in = particles.fade_in[:count]
+    step = particles.fade_speed[:count] * (dt * 255)
+    
+    # Fade in new particles, and fade out the rest in the second half of their lifetime
+    fading_out = ~fade_in & (particles.age[:count] > particles.lifetime[:count] / 2)
+    alpha += np.where(fade_in, step, np.where(fading_out, -step, 0))
+    np.clip(alpha, 0, 255, out=alpha)
+    fade_in &= alpha < 255
+
+def visible_particles(system, margin=10):
+    """Return screen positions and indices of the live particles near the viewport"""
+    count = system.count
+    screen_x = system.x[:count] - camera_x
+    screen_y = system.y[:count] - camera_y
+    visible = ((system.alpha[:count] >= 1) &
+               (screen_x >= -margin) & (screen_x <= VIEWPORT_WIDTH + margin) &
+               (screen_y >= -margin) & (screen_y <= VIEWPORT_HEIGHT + margin))
+    indices = np.flatnonzero(visible)
+    return screen_x[indices], screen_y[indices], indices
+
+def shake_offsets(count):
+    """Per-particle screen shake offsets (zero when the screen isn't shaking)"""
+    if not screen_shake:
+        return 0, 0
+    return (particle_rng.integers(-shake_intensity, shake_intensity, count, endpoint=True),
+            particle_rng.integers(-shake_intensity, shake_intensity, count, endpoint=True))
 
 def draw_particles():
     """Draw all particles"""
-    particle_surf = pygame.Surface((VIEWPORT_WIDTH, VIEWPORT_HEIGHT), pygame.SRCALPHA)
-    
-    for particle in particles:
-        # Calculate current alpha
-        alpha = min(255, max(0, int(particle['alpha'])))
-        if alpha <= 0:
-            continue
-        
-        # Convert world to screen coordinates
-        screen_x, screen_y = world_to_screen(particle['x'], particle['y'])
-        
-        # Skip particles outside the viewport
-        if (screen_x < -10 or screen_x > VIEWPORT_WIDTH + 10 or 
-            screen_y < -10 or screen_y > VIEWPORT_HEIGHT + 10):
-            continue
-            
-        # Apply screen shake offset if active
-        offset_x, offset_y = 0, 0
-        if screen_shake:
-            offset_x = random.randint(-shake_intensity, shake_intensity)
-            offset_y = random.randint(-shake_intensity, shake_intensity)
-            
-        # Draw particle with current alpha
-        pygame.draw.circle(
-            particle_surf, 
-            (*PARTICLE_COLOR, alpha), 
-            (int(screen_x + offset_x), int(screen_y + offset_y)), 
-            particle['size']
-        )
-        
-        # Occasionally draw a small glow
-        if random.random() > 0.9:
-            glow_size = particle['size'] * 2
-            glow_alpha = alpha // 3
-            pygame.draw.circle(
-                particle_surf,
-                (*PARTICLE_COLOR, glow_alpha),
-                (int(screen_x + offset_x), int(screen_y + offset_y)),
-                glow_size
-            )
-    
-    # Draw all particles at once
-    screen.blit(particle_surf, (0, 0))
-
-def generate_maze_walls():
-    global walls
-    walls = []
-    
-    # Safe areas - no walls should be generated here
-    safe_areas = [
-        # Player area
-        pygame.Rect(player_x - 150, player_y - 150, player_size + 300, player_size + 300),
-        # Node area
-        pygame.Rect(node_x - 150, node_y - 150, node_radius * 2 + 300, node_radius * 2 + 300)
-    ]
+    screen_xs, screen_ys, indices = visible_particles(particles)
+    offset_x, offset_y = shake_offsets(len(indices))
     
-    # Number of walls based on world size (scale up from original)
-    world_scale_factor = (WORLD_WIDTH * WORLD_HEIGHT) / (800 * 600)
-    scaled_num_walls = int(num_walls * world_scale_factor)
+    # Occasionally draw a small glow
+    glow = particle_rng.random(len(indices)) > 0.9
     
-    # Generate random walls
-    attempts = 0
-    while len(walls) < scaled_num_walls and attempts < 200:
-        attempts += 1
-        x = random.randint(50, WORLD_WIDTH - wall_width - 50)
-        y = random.randint(50, WORLD_HEIGHT - wall_height - 50)
-        
-        # Create a rectangle for collision detection
-        wall_rect = pygame.Rect(x, y, wall_width, wall_height)
-        
-        # Check if wall overlaps with safe areas
-        overlap = False
-        for area in safe_areas:
-            if wall_rect.colliderect(area):
-                overlap = True
-                break
-        
-        # Check if wall overlaps with other walls
-        for other_wall in walls:
-            if wall_rect.colliderect(other_wall):
-                overlap = True
-                break
-        
-        if not overlap:
-            # Randomly rotate some walls to be horizontal
-            if random.random() > 0.5:
-                walls.append(pygame.Rect(x, y, wall_width, wall_height))
-            else:
-                walls.append(pygame.Rect(x, y, wall_height, wall_width))
+    particle_sprites.draw(screen, screen_xs + offset_x, screen_ys + offset_y,
+                          particles.size[indices], particles.alpha[indices], PARTICLE_COLOR, glow)
 
 def draw_walls():
     # Only draw walls if they are visible (controlled by the disable_walls function)
-    if not walls_visible or len(walls) == 0:
+    if not sim.state.walls.visible or sim.state.walls.maze.empty:
         return
     
-    # Draw the walls with full visibility
-    for wall in walls:
-        # Check if wall is visible on screen
-        if not is_visible_on_screen(wall.x, wall.y, wall.width, wall.height):
+    # Draw the pre-rendered wall chunks covering the viewport
+    wall_layer.draw(screen, camera_x, camera_y, VIEWPORT_WIDTH, VIEWPORT_HEIGHT)
+    
+    # Add glitch effect occasionally - a slice of the wall shifted sideways,
+    # overlaid on the cached layer
+    view_rect = pygame.Rect(camera_x, camera_y, VIEWPORT_WIDTH, VIEWPORT_HEIGHT)
+    for wall in sim.state.walls.maze.query(view_rect):
+        if cosmetic_rng.random() <= 0.95:
             continue
-        
-        # Convert world to screen coordinates
-        screen_x, screen_y = world_to_screen(wall.x, wall.y)
-        
-        # Create wall surface with alpha
-        wall_surf = pygame.Surface((wall.width, wall.height), pygame.SRCALPHA)
-        
-        # Draw main wall with full opacity
-        pygame.draw.rect(wall_surf, (*WALL_COLOR, 200), (0, 0, wall.width, wall.height))
-        
-        # Add glitch effect occasionally
-        if random.random() > 0.95:
-            glitch_y = random.randint(0, wall.height - 5)
-            glitch_height = random.randint(2, 5)
-            glitch_offset = random.randint(-2, 2)
-            if glitch_offset != 0 and glitch_y + glitch_height < wall.height:
-                section = wall_surf.subsurface((0, glitch_y, wall.width, glitch_height)).copy()
-                wall_surf.blit(section, (glitch_offset, glitch_y))
-        
-        # Draw the wall at the exact screen coordinates
-        screen.blit(wall_surf, (screen_x, screen_y))
-        
-        # For debugging - uncomment to visualize wall collision boxes
-        # pygame.draw.rect(screen, (255, 0, 0), pygame.Rect(screen_x, screen_y, wall.width, wall.height), 1)
+        glitch_y = cosmetic_rng.randint(0, wall.height - 5)
+        glitch_height = cosmetic_rng.randint(2, 5)
+        glitch_offset = cosmetic_rng.randint(-2, 2)
+        if glitch_offset != 0 and glitch_y + glitch_height < wall.height:
+            section = pygame.Rect(wall.x + glitch_offset, wall.y + glitch_y, wall.width, glitch_height).clip(wall)
+            screen_x, screen_y = world_to_screen(section.x, section.y)
+            screen.blit(wall_glitch_surf, (screen_x, screen_y), (0, 0, section.width, section.height))
 
 def draw_transition_effect():
-    # Create static effect for transition
-    static_surface = pygame.Surface((VIEWPORT_WIDTH, VIEWPORT_HEIGHT), pygame.SRCALPHA)
-    
     # Calculate static intensity based on transition progress
     # Most intense in the middle of the transition
     progress = transition_timer / transition_duration
     intensity = 180 if progress < 0.5 else 180 * (1 - progress) * 2
     
-    # Draw random static pixels
-    for _ in range(5000):
-        x = random.randint(0, VIEWPORT_WIDTH - 1)
-        y = random.randint(0, VIEWPORT_HEIGHT - 1)
-        size = random.randint(1, 3)
-        alpha = random.randint(int(intensity * 0.3), int(intensity))
-        color = (STATIC_COLOR[0], STATIC_COLOR[1], STATIC_COLOR[2], alpha)
-        pygame.draw.rect(static_surface, color, (x, y, size, size))
-    
-    screen.blit(static_surface, (0, 0))
-
-def check_wall_collision(new_x, new_y):
-    # Check collision with world boundaries
-    if (new_x < player_size/2 or new_x > WORLD_WIDTH - player_size/2 or
-        new_y < player_size/2 or new_y > WORLD_HEIGHT - player_size/2):
-        return True
-    
-    # Only check wall collisions if walls are visible
-    # This respects the walls_visible flag that is controlled by disable_walls()
-    if walls_visible and len(walls) > 0:
-        # Create a player rectangle at the new position to check for collisions
-        # Player position is the center, rect needs top-left
-        player_rect = pygame.Rect(
-            new_x - player_size/2,  # Convert center coordinates to top-left
-            new_y - player_size/2,  # Convert center coordinates to top-left
-            player_size,
-            player_size
-        )
-        
-        # Check collision with any wall
-        for wall in walls:
-            if player_rect.colliderect(wall):
-                # Deal 1 damage when colliding with walls if damage cooldown expired
-                global player_health, damage_cooldown
-                if damage_cooldown <= 0:
-                    player_health -= 1  # Wall collision deals 1 damage
-                    damage_cooldown = damage_cooldown_duration / 2  # Shorter cooldown for wall collisions
-                    
-                    # Trigger minor screen shake for feedback
-                    trigger_screen_shake(0.1, 2)
-                
-                return True
-    
-    return False
-
-def update_environment():
-    global wall_timer, wall_timer_active, walls_visible
-    
-    # Handle wall timer if active - this is the only function that should
-    # automatically make walls visible again after being disabled
-    if wall_timer_active:
-        wall_timer += clock.get_time() / 1000
-        
-        # Check if wall timer is complete
-        if wall_timer >= wall_hide_duration:
-            walls_visible = True
-            wall_timer_active = False
+    # Cycle through the pre-generated static frames
+    transition_static.draw(screen, intensity, particle_rng)
 
 def draw_grid():
     # Pulse effect
@@ -633,62 +517,71 @@ def draw_grid():
     
     current_alpha = min(255, max(10, int(grid_alpha_base + grid_alpha_pulse)))
     
-    # Create a surface for the grid
-    grid_surface = pygame.Surface((VIEWPORT_WIDTH, VIEWPORT_HEIGHT), pygame.SRCALPHA)
-    
-    # Calculate visible grid area based on camera position
-    start_x = max(0, camera_x - (camera_x % grid_spacing))
-    end_x = min(WORLD_WIDTH, camera_x + VIEWPORT_WIDTH + grid_spacing)
-    start_y = max(0, camera_y - (camera_y % grid_spacing))
-    end_y = min(WORLD_HEIGHT, camera_y + VIEWPORT_HEIGHT + grid_spacing)
-    
-    # Draw vertical lines
-    for world_x in range(int(start_x), int(end_x), grid_spacing):
-        # Convert to screen coordinates
-        screen_x, _ = world_to_screen(world_x, 0)
-        
-        # Add jitter to x position
-        jitter_x = screen_x + random.randint(-grid_jitter, grid_jitter)
-        
-        # Randomly adjust alpha for flickering effect
-        line_alpha = max(10, current_alpha + random.randint(-20, 10))
-        color = (*GRID_COLOR, line_alpha)
-        
-        pygame.draw.line(grid_surface, color, (jitter_x, 0), (jitter_x, VIEWPORT_HEIGHT), 1)
+    # Blit a jittered grid tile aligned to the camera
+    grid_layer.draw(screen, camera_x, camera_y, current_alpha)
+
+def quantized_sin(value, steps=ATLAS_STEPS):
+    """math.sin snapped to a fixed number of levels, so pulsing sprites can be cached"""
+    return round((math.sin(value) + 1) / 2 * steps) / steps * 2 - 1
+
+def quantize(value, steps=ATLAS_STEPS):
+    """Snap a 0-1 value to a fixed number of levels, so sprites depending on it can be cached"""
+    return round(value * steps) / steps
+
+def build_player_sprite(visual_size, glow_color, glow_layers, body_color, highlight_color, line_width):
+    """Pre-composite the player's glow layers and body. The body sits at (pad, pad)."""
+    pad = (glow_layers[-1][0] - visual_size) // 2
+    sprite_size = glow_layers[-1][0]
+    sprite = pygame.Surface((sprite_size, sprite_size), pygame.SRCALPHA)
     
-    # Draw horizontal lines
-    for world_y in range(int(start_y), int(end_y), grid_spacing):
-        # Convert to screen coordinates
-        _, screen_y = world_to_screen(0, world_y)
-        
-        # Add jitter to y position
-        jitter_y = screen_y + random.randint(-grid_jitter, grid_jitter)
+    for glow_size_current, glow_alpha in glow_layers:
+        glow_surf = pygame.Surface((glow_size_current, glow_size_current), pygame.SRCALPHA)
         
-        # Randomly adjust alpha for flickering effect
-        line_alpha = max(10, current_alpha + random.randint(-20, 10))
-        color = (*GRID_COLOR, line_alpha)
+        # Draw angular shape glow
+        points = [
+            (glow_size_current * 0.1, glow_size_current * 0.5),  # Left point
+            (glow_size_current * 0.5, glow_size_current * 0.1),  # Top point
+            (glow_size_current * 0.9, glow_size_current * 0.5),  # Right point
+            (glow_size_current * 0.7, glow_size_current * 0.9),  # Bottom right
+            (glow_size_current * 0.3, glow_size_current * 0.9)   # Bottom left
+        ]
+        pygame.draw.polygon(glow_surf, (*glow_color, glow_alpha), points)
         
-        pygame.draw.line(grid_surface, color, (0, jitter_y), (VIEWPORT_WIDTH, jitter_y), 1)
+        layer_offset = pad - (glow_size_current - visual_size) // 2
+        sprite.blit(glow_surf, (layer_offset, layer_offset))
     
-    screen.blit(grid_surface, (0, 0))
+    # Draw angular, sleek player shape - it's opaque, so it can go straight onto the glow
+    points = [
+        (pad + visual_size * 0.1, pad + visual_size * 0.5),  # Left point
+        (pad + visual_size * 0.5, pad + visual_size * 0.1),  # Top point
+        (pad + visual_size * 0.9, pad + visual_size * 0.5),  # Right point
+        (pad + visual_size * 0.7, pad + visual_size * 0.9),  # Bottom right
+        (pad + visual_size * 0.3, pad + visual_size * 0.9)   # Bottom left
+    ]
+    pygame.draw.polygon(sprite, body_color, points)
+    pygame.draw.polygon(sprite, highlight_color, points, line_width)
+    return sprite
 
 def draw_player():
     # Calculate screen shake offset if active
     offset_x, offset_y = 0, 0
     if screen_shake:
-        offset_x = random.randint(-shake_intensity, shake_intensity)
-        offset_y = random.randint(-shake_intensity, shake_intensity)
+        offset_x = cosmetic_rng.randint(-shake_intensity, shake_intensity)
+        offset_y = cosmetic_rng.randint(-shake_intensity, shake_intensity)
+    
+    player_size = sim.state.player.size
+    ticks = pygame.time.get_ticks()
     
     # Convert world to screen coordinates (player_x and player_y represent the player's center)
-    screen_x, screen_y = world_to_screen(player_x - player_size/2, player_y - player_size/2)  # Convert center to top-left for drawing
+    screen_x, screen_y = world_to_screen(render_player_x - player_size/2, render_player_y - player_size/2)  # Convert center to top-left for drawing
     
     # Calculate visual size (5% larger than collision size)
     visual_size = int(player_size * 1.05)
     
     # Adjust player color based on decoy availability
     decoy_ready_percent = 1.0
-    if not decoy_can_use:
-        decoy_ready_percent = max(0.3, 1 - (decoy_cooldown / decoy_max_cooldown))
+    if not sim.state.decoy.can_use:
+        decoy_ready_percent = quantize(max(0.3, 1 - (sim.state.decoy.cooldown / sim.state.decoy.max_cooldown)))
     
     # Create dynamic player color - ensure all values are valid integers
     dynamic_player_color = (
@@ -698,9 +591,9 @@ def draw_player():
     )
     
     # Modify player color if taking damage (in damage cooldown)
-    if damage_cooldown > 0:
+    if sim.state.player.damage_cooldown > 0:
         # Pulsing red effect when in damage cooldown
-        flash_intensity = abs(math.sin(pygame.time.get_ticks() / 100)) * 0.6 + 0.4
+        flash_intensity = quantize(abs(math.sin(ticks / 100))) * 0.6 + 0.4
         damage_overlay = (255 * flash_intensity, 0, 0)
         
         # Mix the damage overlay with the regular player color
@@ -711,71 +604,38 @@ def draw_player():
         )
     
     # Apply enhanced glow when decoy is fully charged
-    is_fully_charged = decoy_can_use
+    is_fully_charged = sim.state.decoy.can_use
     glow_layers = 4 if is_fully_charged else 3
+    fast_pulse = quantized_sin(ticks / 200)
     
-    # Create glow effect layers - adjust for visual size
-    glow_size = visual_size + 12
+    # Glow layer sizes and alphas - stronger and more layers when fully charged
+    glow_layer_sizes = []
     for i in range(glow_layers):
-        # Calculate glow alpha - stronger and more layers when fully charged
         if is_fully_charged:
             # Pulsing glow effect when ready
-            pulse = (math.sin(pygame.time.get_ticks() / 200) * 0.3 + 0.7)
+            pulse = (fast_pulse * 0.3 + 0.7)
             glow_alpha = max(0, min(255, int((90 * pulse) - (i * 20))))
             glow_size_current = visual_size + 4 + (i * 5)  # Larger glow when ready
         else:
             glow_alpha = max(0, min(255, int((60 * decoy_ready_percent) - (i * 20))))
             glow_size_current = visual_size + 4 + (i * 4)
-        
-        glow_surf = pygame.Surface((glow_size_current, glow_size_current), pygame.SRCALPHA)
-        
-        # Draw angular shape glow
-        points = [
-            (glow_size_current * 0.1, glow_size_current * 0.5),  # Left point
-            (glow_size_current * 0.5, glow_size_current * 0.1),  # Top point
-            (glow_size_current * 0.9, glow_size_current * 0.5),  # Right point
-            (glow_size_current * 0.7, glow_size_current * 0.9),  # Bottom right
-            (glow_size_current * 0.3, glow_size_current * 0.9)   # Bottom left
-        ]
-        
-        # Ensure color values are valid
-        # Enhanced glow color when fully charged
-        if is_fully_charged:
-            # Create a brighter blue-cyan glow when ready
-            pulse_factor = (math.sin(pygame.time.get_ticks() / 200) * 0.4 + 0.6)
-            glow_color = (
-                max(0, min(255, int(30 + 40 * pulse_factor))),  # Add some cyan tint
-                max(0, min(255, int(dynamic_player_color[1] + 50 * pulse_factor))),
-                max(0, min(255, int(dynamic_player_color[2] + 30 * pulse_factor))),
-                glow_alpha
-            )
-        else:
-            glow_color = (
-                max(0, min(255, dynamic_player_color[0])),
-                max(0, min(255, dynamic_player_color[1])),
-                max(0, min(255, dynamic_player_color[2])),
-                glow_alpha
-            )
-        
-        pygame.draw.polygon(glow_surf, glow_color, points)
-        
-        # Position and draw with screen shake offset - adjust for larger visual size
-        visual_offset = (visual_size - player_size) // 2
-        pos_x = screen_x - (glow_size_current - visual_size) // 2 + offset_x - visual_offset
-        pos_y = screen_y - (glow_size_current - visual_size) // 2 + offset_y - visual_offset
-        screen.blit(glow_surf, (pos_x, pos_y))
-    
-    # Create main player surface with increased visual size
-    player_surf = pygame.Surface((visual_size, visual_size), pygame.SRCALPHA)
+        glow_layer_sizes.append((glow_size_current, glow_alpha))
     
-    # Draw angular, sleek player shape
-    points = [
-        (visual_size * 0.1, visual_size * 0.5),  # Left point
-        (visual_size * 0.5, visual_size * 0.1),  # Top point
-        (visual_size * 0.9, visual_size * 0.5),  # Right point
-        (visual_size * 0.7, visual_size * 0.9),  # Bottom right
-        (visual_size * 0.3, visual_size * 0.9)   # Bottom left
-    ]
+    # Enhanced glow color when fully charged
+    if is_fully_charged:
+        # Create a brighter blue-cyan glow when ready
+        pulse_factor = (fast_pulse * 0.4 + 0.6)
+        glow_color = (
+            max(0, min(255, int(30 + 40 * pulse_factor))),  # Add some cyan tint
+            max(0, min(255, int(dynamic_player_color[1] + 50 * pulse_factor))),
+            max(0, min(255, int(dynamic_player_color[2] + 30 * pulse_factor)))
+        )
+    else:
+        glow_color = (
+            max(0, min(255, dynamic_player_color[0])),
+            max(0, min(255, dynamic_player_color[1])),
+            max(0, min(255, dynamic_player_color[2]))
+        )
     
     # Draw main shape with dynamic color - ensure values are valid
     clamped_color = (
@@ -786,18 +646,16 @@ def draw_player():
     
     # Enhance player color when fully charged
     if is_fully_charged:
-        pulse = (math.sin(pygame.time.get_ticks() / 300) * 0.3 + 0.7)
+        pulse = (quantized_sin(ticks / 300) * 0.3 + 0.7)
         clamped_color = (
             max(0, min(255, int(clamped_color[0] + 20 * pulse))),
             max(0, min(255, int(clamped_color[1] + 30 * pulse))),
             max(0, min(255, int(clamped_color[2] + 40 * pulse)))
         )
     
-    pygame.draw.polygon(player_surf, clamped_color, points)
-    
     # Create highlight color - pulsing when ready
-    if decoy_can_use:
-        pulse = (math.sin(pygame.time.get_ticks() / 200) * 0.4 + 0.6)  # Faster, more noticeable pulse
+    if sim.state.decoy.can_use:
+        pulse = (fast_pulse * 0.4 + 0.6)  # Faster, more noticeable pulse
         highlight_color = (
             max(0, min(255, int(clamped_color[0] + 70 * pulse))),
             max(0, min(255, int(clamped_color[1] + 70 * pulse))),
@@ -812,24 +670,53 @@ def draw_player():
     
     # Draw highlighted edges with thicker line when ready
     line_width = 2 if is_fully_charged else 1
-    pygame.draw.polygon(player_surf, highlight_color, points, line_width)
+    
+    glow_layer_sizes = tuple(glow_layer_sizes)
+    key = ('player', visual_size, glow_color, glow_layer_sizes, clamped_color, highlight_color, line_width)
+    sprite = sprite_atlas.get(key, lambda: build_player_sprite(
+        visual_size, glow_color, glow_layer_sizes, clamped_color, highlight_color, line_width))
     
     # Position and draw with screen shake offset - adjust position to center larger visual on the player
     visual_offset = (visual_size - player_size) // 2
-    screen.blit(player_surf, (screen_x + offset_x - visual_offset, screen_y + offset_y - visual_offset))
+    pad = (glow_layer_sizes[-1][0] - visual_size) // 2
+    screen.blit(sprite, (screen_x + offset_x - visual_offset - pad, screen_y + offset_y - visual_offset - pad))
     
     # Debug: Uncomment to visualize player collision box
     # pygame.draw.rect(screen, (255, 0, 0), (screen_x + offset_x, screen_y + offset_y, player_size, player_size), 1)
 
+def build_node_sprite(square_size, color, glow_alpha, line_color):
+    """Pre-composite the node's glow, microchip square and lines around the sprite's center"""
+    glow_size = square_size * 1.5
+    sprite = pygame.Surface((glow_size, glow_size), pygame.SRCALPHA)
+    center = glow_size // 2
+    
+    # Draw glow effect (larger semi-transparent square)
+    glow_rect = pygame.Rect(0, 0, glow_size, glow_size)
+    pygame.draw.rect(sprite, (*color, glow_alpha), glow_rect, border_radius=int(glow_size//10))
+    
+    # Draw the node as a square - it's opaque, so it can go straight onto the glow
+    square_rect = pygame.Rect(center - square_size // 2, center - square_size // 2, square_size, square_size)
+    pygame.draw.rect(sprite, color, square_rect, border_radius=int(square_size//10))
+    
+    # Draw three evenly spaced horizontal lines for microchip look
+    line_length = square_size - 6
+    line_start_x = center - line_length // 2
+    y_offset = square_size // 4
+    for y in [center - y_offset, center, center + y_offset]:
+        pygame.draw.line(sprite, line_color, (line_start_x, y), (line_start_x + line_length, y), 2)
+    return sprite
+
 def draw_security_node():
     global node_pulse_time, node_current_color, node_is_bright
     
+    node_radius = sim.state.node.radius
+    
     # Check if node is visible on screen first
-    if not is_visible_on_screen(node_x - node_radius, node_y - node_radius, node_radius * 2, node_radius * 2):
+    if not is_visible_on_screen(sim.state.node.x - node_radius, sim.state.node.y - node_radius, node_radius * 2, node_radius * 2):
         return
     
     # Convert world to screen coordinates
-    screen_x, screen_y = world_to_screen(node_x, node_y)
+    screen_x, screen_y = world_to_screen(sim.state.node.x, sim.state.node.y)
     
     # Update pulse timer
     node_pulse_time += clock.get_time() / 1000  # Convert to seconds
@@ -842,151 +729,22 @@ def draw_security_node():
     
     # Calculate square size based on original circle radius
     square_size = node_radius * 2
-    square_rect = pygame.Rect(
-        screen_x - square_size // 2,
-        screen_y - square_size // 2,
-        square_size,
-        square_size
-    )
     
-    # Draw glow effect (larger semi-transparent square)
+    # Draw the glow, square and microchip lines as one pre-composited sprite
     glow_size = square_size * 1.5
-    glow_surface = pygame.Surface((glow_size, glow_size), pygame.SRCALPHA)
-    glow_rect = pygame.Rect(0, 0, glow_size, glow_size)
     glow_alpha = 100 if node_is_bright else 50
-    pygame.draw.rect(glow_surface, (*node_current_color, glow_alpha), glow_rect, border_radius=int(glow_size//10))
-    screen.blit(glow_surface, (screen_x - glow_size // 2, screen_y - glow_size // 2))
-    
-    # Draw the node as a square
-    pygame.draw.rect(screen, node_current_color, square_rect, border_radius=int(square_size//10))
-    
-    # Draw three horizontal lines for microchip look
     line_color = (0, 0, 0) if node_is_bright else (255, 255, 255)  # Contrasting color
-    line_length = square_size - 6
-    line_start_x = screen_x - line_length // 2
-    
-    # Calculate positions for three evenly spaced lines
-    y_offset = square_size // 4
-    line_y_positions = [
-        screen_y - y_offset,
-        screen_y,
-        screen_y + y_offset
-    ]
-    
-    # Draw the lines
-    for y in line_y_positions:
-        pygame.draw.line(screen, line_color, (line_start_x, y), (line_start_x + line_length, y), 2)
+    key = ('node', square_size, node_current_color, glow_alpha, line_color)
+    sprite = sprite_atlas.get(key, lambda: build_node_sprite(square_size, node_current_color, glow_alpha, line_color))
+    screen.blit(sprite, (screen_x - glow_size // 2, screen_y - glow_size // 2))
 
 def draw_firewall():
-    global firewall_x, firewall_y, firewall_vertical_direction
-    
-    # Move firewall based on level and decoy presence
-    if decoy_active:
-        # Calculate distance to decoy for variable speed
-        dx = decoy_x - firewall_x
-        dy = decoy_y - (firewall_y + firewall_height/2)  # Target middle of firewall to decoy
-        distance = math.sqrt(dx*dx + dy*dy)
-        
-        # Horizontal attraction to decoy - stronger at higher levels
-        attraction_multiplier = 1.0 + (current_level * 0.2)  # Increases with level
-        
-        if firewall_x < decoy_x:
-            # Speed increases as distance increases - capped at 2x normal speed
-            speed_factor = min(2.0, max(1.0, distance / 300))
-            firewall_x += firewall_speed * speed_factor * attraction_multiplier
-        elif firewall_x > decoy_x:
-            speed_factor = min(2.0, max(1.0, distance / 300))
-            firewall_x -= firewall_speed * speed_factor * attraction_multiplier
-            
-        # Vertical movement toward decoy - all levels now, but stronger at higher levels
-        vertical_attraction = 0.5 + (current_level * 0.25)  # Increases with level
-        
-        # Adjust vertical movement based on decoy position
-        if abs(dy) > 10:  # Only move if decoy is not already aligned (within 10 pixels)
-            # Make vertical movement proportional to distance but with a cap
-            vert_speed_factor = min(1.5, max(0.5, abs(dy) / 200))
-            vert_step = firewall_vertical_speed * vert_speed_factor * vertical_attraction
-            
-            if firewall_y + firewall_height/2 < decoy_y:  # If decoy is below firewall center
-                firewall_y += vert_step
-            else:  # If decoy is above firewall center
-                firewall_y -= vert_step
-                
-        # Add subtle oscillation to make movement more natural
-        if random.random() > 0.8:  # 20% chance each frame
-            firewall_y += random.uniform(-1.0, 1.0)
-    else:
-        # Normal movement - depends on level
-        if current_level == 1:
-            # Level 1: Simple rightward movement with basic vertical bouncing
-            firewall_x += firewall_speed
-            
-            # Simple up/down bouncing movement
-            firewall_y += firewall_vertical_speed * firewall_vertical_direction
-            
-            # Bounce if hitting top or bottom of world
-            if firewall_y <= 0:
-                firewall_vertical_direction = 1
-            elif firewall_y + firewall_height >= WORLD_HEIGHT:
-                firewall_vertical_direction = -1
-                
-        elif current_level == 2:
-            # Level 2: Occasional speed variations with more vertical movement
-            if random.random() > 0.95:
-                # Randomly adjust speed slightly for brief moments
-                speed_variation = random.uniform(0.8, 1.2)
-                firewall_x += firewall_speed * speed_variation
-            else:
-                firewall_x += firewall_speed
-                
-            # Faster vertical movement
-            firewall_y += (firewall_vertical_speed * 1.5) * firewall_vertical_direction
-            
-            # Occasional direction change (2% chance per frame)
-            if random.random() > 0.98:
-                firewall_vertical_direction *= -1
-                
-            # Bounce if hitting top or bottom
-            if firewall_y <= 0:
-                firewall_vertical_direction = 1
-            elif firewall_y + firewall_height >= WORLD_HEIGHT:
-                firewall_vertical_direction = -1
-                
-        else:  # Level 3+
-            # Level 3+: More smart tracking behavior
-            # Horizontal tracking
-            if random.random() > 0.7:  # 30% chance to track player
-                if player_x > firewall_x + VIEWPORT_WIDTH/2:  # Only accelerate if player is far ahead
-                    firewall_x += firewall_speed * 1.3
-                else:
-                    firewall_x += firewall_speed * 0.9  # Slow down when close to player
-            else:
-                firewall_x += firewall_speed
-                
-            # Vertical tracking - attempt to move toward player's y position
-            if random.random() > 0.5:  # 50% chance to adjust vertically toward player
-                if player_y > firewall_y + firewall_height/2:
-                    firewall_y += firewall_vertical_speed * 2
-                elif player_y < firewall_y + firewall_height/2:
-                    firewall_y -= firewall_vertical_speed * 2
-            else:
-                # Continue in current direction
-                firewall_y += firewall_vertical_speed * 2 * firewall_vertical_direction
-                
-                # Bounce if hitting boundaries
-                if firewall_y <= 0:
-                    firewall_vertical_direction = 1
-                elif firewall_y + firewall_height >= WORLD_HEIGHT:
-                    firewall_vertical_direction = -1
-        
-        # Reset if off screen horizontally
-        if firewall_x > WORLD_WIDTH:
-            firewall_x = -firewall_width
-            # Randomize vertical position when coming back
-            firewall_y = random.randint(0, WORLD_HEIGHT - firewall_height)
+    # Movement happens in the simulation; this only draws the current position
+    firewall_width, firewall_height = sim.state.firewall.width, sim.state.firewall.height
+    current_level = sim.state.current_level
     
     # Convert world to screen coordinates
-    screen_x, screen_y = world_to_screen(firewall_x, firewall_y)
+    screen_x, screen_y = world_to_screen(render_firewall_x, render_firewall_y)
     
     # Check if firewall is visible on screen
     if screen_x < -firewall_width or screen_x > VIEWPORT_WIDTH:
@@ -1003,7 +761,7 @@ def draw_firewall():
         flicker_intensity = firewall_flicker_intensity * 0.8
     
     # Apply flicker effect
-    flicker_alpha = min(255, max(100, firewall_alpha_base + random.randint(-int(flicker_intensity), int(flicker_intensity))))
+    flicker_alpha = min(255, max(100, firewall_alpha_base + cosmetic_rng.randint(-int(flicker_intensity), int(flicker_intensity))))
     
     # Draw the firewall line with flicker
     firewall_color_with_alpha = (*FIREWALL_COLOR, flicker_alpha)
@@ -1013,8 +771,8 @@ def draw_firewall():
     if current_level >= 2:
         # Level 2+: Add light data particle effects
         for _ in range(current_level - 1):  # More particles at higher levels
-            particle_y = random.randint(0, firewall_height)
-            particle_height = random.randint(2, 5)
+            particle_y = cosmetic_rng.randint(0, firewall_height)
+            particle_height = cosmetic_rng.randint(2, 5)
             pygame.draw.rect(firewall_surf, (255, 255, 255, 150), 
                              (0, particle_y, firewall_width, particle_height))
     
@@ -1036,19 +794,19 @@ def draw_firewall():
         glitch_chance = 0.96  # 4% chance at level 2
     # Level 3+ uses the default 5% chance
     
-    if random.random() > glitch_chance:
-        glitch_y = random.randint(0, firewall_height - 50)
-        glitch_height = random.randint(10, 40)
+    if cosmetic_rng.random() > glitch_chance:
+        glitch_y = cosmetic_rng.randint(0, firewall_height - 50)
+        glitch_height = cosmetic_rng.randint(10, 40)
         
         # Level 1 has minimal glitches
         if current_level == 1:
-            glitch_offset = random.choice([-1, 1]) # Only shift by 1 pixel
+            glitch_offset = cosmetic_rng.choice([-1, 1]) # Only shift by 1 pixel
         # Level 2 has moderate glitches
         elif current_level == 2:
-            glitch_offset = random.randint(-2, 2)
+            glitch_offset = cosmetic_rng.randint(-2, 2)
         # Level 3+ has more extreme glitches
         else:
-            glitch_offset = random.randint(-4, 4)
+            glitch_offset = cosmetic_rng.randint(-4, 4)
             
         if glitch_offset != 0:
             section = firewall_surf.subsurface((0, glitch_y, firewall_width, glitch_height)).copy()
@@ -1056,265 +814,18 @@ def draw_firewall():
     
     screen.blit(firewall_surf, (screen_x, screen_y))
 
-def reset_player_position():
-    global player_x, player_y, show_alert, firewall_alert_time
-    player_x = player_start_x
-    player_y = player_start_y
-    show_alert = True
-    firewall_alert_time = 0
-    
-    # Trigger intense screen shake
-    trigger_screen_shake(0.4, 5)
-    
-    # Play impact sound
-    if sound_enabled:
-        try:
-            impact_sound.play()
-        except:
-            pass
-
-def spawn_decoy():
-    global decoy_active, decoy_x, decoy_y, decoy_duration, decoy_can_use, decoy_cooldown, decoy_count, scanner_active, tutorial_active
-    if decoy_can_use:
-        decoy_active = True
-        decoy_x = player_x
-        decoy_y = player_y
-        decoy_duration = decoy_max_duration
-        decoy_can_use = False
-        decoy_cooldown = decoy_max_cooldown
-        decoy_count += 1
-        
-        # Show tutorial on first use
-        global show_decoy_tutorial
-        if show_decoy_tutorial and decoy_count == 1:
-            tutorial_active = True
-        
-        # If player has used decoy twice or more and not level 1, spawn a scanner
-        if decoy_count >= 2 and current_level > 1:
-            spawn_scanner()
-
-def spawn_scanner():
-    global scanner_active, scanner_x, scanner_y, scanner_trail, scanner_speed
-    
-    # Don't spawn scanners in level 1
-    if current_level == 1:
-        return
-    
-    # Spawn from firewall position
-    scanner_active = True
-    scanner_x = firewall_x + firewall_width // 2
-    scanner_y = random.randint(50, WORLD_HEIGHT - 50)  # Random y position
-    scanner_trail = []  # Reset trail
-    
-    # Adjust scanner speed based on level
-    if current_level == 2:
-        scanner_speed = 4  # Slower in level 2
-    else:  # Level 3+
-        scanner_speed = 6  # Faster in level 3+
-
-def update_decoy():
-    global decoy_active, decoy_duration, decoy_cooldown, decoy_can_use
-    
-    # Update decoy timer if active
-    if decoy_active:
-        decoy_duration -= clock.get_time() / 1000
-        if decoy_duration <= 0:
-            decoy_active = False
-    
-    # Update cooldown if not ready
-    if not decoy_can_use:
-        decoy_cooldown -= clock.get_time() / 1000
-        if decoy_cooldown <= 0:
-            decoy_can_use = True
-
-def update_scanner():
-    global scanner_active, scanner_x, scanner_y, decoy_active
-    
-    if not scanner_active or not decoy_active:
-        # Reset scanner if decoy disappears
-        if scanner_active and not decoy_active:
-            scanner_active = False
-        return
-    
-    # Calculate direction to decoy
-    decoy_center_x = decoy_x + player_size // 2
-    decoy_center_y = decoy_y + player_size // 2
-    
-    dx = decoy_center_x - scanner_x
-    dy = decoy_center_y - scanner_y
-    
-    # Normalize direction
-    distance = max(0.1, math.sqrt(dx * dx + dy * dy))
-    dx /= distance
-    dy /= distance
-    
-    # Movement behavior varies by level
-    if current_level == 2:
-        # Level 2: Simple, somewhat inaccurate tracking
-        # Add some randomness to movement (makes it less accurate)
-        dx += random.uniform(-0.2, 0.2)
-        dy += random.uniform(-0.2, 0.2)
-        
-        # Re-normalize after adding randomness
-        new_dist = max(0.1, math.sqrt(dx * dx + dy * dy))
-        dx /= new_dist
-        dy /= new_dist
-        
-        # Move scanner toward decoy at constant speed
-        scanner_x += dx * scanner_speed
-        scanner_y += dy * scanner_speed
-        
-    else:  # Level 3+
-        # Level 3: Advanced tracking with variable speed and prediction
-        
-        # Speed varies with distance - speeds up when far, slows when close
-        speed_factor = min(1.5, max(0.8, distance / 200))
-        
-        # Add slight prediction to target ahead of the decoy's position
-        # This makes the scanner appear "smarter"
-        if random.random() > 0.5:  # 50% chance to use prediction
-            # We don't have actual decoy velocity, but we can estimate based on player
-            # movement or just provide a fixed "prediction" behavior
-            prediction_x = decoy_center_x + random.randint(-10, 30)  # Predict slightly ahead
-            prediction_y = decoy_center_y + random.randint(-20, 20)
-            
-            # Calculate direction to prediction point instead
-            pred_dx = prediction_x - scanner_x
-            pred_dy = prediction_y - scanner_y
-            pred_dist = max(0.1, math.sqrt(pred_dx * pred_dx + pred_dy * pred_dy))
-            
-            # Blend the original and prediction directions
-            dx = (dx + (pred_dx / pred_dist)) / 2
-            dy = (dy + (pred_dy / pred_dist)) / 2
-            
-            # Re-normalize
-            final_dist = max(0.1, math.sqrt(dx * dx + dy * dy))
-            dx /= final_dist
-            dy /= final_dist
-        
-        # Move scanner with variable speed
-        scanner_x += dx * scanner_speed * speed_factor
-        scanner_y += dy * scanner_speed * speed_factor
-        
-        # Occasionally make sharp movements to appear more aggressive
-        if random.random() > 0.95:  # 5% chance
-            scanner_x += dx * scanner_speed * 1.5
-            scanner_y += dy * scanner_speed * 1.5
-    
-    # Check if scanner reached decoy
-    if check_scanner_decoy_collision():
-        destroy_decoy()
-
-def destroy_decoy():
-    global decoy_active, scanner_active
-    decoy_active = False
-    scanner_active = False
-
-def check_scanner_decoy_collision():
-    if not scanner_active or not decoy_active:
-        return False
-    
-    # Calculate center of decoy
-    decoy_center_x = decoy_x + player_size // 2
-    decoy_center_y = decoy_y + player_size // 2
-    
-    # Calculate distance between scanner and decoy center
-    distance = math.sqrt((scanner_x - decoy_center_x) ** 2 + (scanner_y - decoy_center_y) ** 2)
-    
-    # Check if collision occurred
-    if distance < (scanner_radius + player_size // 2):
-        return True
-    return False
-
-def check_node_collision():
-    """Check if player has collided with the security node, return True if collided"""
-    # Calculate the player's rectangle
-    player_rect = pygame.Rect(player_x, player_y, player_size, player_size)
-    
-    # Calculate the node's square rectangle
-    square_size = node_radius * 2
-    node_rect = pygame.Rect(
-        node_x - square_size // 2,
-        node_y - square_size // 2,
-        square_size,
-        square_size
-    )
-    
-    # Safety check - make sure node is in a valid position for this level
-    min_node_x = WORLD_WIDTH * 0.75  # Node should be in the right quarter of the world
-    if node_x < min_node_x:
-        # This might cause premature level completion, but this is a silent check now
-        pass
-    
-    # Check if rectangles overlap
-    collision = player_rect.colliderect(node_rect)
-    
-    # If collision, trigger screen shake for feedback
-    if collision:
-        trigger_screen_shake(0.3, 8)
-        
-    return collision
-
-def check_firewall_collision():
-    # Check if player overlaps with firewall
-    player_right = player_x + player_size
-    player_bottom = player_y + player_size
-    firewall_right = firewall_x + firewall_width
-    firewall_bottom = firewall_y + firewall_height
-    
-    # Check both horizontal and vertical intersection
-    horizontal_overlap = ((firewall_x <= player_x < firewall_right) or 
-                        (firewall_x < player_right <= firewall_right) or
-                        (player_x <= firewall_x and player_right >= firewall_right))
-    
-    vertical_overlap = ((firewall_y <= player_y < firewall_bottom) or
-                      (firewall_y < player_bottom <= firewall_bottom) or
-                      (player_y <= firewall_y and player_bottom >= firewall_bottom))
-    
-    # Both horizontal and vertical components must overlap for a collision
-    collision = horizontal_overlap and vertical_overlap
-    
-    # If collision occurred and damage cooldown has expired, deal damage
-    global player_health, damage_cooldown, show_alert
-    if collision and damage_cooldown <= 0:
-        player_health -= 5  # Firewall deals 5 damage
-        damage_cooldown = damage_cooldown_duration  # Start cooldown
-        show_alert = True  # Show firewall alert
-        
-        # Play impact sound if available
-        if sound_enabled:
-            impact_sound.play()
-        
-        # Trigger screen shake for better feedback
-        trigger_screen_shake()
-    
-    return collision
-
-def draw_decoy():
-    if not decoy_active:
-        return
-    
-    # Check if decoy is visible on screen
-    if not is_visible_on_screen(decoy_x, decoy_y, player_size, player_size):
-        return
-    
-    # Convert world to screen coordinates
-    screen_x, screen_y = world_to_screen(decoy_x, decoy_y)
-    
-    # Calculate current alpha based on remaining duration
-    fade_factor = decoy_duration / decoy_max_duration
-    current_alpha = int(decoy_alpha * fade_factor)
-    
-    # Create base decoy surface
+def build_decoy_sprite(player_size, variant, base_decoy_alpha):
+    """Decoy square over one of DECOY_STATIC_VARIANTS fixed static patterns"""
     decoy_surf = pygame.Surface((player_size, player_size), pygame.SRCALPHA)
+    pattern = random.Random(variant)
     
     # Add static effect
     for _ in range(20):
-        static_x = random.randint(0, player_size - 1)
-        static_y = random.randint(0, player_size - 1)
-        static_width = random.randint(1, 5)
-        static_height = random.randint(1, 5)
-        static_alpha = random.randint(50, 150)
+        static_x = pattern.randint(0, player_size - 1)
+        static_y = pattern.randint(0, player_size - 1)
+        static_width = pattern.randint(1, 5)
+        static_height = pattern.randint(1, 5)
+        static_alpha = pattern.randint(50, 150)
         static_color = (*DECOY_COLOR, static_alpha)
         
         if static_x + static_width > player_size:
@@ -1326,34 +837,90 @@ def draw_decoy():
             pygame.draw.rect(decoy_surf, static_color, (static_x, static_y, static_width, static_height))
     
     # Create the main decoy shape
-    base_decoy_alpha = min(200, current_alpha) 
     pygame.draw.rect(decoy_surf, (*DECOY_COLOR, base_decoy_alpha), (0, 0, player_size, player_size), border_radius=3)
+    return decoy_surf
+
+def build_decoy_glow(glow_size, glow_alpha):
+    glow_surf = pygame.Surface((glow_size, glow_size), pygame.SRCALPHA)
+    pygame.draw.rect(glow_surf, (*DECOY_COLOR, glow_alpha), (0, 0, glow_size, glow_size), border_radius=5)
+    return glow_surf
+
+def draw_decoy():
+    decoy = sim.state.decoy
+    if not decoy.active:
+        return
+    
+    player_size = sim.state.player.size
+    
+    # Check if decoy is visible on screen
+    if not is_visible_on_screen(decoy.x, decoy.y, player_size, player_size):
+        return
+    
+    # Convert world to screen coordinates
+    screen_x, screen_y = world_to_screen(decoy.x, decoy.y)
+    
+    # Calculate current alpha based on remaining duration
+    fade_factor = quantize(decoy.duration / decoy.max_duration, ATLAS_STEPS * 2)
+    current_alpha = int(decoy_alpha * fade_factor)
+    
+    # Pick one of the pre-generated static patterns each frame
+    variant = cosmetic_rng.randrange(DECOY_STATIC_VARIANTS)
+    base_decoy_alpha = min(200, current_alpha)
+    decoy_surf = sprite_atlas.get(('decoy', player_size, variant, base_decoy_alpha),
+                                  lambda: build_decoy_sprite(player_size, variant, base_decoy_alpha))
     
     # Add glow
     glow_size = player_size + 10
-    glow_surf = pygame.Surface((glow_size, glow_size), pygame.SRCALPHA)
     glow_alpha = min(50, current_alpha // 2)
-    pygame.draw.rect(glow_surf, (*DECOY_COLOR, glow_alpha), (0, 0, glow_size, glow_size), border_radius=5)
+    glow_surf = sprite_atlas.get(('decoy_glow', glow_size, glow_alpha), lambda: build_decoy_glow(glow_size, glow_alpha))
     
     # Draw the glow and decoy
     screen.blit(glow_surf, (screen_x - 5, screen_y - 5))
     screen.blit(decoy_surf, (screen_x, screen_y))
     
     # Add occasional glitch displacement effect
-    if random.random() > 0.9:
-        glitch_offset_x = random.randint(-3, 3)
-        glitch_offset_y = random.randint(-3, 3)
-        glitch_surf = decoy_surf.copy()
+    if cosmetic_rng.random() > 0.9:
+        glitch_offset_x = cosmetic_rng.randint(-3, 3)
+        glitch_offset_y = cosmetic_rng.randint(-3, 3)
         glitch_alpha = min(100, current_alpha // 2)
-        glitch_surf.set_alpha(glitch_alpha)
-        screen.blit(glitch_surf, (screen_x + glitch_offset_x, screen_y + glitch_offset_y))
+        decoy_surf.set_alpha(glitch_alpha)
+        screen.blit(decoy_surf, (screen_x + glitch_offset_x, screen_y + glitch_offset_y))
+        decoy_surf.set_alpha(None)
+
+def build_scanner_sprite(color, radius, outer_radius, line_step):
+    """
+    Scanner head centered in its sprite. outer_radius and line_step are None
+    for the plain level 2 circle; line_step is the scanning line's angle in
+    ATLAS_STEPS * 4 steps per turn.
+    """
+    extent = radius + 9
+    sprite = pygame.Surface((extent * 2 + 1, extent * 2 + 1), pygame.SRCALPHA)
+    center = (extent, extent)
+    
+    # Inner circle
+    pygame.draw.circle(sprite, color, center, radius)
+    
+    if outer_radius is not None:
+        # More advanced scanner design for level 3+
+        pygame.draw.circle(sprite, color, center, outer_radius, 1)
+        
+        # Scanning lines
+        line_angle = line_step * 360 / (ATLAS_STEPS * 4)
+        line_end_x = extent + math.cos(math.radians(line_angle)) * (radius + 8)
+        line_end_y = extent + math.sin(math.radians(line_angle)) * (radius + 8)
+        pygame.draw.line(sprite, color, center, (line_end_x, line_end_y), 1)
+    return sprite
 
 def draw_scanner():
-    global scanner_trail, scanner_x, scanner_y
+    global scanner_trail
     
-    if not scanner_active or not decoy_active:
+    if not sim.state.scanner.active or not sim.state.decoy.active:
         return
     
+    scanner_x, scanner_y = render_scanner_x, render_scanner_y
+    scanner_radius = sim.state.scanner.radius
+    current_level = sim.state.current_level
+    
     # Check if scanner is visible on screen
     if not is_visible_on_screen(scanner_x - scanner_radius*2, scanner_y - scanner_radius*2, 
                                 scanner_radius*4, scanner_radius*4):
@@ -1407,221 +974,145 @@ def draw_scanner():
             pygame.draw.circle(screen, (*scanner_color, alpha), (screen_trail_x, screen_trail_y), 
                                scanner_radius * (i / max_trail) * (0.8 + 0.4 * pulse))
     
-    # Draw the scanner with flicker effect
-    flicker = random.randint(-scanner_flicker_intensity, scanner_flicker_intensity)
-    scanner_alpha = min(255, max(100, 200 + flicker))
-    
-    # Level-specific scanner appearance
+    # Draw the scanner - the screen has no per-pixel alpha, so its flicker alpha
+    # never showed and the sprite is drawn opaque
     if current_level == 2:
         # Simple circle for level 2
-        pygame.draw.circle(screen, (*scanner_color, scanner_alpha), (screen_x, screen_y), scanner_radius)
+        key = ('scanner', scanner_color, scanner_radius, None, None)
     else:  # Level 3+
-        # More advanced scanner design for level 3+
-        # Inner circle
-        pygame.draw.circle(screen, (*scanner_color, scanner_alpha), (screen_x, screen_y), scanner_radius)
-        
-        # Outer ring pulsing
+        # Outer ring pulsing and scanning line rotating around the inner circle
         outer_radius = scanner_radius + 3 + int(2 * math.sin(pygame.time.get_ticks() / 150))
-        pygame.draw.circle(screen, (*scanner_color, scanner_alpha // 2), (screen_x, screen_y), outer_radius, 1)
-        
-        # Scanning lines
-        line_angle = (pygame.time.get_ticks() / 20) % 360
-        line_end_x = screen_x + math.cos(math.radians(line_angle)) * (scanner_radius + 8)
-        line_end_y = screen_y + math.sin(math.radians(line_angle)) * (scanner_radius + 8)
-        pygame.draw.line(screen, (*scanner_color, scanner_alpha), (screen_x, screen_y), (line_end_x, line_end_y), 1)
-
-def spawn_data_shard():
-    # Don't spawn if at max capacity
-    if len(data_shards) >= max_shards:
-        return
+        line_step = int((pygame.time.get_ticks() / 20) % 360 / 360 * ATLAS_STEPS * 4)
+        key = ('scanner', scanner_color, scanner_radius, outer_radius, line_step)
+    sprite = sprite_atlas.get(key, lambda: build_scanner_sprite(*key[1:]))
+    extent = sprite.get_width() // 2
+    screen.blit(sprite, (screen_x - extent, screen_y - extent))
+
+def build_pursuer_firewall_sprite(width, height, color, alpha):
+    sprite = pygame.Surface((width, height), pygame.SRCALPHA)
+    sprite.fill((*color, alpha))
+    return sprite
+
+def draw_pursuers():
+    """Draw the extra firewalls and scanners on screen, each kind with one blits() call"""
+    pursuers = sim.state.pursuers
+    blits = []
+    
+    firewalls = pursuers.firewalls
+    if len(firewalls):
+        screen_xs = render_pursuer_firewalls[0] - camera_x
+        screen_ys = render_pursuer_firewalls[1] - camera_y
+        visible = ((screen_xs + firewalls['width'] >= 0) & (screen_xs <= VIEWPORT_WIDTH) &
+                   (screen_ys + firewalls['height'] >= 0) & (screen_ys <= VIEWPORT_HEIGHT))
+        for index in np.flatnonzero(visible).tolist():
+            width, height = int(firewalls['width'][index]), int(firewalls['height'][index])
+            color, intensity = PURSUER_FIREWALL_LOOKS[int(firewalls['profile'][index])]
+            # Flicker between a few pre-built alphas
+            step = cosmetic_rng.randrange(PURSUER_FLICKER_STEPS)
+            alpha = min(255, max(100, firewall_alpha_base + round(intensity * (2 * step / (PURSUER_FLICKER_STEPS - 1) - 1))))
+            key = ('pursuer_firewall', width, height, color, alpha)
+            sprite = sprite_atlas.get(key, lambda: build_pursuer_firewall_sprite(*key[1:]))
+            blits.append((sprite, (screen_xs[index], screen_ys[index])))
+    
+    scanners = pursuers.scanners
+    if len(scanners):
+        screen_xs = render_pursuer_scanners[0] - camera_x
+        screen_ys = render_pursuer_scanners[1] - camera_y
+        extent = scanners['radius'] + 9
+        visible = ((screen_xs + extent >= 0) & (screen_xs - extent <= VIEWPORT_WIDTH) &
+                   (screen_ys + extent >= 0) & (screen_ys - extent <= VIEWPORT_HEIGHT))
+        # Same sprites as the scanner: a plain circle for profile 2, and a
+        # pulsing ring with a rotating scanning line for profile 3
+        outer_pulse = 3 + int(2 * math.sin(pygame.time.get_ticks() / 150))
+        line_step = int((pygame.time.get_ticks() / 20) % 360 / 360 * ATLAS_STEPS * 4)
+        for index in np.flatnonzero(visible).tolist():
+            radius, profile = int(scanners['radius'][index]), int(scanners['profile'][index])
+            color = PURSUER_SCANNER_COLORS[profile]
+            if profile == 2:
+                key = ('scanner', color, radius, None, None)
+            else:
+                key = ('scanner', color, radius, radius + outer_pulse, line_step)
+            sprite = sprite_atlas.get(key, lambda: build_scanner_sprite(*key[1:]))
+            half = sprite.get_width() // 2
+            blits.append((sprite, (screen_xs[index] - half, screen_ys[index] - half)))
     
-    # Find a valid position for the shard
-    valid_position = False
-    attempts = 0
+    if blits:
+        screen.blits(blits, doreturn=False)
+
+def update_shard_glow():
+    """Update the pulse effect shared by all data shards"""
+    global shard_glow_intensity, shard_glow_direction
     
-    while not valid_position and attempts < 50:
-        attempts += 1
-        # Distribute shards across the world
-        x = random.randint(50, WORLD_WIDTH - 50)
-        y = random.randint(50, WORLD_HEIGHT - 50)
-        
-        # Check if too close to player, node, or other shards
-        too_close = False
-        
-        # Check distance to player
-        if math.sqrt((x - player_x)**2 + (y - player_y)**2) < 100:
-            too_close = True
-            
-        # Check distance to node
-        if math.sqrt((x - node_x)**2 + (y - node_y)**2) < 100:
-            too_close = True
-            
-        # Check distance to other shards
-        for shard in data_shards:
-            if math.sqrt((x - shard['x'])**2 + (y - shard['y'])**2) < 80:
-                too_close = True
-                break
-        
-        # Check collision with walls in maze environment
-        if current_environment == ENVIRONMENT_MAZE:
-            shard_rect = pygame.Rect(x - shard_size, y - shard_size, shard_size * 2, shard_size * 2)
-            for wall in walls:
-                if shard_rect.colliderect(wall):
-                    too_close = True
-                    break
-        
-        if not too_close:
-            valid_position = True
-            # Create a new data shard
-            data_shards.append({
-                'x': x,
-                'y': y,
-                'rotation': random.uniform(0, 360),  # Random initial rotation
-                'rotation_speed': random.uniform(-2, 2)  # Random rotation speed
-            })
-
-def update_data_shards():
-    global shard_glow_intensity, shard_glow_direction, shard_spawn_timer
-    
-    # Update pulse effect for all shards
     shard_glow_intensity += shard_pulse_speed * shard_glow_direction
     if shard_glow_intensity > 0.5 or shard_glow_intensity < 0:
         shard_glow_direction *= -1
-    
-    # Update rotation for all shards
-    for shard in data_shards:
-        shard['rotation'] += shard['rotation_speed']
-        if shard['rotation'] >= 360:
-            shard['rotation'] -= 360
-    
-    # Update spawn timer
-    shard_spawn_timer += clock.get_time() / 1000
-    if shard_spawn_timer >= shard_spawn_interval and len(data_shards) < max_shards:
-        spawn_data_shard()
-        shard_spawn_timer = 0
+
+def build_shard_sprite(shard_size, rotation_step, glow_factor):
+    """Pre-composite a shard's glow triangle and opaque main triangle around the sprite's center"""
+    glow_size = shard_size * 1.8
+    sprite = pygame.Surface((glow_size * 2, glow_size * 2), pygame.SRCALPHA)
+    glow_alpha = int(100 * glow_factor)
+    angle = math.radians(rotation_step * 120 / SHARD_ROTATION_STEPS)
+    
+    # Create triangle points for glow
+    center_x, center_y = glow_size, glow_size
+    points = []
+    for i in range(3):
+        point_angle = angle + math.radians(120 * i)
+        point_x = center_x + math.cos(point_angle) * glow_size
+        point_y = center_y + math.sin(point_angle) * glow_size
+        points.append((point_x, point_y))
+    
+    # Draw glow triangle
+    pygame.draw.polygon(sprite, (*SHARD_COLOR, glow_alpha), points)
+    
+    # Apply a blur effect to the glow (simple implementation)
+    pygame.draw.polygon(sprite, (*SHARD_COLOR, glow_alpha // 2), points, 5)
+    
+    # Draw the main shard - it's opaque, so it can go straight onto the glow
+    points = []
+    for i in range(3):
+        point_angle = angle + math.radians(120 * i)
+        point_x = center_x + math.cos(point_angle) * shard_size
+        point_y = center_y + math.sin(point_angle) * shard_size
+        points.append((point_x, point_y))
+    
+    # Draw the main triangle with brightness based on glow factor
+    bright_color = (
+        min(255, int(SHARD_COLOR[0] + 50 * glow_factor)),
+        min(255, int(SHARD_COLOR[1] + 50 * glow_factor)),
+        min(255, int(SHARD_COLOR[2]))
+    )
+    pygame.draw.polygon(sprite, bright_color, points)
+    return sprite
 
 def draw_data_shards():
-    for shard in data_shards:
+    shard_size = sim.state.shards.size
+    
+    for shard in sim.state.shards.active:
         # Check if shard is visible on screen
-        if not is_visible_on_screen(shard['x'] - shard_size, shard['y'] - shard_size, 
+        if not is_visible_on_screen(shard.x - shard_size, shard.y - shard_size, 
                                    shard_size * 2, shard_size * 2):
             continue
         
         # Convert world to screen coordinates
-        screen_x, screen_y = world_to_screen(shard['x'], shard['y'])
+        screen_x, screen_y = world_to_screen(shard.x, shard.y)
         
-        # Calculate current glow intensity
-        glow_factor = 0.5 + shard_glow_intensity
+        # Snap the rotation (a third of a turn repeats) and the shared glow intensity
+        rotation_step = round(shard.rotation % 120 / 120 * SHARD_ROTATION_STEPS) % SHARD_ROTATION_STEPS
+        glow_factor = 0.5 + quantize(shard_glow_intensity)
         
-        # Draw outer glow
+        sprite = sprite_atlas.get(('shard', shard_size, rotation_step, glow_factor),
+                                  lambda: build_shard_sprite(shard_size, rotation_step, glow_factor))
         glow_size = shard_size * 1.8
-        glow_surf = pygame.Surface((glow_size * 2, glow_size * 2), pygame.SRCALPHA)
-        glow_alpha = int(100 * glow_factor)
-        
-        # Create triangle points for glow
-        center_x, center_y = glow_size, glow_size
-        angle = math.radians(shard['rotation'])
-        points = []
-        
-        for i in range(3):
-            point_angle = angle + math.radians(120 * i)
-            point_x = center_x + math.cos(point_angle) * glow_size
-            point_y = center_y + math.sin(point_angle) * glow_size
-            points.append((point_x, point_y))
-        
-        # Draw glow triangle
-        pygame.draw.polygon(glow_surf, (*SHARD_COLOR, glow_alpha), points)
-        
-        # Apply a blur effect to the glow (simple implementation)
-        pygame.draw.polygon(glow_surf, (*SHARD_COLOR, glow_alpha // 2), points, 5)
-        
-        # Draw the main shard
-        shard_surf = pygame.Surface((shard_size * 2, shard_size * 2), pygame.SRCALPHA)
-        center_x, center_y = shard_size, shard_size
-        angle = math.radians(shard['rotation'])
-        points = []
-        
-        for i in range(3):
-            point_angle = angle + math.radians(120 * i)
-            point_x = center_x + math.cos(point_angle) * shard_size
-            point_y = center_y + math.sin(point_angle) * shard_size
-            points.append((point_x, point_y))
-        
-        # Draw the main triangle with brightness based on glow factor
-        bright_color = (
-            min(255, int(SHARD_COLOR[0] + 50 * glow_factor)),
-            min(255, int(SHARD_COLOR[1] + 50 * glow_factor)),
-            min(255, int(SHARD_COLOR[2]))
-        )
-        pygame.draw.polygon(shard_surf, bright_color, points)
-        
-        # Position and draw
-        screen.blit(glow_surf, (screen_x - glow_size, screen_y - glow_size))
-        screen.blit(shard_surf, (screen_x - shard_size, screen_y - shard_size))
-
-def check_shard_collection():
-    global data_shards, player_score, shard_tutorial_active
-    
-    # Create player hitbox
-    player_center_x = player_x + player_size // 2
-    player_center_y = player_y + player_size // 2
-    player_radius = player_size // 2
-    
-    # Check each shard
-    collected_shards = []
-    for i, shard in enumerate(data_shards):
-        distance = math.sqrt((player_center_x - shard['x'])**2 + (player_center_y - shard['y'])**2)
-        if distance < player_radius + shard_size:
-            collected_shards.append(i)
-    
-    # If shards were collected, trigger effects
-    if collected_shards:
-        # Trigger a small screen shake
-        trigger_screen_shake(0.2, 3)
-        
-        # Play collection sound
-        if sound_enabled:
-            try:
-                collect_sound.play()
-            except:
-                pass
-    
-    # Remove collected shards (in reverse order to avoid index issues)
-    for i in sorted(collected_shards, reverse=True):
-        data_shards.pop(i)
-        player_score += 1
-        
-        # Show tutorial on first shard collection
-        global show_shard_tutorial
-        if show_shard_tutorial and player_score == 1:
-            shard_tutorial_active = True
-            show_shard_tutorial = False
-
-def disable_walls():
-    """
-    Disables the walls when player spends 5 data shards.
-    This is the ONLY function that should modify walls_visible status.
-    Walls will automatically reappear after wall_hide_duration seconds.
-    """
-    global walls_visible, wall_timer_active, wall_timer, player_score, showing_upgrade, upgrade_timer
-    
-    if player_score >= 5:
-        # Only disable walls if they're currently visible
-        if walls_visible:
-            # Hide walls and start timer
-            walls_visible = False
-            wall_timer_active = True
-            wall_timer = 0
-            player_score -= 5  # Subtract 5 data shards
-            showing_upgrade = True
-            upgrade_timer = 0
+        screen.blit(sprite, (screen_x - glow_size, screen_y - glow_size))
 
 def draw_score():
     # Create glowing effect for score text
     score_pulse = math.sin(pygame.time.get_ticks() / 300) * 0.3 + 0.7  # Value between 0.4 and 1.0
     
     # Base score text
-    score_text = f"DATA: {player_score}"
+    score_text = f"DATA: {sim.state.player.score}"
     
     # Create colors with the pulse effect
     text_color = (
@@ -1631,13 +1122,13 @@ def draw_score():
     )
     
     # Render score with Pixel Game font
-    score_surf = score_font.render(score_text, True, text_color)
+    score_surf = text_cache.render(score_font, score_text, text_color)
     score_x = 20
     score_y = 20
     screen.blit(score_surf, (score_x, score_y))
     
     # Display upgrade prompt if enough data collected
-    if player_score >= 5:
+    if sim.state.player.score >= 5:
         # Create upgrade text with a glitch effect
         upgrade_text = "PRESS E TO DISABLE WALLS"
         
@@ -1645,14 +1136,14 @@ def draw_score():
         glitched_upgrade = glitch_text(upgrade_text, 0.2)
         
         # Keep using small_font for the prompt text
-        prompt_surf = small_font.render(glitched_upgrade, True, SHARD_COLOR)
+        prompt_surf = text_cache.render(small_font, glitched_upgrade, SHARD_COLOR)
         prompt_rect = prompt_surf.get_rect()
         prompt_rect.x = score_x
         prompt_rect.top = score_y + score_surf.get_height() + 5  # Position based on score text height
         
         # Draw with slight movement for glitch effect
-        offset_x = random.randint(-1, 1)
-        offset_y = random.randint(-1, 1)
+        offset_x = cosmetic_rng.randint(-1, 1)
+        offset_y = cosmetic_rng.randint(-1, 1)
         screen.blit(prompt_surf, (prompt_rect.x + offset_x, prompt_rect.y + offset_y))
 
 def show_upgrade_message():
@@ -1668,12 +1159,12 @@ def show_upgrade_message():
         message = "WALLS DISABLED"
         
         # Apply glitch effect
-        if random.random() > 0.7:
+        if cosmetic_rng.random() > 0.7:
             # Randomly replace characters
             chars = list(message)
-            for i in range(random.randint(1, 3)):
-                idx = random.randint(0, len(chars) - 1)
-                chars[idx] = random.choice(['#', '$', '%', '&', '*', '!', '@'])
+            for i in range(cosmetic_rng.randint(1, 3)):
+                idx = cosmetic_rng.randint(0, len(chars) - 1)
+                chars[idx] = cosmetic_rng.choice(['#', '$', '%', '&', '*', '!', '@'])
             message = ''.join(chars)
         
         # Calculate opacity based on time (fade in and out)
@@ -1686,12 +1177,12 @@ def show_upgrade_message():
         
         # Render text with glow effect
         message_font = font
-        text_surf = message_font.render(message, True, SHARD_COLOR)
+        text_surf = text_cache.render(message_font, message, SHARD_COLOR)
         text_rect = text_surf.get_rect(center=(VIEWPORT_WIDTH // 2, VIEWPORT_HEIGHT // 3))
         
         # Add slight offset for glitchy movement
-        offset_x = random.randint(-3, 3)
-        offset_y = random.randint(-3, 3)
+        offset_x = cosmetic_rng.randint(-3, 3)
+        offset_y = cosmetic_rng.randint(-3, 3)
         
         # Draw semi-transparent background
         bg_rect = text_rect.inflate(40, 20)
@@ -1701,14 +1192,15 @@ def show_upgrade_message():
         screen.blit(bg_surf, (bg_rect.left + offset_x, bg_rect.top + offset_y))
         
         # Draw glowing text
-        glow_surf = message_font.render(message, True, (*SHARD_COLOR, 100))
-        for glow_offset in [(2, 2), (-2, -2), (2, -2), (-2, 2)]:
-            glow_pos = (text_rect.left + offset_x + glow_offset[0], 
-                         text_rect.top + offset_y + glow_offset[1])
-            screen.blit(glow_surf, glow_pos)
-        
-        # Set text alpha
-        text_surf.set_alpha(alpha)
+        glow_surf = text_cache.glow(message_font, message, (*SHARD_COLOR, 100), [(2, 2), (-2, -2), (2, -2), (-2, 2)])
+        glow_rect = glow_surf.get_rect(center=text_rect.center)
+        screen.blit(glow_surf, (glow_rect.left + offset_x, glow_rect.top + offset_y))
+        
+        # Set text alpha on a copy, since the cached surface is shared with
+        # every other draw of this text
+        if alpha < 255:
+            text_surf = text_surf.copy()
+            text_surf.set_alpha(alpha)
         screen.blit(text_surf, (text_rect.left + offset_x, text_rect.top + offset_y))
 
 def draw_cooldown_bar():
@@ -1719,13 +1211,14 @@ def draw_cooldown_bar():
 def show_win_message():
     global level_completed
     level_completed = True
+    current_level, max_level = sim.state.current_level, sim.state.max_level
     
     if current_level < max_level:
         glitched_text = glitch_text('ACCESS GRANTED', 0.2)
     else:
         glitched_text = glitch_text('MAIN SERVER BREACHED', 0.2)
     
-    win_text = font.render(glitched_text, True, (0, 255, 0))
+    win_text = text_cache.render(font, glitched_text, (0, 255, 0))
     win_rect = win_text.get_rect(center=(VIEWPORT_WIDTH // 2, VIEWPORT_HEIGHT // 2 - 40))  # Moved up to make room
     
     # Create a semi-transparent background
@@ -1740,7 +1233,7 @@ def show_win_message():
     button_rect = None  # Initialize to None
     
     if current_level < max_level:
-        subtext = font.render(f'Level {current_level} Complete', True, (200, 200, 200))
+        subtext = text_cache.render(font, f'Level {current_level} Complete', (200, 200, 200))
         subtext_rect = subtext.get_rect(center=(VIEWPORT_WIDTH // 2, VIEWPORT_HEIGHT // 2 - 5))
         screen.blit(subtext, subtext_rect)
         
@@ -1751,7 +1244,7 @@ def show_win_message():
         
         # Show info about expanding world
         world_text = f"Next level: World expanding to {next_width//100}x{next_height//100}"
-        world_info = small_font.render(world_text, True, (180, 180, 255))  # Blue tint for emphasis
+        world_info = text_cache.render(small_font, world_text, (180, 180, 255))  # Blue tint for emphasis
         world_rect = world_info.get_rect(center=(VIEWPORT_WIDTH // 2, VIEWPORT_HEIGHT // 2 + 30))
         screen.blit(world_info, world_rect)
         
@@ -1776,7 +1269,7 @@ def show_win_message():
         
         # Draw button text
         continue_text = "HACK DEEPER"  # Changed to be more thematic
-        button_text = button_font.render(continue_text, True, (255, 255, 255))
+        button_text = text_cache.render(button_font, continue_text, (255, 255, 255))
         text_rect = button_text.get_rect(center=(button_width // 2, button_height // 2))
         button_surf.blit(button_text, text_rect)
         
@@ -1784,18 +1277,18 @@ def show_win_message():
         screen.blit(button_surf, (button_x, button_y))
     else:
         # Final level complete
-        subtext = font.render("Game Complete", True, (200, 200, 200))
+        subtext = text_cache.render(font, "Game Complete", (200, 200, 200))
         subtext_rect = subtext.get_rect(center=(VIEWPORT_WIDTH // 2, VIEWPORT_HEIGHT // 2 + 20))
         screen.blit(subtext, subtext_rect)
         
         # Show total progression info
         final_scaling = 1.0 + (max_level - 1) * 0.3
         world_text = f"Final network size: {int(BASE_WORLD_WIDTH * final_scaling)//100}x{int(BASE_WORLD_HEIGHT * final_scaling)//100}"
-        world_info = small_font.render(world_text, True, (180, 180, 255))
+        world_info = text_cache.render(small_font, world_text, (180, 180, 255))
         world_rect = world_info.get_rect(center=(VIEWPORT_WIDTH // 2, VIEWPORT_HEIGHT // 2 + 60))
         screen.blit(world_info, world_rect)
         
-        instruction = small_font.render("Press ESC to exit", True, (150, 150, 150))
+        instruction = text_cache.render(small_font, "Press ESC to exit", (150, 150, 150))
         instruction_rect = instruction.get_rect(center=(VIEWPORT_WIDTH // 2, VIEWPORT_HEIGHT // 2 + 100))
         screen.blit(instruction, instruction_rect)
     
@@ -1814,7 +1307,7 @@ def show_alert_message():
     
     # Create alert text with glitch effect
     glitched_alert = glitch_text('SYSTEM ALERT', 0.3)  # Higher intensity for more glitching
-    alert_text = alert_font.render(glitched_alert, True, (255, 50, 0))
+    alert_text = text_cache.render(alert_font, glitched_alert, (255, 50, 0))
     alert_rect = alert_text.get_rect(center=(VIEWPORT_WIDTH // 2, VIEWPORT_HEIGHT // 2))
     
     # Create a semi-transparent background
@@ -1828,8 +1321,9 @@ def show_alert_message():
 
 def draw_start_screen():
     """Draw the start screen with game instructions"""
-    # Fill the background with black
+    # Fill the background with black - the grid flickers everywhere, so the whole screen changes
     screen.fill(BLACK)
+    compositor.mark('background', screen.get_rect())
     
     # Draw animated grid as background
     draw_grid()
@@ -1845,19 +1339,19 @@ def draw_start_screen():
     
     # Create title text with cyberpunk colors
     title_text = "CYBERPUNK HACKER DUEL"
-    title_shadow = title_font.render(title_text, True, (WALL_COLOR[0], WALL_COLOR[1], WALL_COLOR[2], glow_alpha))
-    title_glow = title_font.render(title_text, True, (SHARD_COLOR[0], SHARD_COLOR[1], SHARD_COLOR[2], glow_alpha))
-    title_main = title_font.render(title_text, True, GRID_COLOR)
+    glow_offsets = [offset for distance in range(1, glow_size, 2)
+                    for offset in [(distance, 0), (-distance, 0), (0, distance), (0, -distance)]]
+    title_shadow = text_cache.glow(title_font, title_text, (WALL_COLOR[0], WALL_COLOR[1], WALL_COLOR[2], glow_alpha), glow_offsets)
+    title_glow = text_cache.render(title_font, title_text, (SHARD_COLOR[0], SHARD_COLOR[1], SHARD_COLOR[2], glow_alpha))
+    title_main = text_cache.render(title_font, title_text, GRID_COLOR)
     
     # Position for title - ensure it's centered with margins
     title_x = VIEWPORT_WIDTH // 2
     title_y = 120
     
-    # Draw glow effect
-    for offset in range(1, glow_size, 2):
-        for x_offset, y_offset in [(offset, 0), (-offset, 0), (0, offset), (0, -offset)]:
-            title_rect = title_shadow.get_rect(center=(title_x + x_offset, title_y + y_offset))
-            screen.blit(title_shadow, title_rect)
+    # Draw glow effect (the shadow copies at every offset are pre-composited)
+    title_rect = title_shadow.get_rect(center=(title_x, title_y))
+    screen.blit(title_shadow, title_rect)
     
     # Draw inner glow
     title_rect = title_glow.get_rect(center=(title_x, title_y))
@@ -1869,15 +1363,15 @@ def draw_start_screen():
     
     # Draw a glitchy subtitle with occasional character replacement
     subtitle_text = "INFILTRATE. EXTRACT. SURVIVE."
-    if random.random() > 0.9:  # Occasionally glitch text
+    if cosmetic_rng.random() > 0.9:  # Occasionally glitch text
         chars = list(subtitle_text)
-        glitch_count = random.randint(1, 3)
+        glitch_count = cosmetic_rng.randint(1, 3)
         for _ in range(glitch_count):
-            idx = random.randint(0, len(chars) - 1)
-            chars[idx] = random.choice(['#', '$', '%', '&', '*', '!', '@'])
+            idx = cosmetic_rng.randint(0, len(chars) - 1)
+            chars[idx] = cosmetic_rng.choice(['#', '$', '%', '&', '*', '!', '@'])
         subtitle_text = ''.join(chars)
     
-    subtitle_surf = subtitle_font.render(subtitle_text, True, SHARD_COLOR)
+    subtitle_surf = text_cache.render(subtitle_font, subtitle_text, SHARD_COLOR)
     subtitle_rect = subtitle_surf.get_rect(center=(title_x, title_y + 50))
     screen.blit(subtitle_surf, subtitle_rect)
     
@@ -1901,7 +1395,7 @@ def draw_start_screen():
     screen.blit(instr_surf, (instr_x, instr_y))
     
     # Draw section title
-    section_surf = section_font.render("MISSION", True, GRID_COLOR)
+    section_surf = text_cache.render(section_font, "MISSION", GRID_COLOR)
     section_rect = section_surf.get_rect(center=(instr_x + instr_width // 2, instr_y + 25))
     screen.blit(section_surf, section_rect)
     
@@ -1919,9 +1413,9 @@ def draw_start_screen():
     for i, line in enumerate(instructions):
         # Make the last line about expanding world more prominent
         if i == len(instructions) - 1:
-            text_surf = text_font.render(line, True, (180, 180, 255))  # Bluish color for emphasis
+            text_surf = text_cache.render(text_font, line, (180, 180, 255))  # Bluish color for emphasis
         else:
-            text_surf = text_font.render(line, True, (200, 200, 200))
+            text_surf = text_cache.render(text_font, line, (200, 200, 200))
         text_rect = text_surf.get_rect(center=(instr_x + instr_width // 2, y_offset))
         screen.blit(text_surf, text_rect)
         y_offset += 25
@@ -1947,7 +1441,7 @@ def draw_start_screen():
     pygame.draw.rect(button_surf, (255, 255, 255, 100), (0, 0, button_width, button_height), 2, border_radius=10)
     
     # Draw button text
-    button_text = button_font.render("START MISSION", True, (0, 0, 0) if button_hover else (255, 255, 255))
+    button_text = text_cache.render(button_font, "START MISSION", (0, 0, 0) if button_hover else (255, 255, 255))
     button_text_rect = button_text.get_rect(center=(button_width//2, button_height//2))
     button_surf.blit(button_text, button_text_rect)
     
@@ -1955,7 +1449,7 @@ def draw_start_screen():
     screen.blit(button_surf, (button_x, button_y))
     
     # Occasionally add scanline effect
-    if random.random() > 0.8:
+    if cosmetic_rng.random() > 0.8:
         scanline_surf = pygame.Surface((VIEWPORT_WIDTH, VIEWPORT_HEIGHT), pygame.SRCALPHA)
         for y in range(0, VIEWPORT_HEIGHT, 4):
             pygame.draw.line(scanline_surf, (255, 255, 255, 15), (0, y), (VIEWPORT_WIDTH, y))
@@ -1964,12 +1458,12 @@ def draw_start_screen():
     # Return the button rect for click detection
     return button_rect
 
-def draw_decoy_tutorial():
+def draw_decoy_tutorial(darken=True):
     """Draw the tutorial explanation for the decoy visual indicator"""
-    # Create semi-transparent overlay
-    overlay = pygame.Surface((VIEWPORT_WIDTH, VIEWPORT_HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 180))  # Dark semi-transparent background
-    screen.blit(overlay, (0, 0))
+    # Darken the frozen game frame behind the tutorial until it has settled to black
+    if darken:
+        screen.blit(tutorial_overlay, (0, 0))
+        compositor.mark('overlay', screen.get_rect())
     
     # Create tutorial box with enough height for text and button
     box_width = 500
@@ -1991,7 +1485,7 @@ def draw_decoy_tutorial():
     pygame.draw.rect(box_surface, border_color, (0, 0, box_width, box_height), 2)
     
     # Add header
-    header_text = title_font.render("DECOY SYSTEM", True, SHARD_COLOR)
+    header_text = text_cache.render(title_font, "DECOY SYSTEM", SHARD_COLOR)
     header_rect = header_text.get_rect(center=(box_width // 2, 40))
     box_surface.blit(header_text, header_rect)
     
@@ -2010,7 +1504,7 @@ def draw_decoy_tutorial():
     # Start text higher in the box for more space
     y_offset = 90
     for line in tutorial_text:
-        text_surf = text_font.render(line, True, (200, 200, 200))
+        text_surf = text_cache.render(text_font, line, (200, 200, 200))
         text_rect = text_surf.get_rect(center=(box_width // 2, y_offset))
         box_surface.blit(text_surf, text_rect)
         y_offset += 25
@@ -2050,7 +1544,7 @@ def draw_decoy_tutorial():
     pygame.draw.rect(button_surf, (255, 255, 255, 100), (0, 0, button_width, button_height), 1, border_radius=5)
     
     # Draw button text
-    button_text = button_font.render("CONTINUE", True, (0, 0, 0) if button_hover else (255, 255, 255))
+    button_text = text_cache.render(button_font, "CONTINUE", (0, 0, 0) if button_hover else (255, 255, 255))
     button_text_rect = button_text.get_rect(center=(button_width//2, button_height//2))
     button_surf.blit(button_text, button_text_rect)
     
@@ -2059,15 +1553,16 @@ def draw_decoy_tutorial():
     
     # Draw the box on screen
     screen.blit(box_surface, (box_x, box_y))
+    compositor.mark('tutorial', (box_x, box_y, box_width, box_height))
     
     return button_rect
 
-def draw_shard_tutorial():
+def draw_shard_tutorial(darken=True):
     """Draw the tutorial explanation for data shards"""
-    # Create semi-transparent overlay
-    overlay = pygame.Surface((VIEWPORT_WIDTH, VIEWPORT_HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 180))  # Dark semi-transparent background
-    screen.blit(overlay, (0, 0))
+    # Darken the frozen game frame behind the tutorial until it has settled to black
+    if darken:
+        screen.blit(tutorial_overlay, (0, 0))
+        compositor.mark('overlay', screen.get_rect())
     
     # Create tutorial box with same dimensions as decoy tutorial
     box_width = 500
@@ -2089,7 +1584,7 @@ def draw_shard_tutorial():
     pygame.draw.rect(box_surface, border_color, (0, 0, box_width, box_height), 2)
     
     # Use score_font to match the score UI styling
-    header_text = score_font.render("DATA SHARD SYSTEM", True, SHARD_COLOR)
+    header_text = text_cache.render(score_font, "DATA SHARD SYSTEM", SHARD_COLOR)
     header_rect = header_text.get_rect(center=(box_width // 2, 40))
     box_surface.blit(header_text, header_rect)
     
@@ -2108,7 +1603,7 @@ def draw_shard_tutorial():
     # Start text at same y-offset as decoy tutorial
     y_offset = 90
     for line in tutorial_text:
-        text_surf = text_font.render(line, True, (200, 200, 200))
+        text_surf = text_cache.render(text_font, line, (200, 200, 200))
         text_rect = text_surf.get_rect(center=(box_width // 2, y_offset))
         box_surface.blit(text_surf, text_rect)
         y_offset += 25
@@ -2149,7 +1644,7 @@ def draw_shard_tutorial():
     pygame.draw.rect(button_surf, (255, 255, 255, 100), (0, 0, button_width, button_height), 1, border_radius=5)
     
     # Draw button text - identical to decoy tutorial
-    button_text = button_font.render("CONTINUE", True, (0, 0, 0) if button_hover else (255, 255, 255))
+    button_text = text_cache.render(button_font, "CONTINUE", (0, 0, 0) if button_hover else (255, 255, 255))
     button_text_rect = button_text.get_rect(center=(button_width//2, button_height//2))
     button_surf.blit(button_text, button_text_rect)
     
@@ -2158,158 +1653,100 @@ def draw_shard_tutorial():
     
     # Draw the box on screen
     screen.blit(box_surface, (box_x, box_y))
+    compositor.mark('tutorial', (box_x, box_y, box_width, box_height))
     
     return button_rect
 
-# Start ambient sound loop if available
-if sound_enabled:
-    try:
-        ambient_sound.play(-1)  # -1 makes it loop indefinitely
-    except:
-        print("Could not play ambient sound")
-
-# Initialize with some shards
-for _ in range(2):
-    spawn_data_shard()
-
-# Initialize particles
-spawn_particles(50)  # Start with some particles
-
-# Main game loop
-running = True
-game_started = False  # New flag to track if the main game has started
-level_button_rect = None  # Store the continue button rect
-tutorial_button_rect = None  # Store the tutorial continue button rect
-shard_tutorial_button_rect = None  # Store the shard tutorial continue button rect
-
 def glitch_text(text, intensity=0.1):
     """Apply a glitch effect to text by randomly replacing characters"""
-    if random.random() > intensity:
+    if cosmetic_rng.random() > intensity:
         return text
     
     chars = list(text)
     glitch_count = max(1, int(len(chars) * intensity))
     for _ in range(glitch_count):
-        idx = random.randint(0, len(chars) - 1)
-        chars[idx] = random.choice(['#', '$', '%', '&', '*', '!', '@', '0', '1'])
+        idx = cosmetic_rng.randint(0, len(chars) - 1)
+        chars[idx] = cosmetic_rng.choice(['#', '$', '%', '&', '*', '!', '@', '0', '1'])
     
     return ''.join(chars)
 
-def reset_level(level):
-    global current_level, player_x, player_y, player_speed, decoy_can_use, decoy_timer, decoy_active, player_dead
-    global firewall_x, firewall_y, firewall_width, firewall_height, firewall_vertical_speed, firewall_active
-    global walls, walls_visible, wall_timer, wall_timer_active, shard_storage_capacity, decoy_cooldown
-    global score, prev_player_x, prev_player_y, WORLD_WIDTH, WORLD_HEIGHT, game_won, level_completed
-    global node_x, node_y, scanner_active, scanner_radius, scanner_speed, scanner_flicker_intensity
-    global SCANNER_COLOR, FIREWALL_COLOR, firewall_flicker_intensity, player_health, damage_cooldown
-    
-    # Reset game state
-    current_level = level
-    player_dead = False
-    
-    # Reset player health
-    player_health = player_max_health
-    damage_cooldown = 0
-    
-    # Reset completion states
-    game_won = False  # Reset game won state for new level
-    level_completed = False  # Reset level completion state
-    
-    # Scale world dimensions based on level
-    scaling_factor = 1.0 + (level - 1) * 0.3  # Same formula used in win message
-    WORLD_WIDTH = int(BASE_WORLD_WIDTH * scaling_factor)
-    WORLD_HEIGHT = int(BASE_WORLD_HEIGHT * scaling_factor)
+def seed_run(seed=None):
+    """Start a fresh simulation for a new run, seed the cosmetic streams and return the seed used"""
+    global sim, particle_rng
+    # A new simulation rather than a reseeded one, so nothing left over from
+    # before (such as the walls new shards avoid) affects the run
+    sim = GameSimulation(seed)
+    profiler.instrument(sim, SIM_PROFILED_METHODS, prefix='sim.')
+    # Derived from the run seed, but a different sequence from the gameplay stream
+    cosmetic_rng.seed(f'cosmetic:{sim.seed}')
+    particle_rng = np.random.default_rng(sim.seed)
+    grid_layer.bake(GRID_COLOR)
+    return sim.seed
+
+def start_game():
+    """Start a new run at level 1, or the loaded recording's session"""
+    global recorder, replay, show_decoy_tutorial, show_shard_tutorial
+    
+    if replay_recording is not None:
+        seed_run(replay_recording.seed)
+        # Tutorials would pause the replay until someone clicks them away
+        show_decoy_tutorial = False
+        show_shard_tutorial = False
+        replay = ReplayPlayer(replay_recording, sim, reset_level, retry_level)
+        replay.apply_records()  # Starts the recorded level
+        return
     
-    # Reset player
-    player_x = 200
-    player_y = 300
-    prev_player_x = player_x  # Initialize previous position
-    prev_player_y = player_y
+    seed = seed_run(run_seed)
+    print(f"Run seed: {seed} (replay with --seed {seed})")
+    if recording_enabled:
+        recorder = SessionRecorder(seed)
+    reset_level(1)
+
+def reset_level(level):
+    """Start the given level in the simulation and apply its look"""
+    global level_start
+    
+    sim.reset_level(level)
+    level_start = sim.snapshot()  # For retry_level()
+    if recorder is not None:
+        recorder.record_level(level)
+    wall_layer.bake(sim.state.walls.maze, (*WALL_COLOR, 200))
+    reset_presentation(level)
+
+def retry_level():
+    """Put the current level back to how it started, without generating it again"""
+    sim.restore(level_start)
+    if recorder is not None:
+        recorder.record_retry()
+    # The walls are the very same maze reset_level() gave wall_layer, so it's still valid
+    reset_presentation(sim.state.current_level)
+
+def reset_presentation(level):
+    """Clear per-level presentation state and apply the level's look"""
+    global prev_player_x, prev_player_y, level_completed, showing_upgrade, scanner_trail
+    global SCANNER_COLOR, FIREWALL_COLOR, firewall_flicker_intensity, scanner_flicker_intensity
     
-    # Reset dynamic game variables
-    decoy_can_use = True
-    decoy_timer = 0
-    decoy_active = False
-    scanner_active = False
+    level_completed = False  # Reset level completion state
     showing_upgrade = False
+    scanner_trail = []
+    prev_player_x = sim.state.player.x  # Initialize previous position
+    prev_player_y = sim.state.player.y
+    interpolate_positions(1.0)
     
-    # Reset wall variables - walls should be visible by default at level start
-    walls_visible = True
-    wall_timer_active = False
-    wall_timer = 0
-    
-    # Keep data shards between levels
-    data_shards = []
-    
-    # Set up level-specific settings
-    # Add more shards for higher levels
-    for _ in range(level * 3):
-        spawn_data_shard()
-    
-    # Position security node on the right side of the world - ensure it's far enough for each level
+    # Level-specific firewall and scanner appearance
     if level == 1:
-        node_x = WORLD_WIDTH - 150
-    elif level == 2:
-        node_x = WORLD_WIDTH - 200  # Further right in level 2
-    else:
-        node_x = WORLD_WIDTH - 250  # Even further right in level 3
-        
-    node_y = WORLD_HEIGHT // 2
-    
-    # Level-specific firewall settings
-    if level == 1:
-        firewall_speed = 3  # Basic speed for level 1
-        firewall_width = 8  # Thinner firewall at level 1
-        firewall_height = 200  # Shorter firewall at level 1 - easy to dodge
-        firewall_vertical_speed = 1  # Slow vertical movement
         firewall_flicker_intensity = 20  # Less flicker
         FIREWALL_COLOR = (255, 120, 0)  # Orange for level 1
-        
-        # No scanners in level 1
-        scanner_active = False
-        
     elif level == 2:
-        firewall_speed = 4  # Faster firewall in level 2
-        firewall_width = 10  # Medium width
-        firewall_height = 300  # Medium height at level 2
-        firewall_vertical_speed = 1.5  # Medium vertical movement
         firewall_flicker_intensity = 25  # Medium flicker
         FIREWALL_COLOR = (255, 80, 0)  # More intense orange-red for level 2
-        
-        # Level 2 scanner settings
-        scanner_active = True  # Enable scanner for level 2
-        scanner_radius = 4  # Smaller scanner
-        scanner_speed = 4  # Slower scanner
         scanner_flicker_intensity = 20
         SCANNER_COLOR = (255, 255, 0)  # Yellow scanner for level 2
-        
     else:  # Level 3+
-        firewall_speed = 5  # Even faster in level 3
-        firewall_width = 12  # Thicker firewall
-        firewall_height = 400  # Taller firewall at level 3 - harder to dodge
-        firewall_vertical_speed = 2  # Fast vertical movement
         firewall_flicker_intensity = 30  # Full flicker
         FIREWALL_COLOR = (255, 30, 0)  # Red for level 3 - more dangerous
-        
-        # Level 3 scanner settings - more advanced
-        scanner_active = True  # Enable scanner for level 3
-        scanner_radius = 5  # Larger scanner
-        scanner_speed = 6  # Faster scanner
         scanner_flicker_intensity = 40
         SCANNER_COLOR = (255, 50, 50)  # Red scanner for level 3
-    
-    # Reset firewall position to left side of the screen
-    firewall_x = -firewall_width  # Start off-screen
-    firewall_y = random.randint(0, WORLD_HEIGHT - firewall_height)
-    firewall_active = True
-    
-    # Spawn scanner if active
-    if scanner_active:
-        spawn_scanner()
-    
-    # Generate maze walls for the level
-    generate_maze_walls()
-    wall_alpha = 200  # Ensure walls are visible
 
 def draw_hud():
     # Draw player health bar at top center
@@ -2322,7 +1759,7 @@ def draw_hud():
     pygame.draw.rect(screen, (50, 50, 50), (health_bar_x, health_bar_y, health_bar_width, health_bar_height))
     
     # Calculate health percentage
-    health_percent = max(0, player_health / player_max_health)
+    health_percent = max(0, sim.state.player.health / sim.state.player.max_health)
     filled_width = int(health_bar_width * health_percent)
     
     # Use a nice shade of red for health bar
@@ -2339,38 +1776,39 @@ def draw_hud():
                     border_thickness)
     
     # Draw health text
-    health_text = small_font.render(f"HP: {int(player_health)}/{player_max_health}", True, (255, 255, 255))
+    health_text = text_cache.render(small_font, f"HP: {int(sim.state.player.health)}/{sim.state.player.max_health}", (255, 255, 255))
     health_text_rect = health_text.get_rect()
     health_text_rect.center = (health_bar_x + health_bar_width // 2, health_bar_y + health_bar_height // 2)
     screen.blit(health_text, health_text_rect)
 
     # Draw level text at top right using Pixel Game font
-    level_text = score_font.render(f"LVL: {current_level}/{max_level}", True, (200, 200, 200))
+    level_text = text_cache.render(score_font, f"LVL: {sim.state.current_level}/{sim.state.max_level}", (200, 200, 200))
     level_rect = level_text.get_rect()
     level_rect.right = VIEWPORT_WIDTH - 20
     level_rect.top = 20
     screen.blit(level_text, level_rect)
     
     # If AI is adapting (after 2 decoys), show warning
-    if decoy_count >= 2:
+    if sim.state.decoy.count >= 2:
         # Keep warning in small_font for contrast
-        warning_text = small_font.render("AI ADAPTING", True, (255, 100, 0))
+        warning_text = text_cache.render(small_font, "AI ADAPTING", (255, 100, 0))
         warning_rect = warning_text.get_rect()
         warning_rect.right = VIEWPORT_WIDTH - 20
         warning_rect.top = level_rect.bottom + 5
         screen.blit(warning_text, warning_rect)
     
     # Draw wall timer if active
-    if wall_timer_active:
+    walls = sim.state.walls
+    if walls.timer_active:
         # Draw text timer with Pixel Game font
-        timer_text = f"WALLS: {int(wall_hide_duration - wall_timer)}s"
+        timer_text = f"WALLS: {int(walls.hide_duration - walls.timer)}s"
         timer_color = (0, 255, 0)
-        timer_surface = score_font.render(timer_text, True, timer_color)
+        timer_surface = text_cache.render(score_font, timer_text, timer_color)
         timer_rect = timer_surface.get_rect()
         timer_rect.right = VIEWPORT_WIDTH - 20
         
         # Adjust position based on whether warning is shown
-        if decoy_count >= 2:
+        if sim.state.decoy.count >= 2:
             timer_rect.top = warning_rect.bottom + 5
         else:
             timer_rect.top = level_rect.bottom + 5
@@ -2382,7 +1820,7 @@ def draw_hud():
         bar_height = 8
         bar_x = timer_rect.left - 10
         bar_y = timer_rect.bottom + 5
-        progress = 1.0 - (wall_timer / wall_hide_duration)
+        progress = 1.0 - (walls.timer / walls.hide_duration)
         
         # Draw background
         pygame.draw.rect(screen, (50, 50, 50), (bar_x, bar_y, bar_width, bar_height))
@@ -2399,9 +1837,11 @@ def spawn_decoy_ready_particles():
     """Spawn particles that trail behind the player when decoy is ready"""
     global prev_player_x, prev_player_y
     
-    if not decoy_can_use:
+    if not sim.state.decoy.can_use:
         return
     
+    player_x, player_y = sim.state.player.x, sim.state.player.y
+    
     # Calculate player movement direction
     dx = player_x - prev_player_x
     dy = player_y - prev_player_y
@@ -2410,8 +1850,8 @@ def spawn_decoy_ready_particles():
     # Handle both moving and stationary player
     if move_distance < 0.5:  # If player is stationary or barely moving
         # Create particles in a circular pattern around the player
-        angle = random.uniform(0, math.pi * 2)  # Random angle around player
-        distance = random.uniform(3, 8)  # Random distance from player
+        angle = cosmetic_rng.uniform(0, math.pi * 2)  # Random angle around player
+        distance = cosmetic_rng.uniform(3, 8)  # Random distance from player
         trail_x = player_x + math.cos(angle) * distance
         trail_y = player_y + math.sin(angle) * distance
     else:
@@ -2423,44 +1863,30 @@ def spawn_decoy_ready_particles():
         trail_x = player_x - dx * 5  # Position particles behind player
         trail_y = player_y - dy * 5
     
-    # Spawn 1-3 particles
-    count = random.randint(1, 2)
-    for _ in range(count):
-        # Add randomness to position
-        offset_x = random.uniform(-5.0, 5.0)
-        offset_y = random.uniform(-5.0, 5.0)
-        
-        # Particle size varies slightly
-        size = random.uniform(2.0, 4.0)
-        
-        # Brief lifetime for trailing effect
-        lifetime = random.uniform(0.3, 0.8)
-        
-        # Cyan/blue color matching the decoy ready effect with slight variation
-        color_variation = random.uniform(-20, 20)
-        color = (
-            min(255, max(0, int(30 + color_variation))),  # Slight blue tint
-            min(255, max(0, int(180 + color_variation))),  # Strong cyan
-            min(255, max(0, int(220 + color_variation)))   # Bright blue
-        )
-        
-        # Create particle with initial settings
-        decoy_ready_particles.append({
-            'x': trail_x + offset_x,
-            'y': trail_y + offset_y,
-            'size': size,
-            'alpha': 180,  # Start fairly visible
-            'color': color,
-            'lifetime': lifetime,
-            'age': 0
-        })
+    # Spawn 1-2 particles
+    count = cosmetic_rng.randint(1, 2)
+    
+    # Cyan/blue color matching the decoy ready effect with slight variation
+    color_variation = particle_rng.uniform(-20, 20, (count, 1))
+    colors = np.clip(np.array([30, 180, 220]) + color_variation, 0, 255).astype(np.uint8)
+    
+    decoy_ready_particles.spawn(
+        x=trail_x + particle_rng.uniform(-5.0, 5.0, count),  # Add randomness to position
+        y=trail_y + particle_rng.uniform(-5.0, 5.0, count),
+        size=particle_rng.uniform(2.0, 4.0, count),  # Particle size varies slightly
+        lifetime=particle_rng.uniform(0.3, 0.8, count),  # Brief lifetime for trailing effect
+        color=colors,
+        alpha=180  # Start fairly visible
+    )
 
 def update_decoy_ready_particles():
     """Update all decoy-ready trailing particles"""
-    global decoy_ready_particles, prev_player_x, prev_player_y
+    global prev_player_x, prev_player_y
+    
+    player_x, player_y = sim.state.player.x, sim.state.player.y
     
     # Only spawn particles if decoy is ready
-    if decoy_can_use:
+    if sim.state.decoy.can_use:
         # Calculate movement since last frame
         dx = player_x - prev_player_x
         dy = player_y - prev_player_y
@@ -2473,224 +1899,134 @@ def update_decoy_ready_particles():
             spawn_probability = 0.3  # Normal probability when moving
             
         # Spawn particles based on adjusted probability
-        if random.random() < spawn_probability:
+        if cosmetic_rng.random() < spawn_probability:
             spawn_decoy_ready_particles()
     
     # Store current position for next frame
     prev_player_x = player_x
     prev_player_y = player_y
     
-    # Update existing particles
-    for i in range(len(decoy_ready_particles) - 1, -1, -1):
-        particle = decoy_ready_particles[i]
-        
-        # Update age
-        particle['age'] += clock.get_time() / 1000
-        
-        # Remove old particles
-        if particle['age'] >= particle['lifetime']:
-            decoy_ready_particles.pop(i)
-            continue
-            
-        # Calculate fade out as particle ages
-        fade_ratio = particle['age'] / particle['lifetime']
-        particle['alpha'] = int((1 - fade_ratio) * 180)  # Fade from 180 to 0
-        
-        # Also shrink slightly as they age
-        particle['size'] *= (1 - 0.05 * fade_ratio)
+    # Age particles and remove the ones past their lifetime
+    decoy_ready_particles.advance(clock.get_time() / 1000)
+    
+    # Fade from 180 to 0 and shrink slightly as particles age
+    count = decoy_ready_particles.count
+    fade_ratio = decoy_ready_particles.age[:count] / decoy_ready_particles.lifetime[:count]
+    decoy_ready_particles.alpha[:count] = np.floor((1 - fade_ratio) * 180)
+    decoy_ready_particles.size[:count] *= 1 - 0.05 * fade_ratio
 
 def draw_decoy_ready_particles():
     """Draw all decoy-ready trailing particles"""
-    if not decoy_can_use or len(decoy_ready_particles) == 0:
+    if not sim.state.decoy.can_use or len(decoy_ready_particles) == 0:
         return
-        
-    # Create a surface for all particles
-    particle_surf = pygame.Surface((VIEWPORT_WIDTH, VIEWPORT_HEIGHT), pygame.SRCALPHA)
-    
-    for particle in decoy_ready_particles:
-        # Skip if fully transparent
-        if particle['alpha'] <= 0:
-            continue
-        
-        # Convert world to screen coordinates
-        screen_x, screen_y = world_to_screen(particle['x'], particle['y'])
-        
-        # Skip particles outside the viewport
-        if (screen_x < -10 or screen_x > VIEWPORT_WIDTH + 10 or 
-            screen_y < -10 or screen_y > VIEWPORT_HEIGHT + 10):
-            continue
-        
-        # Apply screen shake offset if active
-        offset_x, offset_y = 0, 0
-        if screen_shake:
-            offset_x = random.randint(-shake_intensity, shake_intensity)
-            offset_y = random.randint(-shake_intensity, shake_intensity)
-        
-        # Draw particle with current alpha
-        # First draw glow
-        glow_size = particle['size'] * 2
-        glow_alpha = particle['alpha'] // 3
-        pygame.draw.circle(
-            particle_surf,
-            (*particle['color'], glow_alpha),
-            (int(screen_x + offset_x), int(screen_y + offset_y)),
-            glow_size
-        )
-        
-        # Then draw main particle
-        pygame.draw.circle(
-            particle_surf,
-            (*particle['color'], particle['alpha']),
-            (int(screen_x + offset_x), int(screen_y + offset_y)),
-            particle['size']
-        )
     
-    # Draw all particles at once
-    screen.blit(particle_surf, (0, 0))
-
-while running:
-    # Handle events
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_ESCAPE and game_won and current_level >= max_level:
-                running = False
-            # Space to start game from the start screen
-            elif event.key == pygame.K_SPACE and not game_started:
-                game_started = True
-                # Reset to level 1
-                reset_level(1)
-            # Q key to spawn decoy (only if game is started and not won)
-            elif event.key == pygame.K_q and game_started and not game_won and not tutorial_active and not shard_tutorial_active:
-                if decoy_can_use:
-                    spawn_decoy()
-            # E key to disable walls if enough data shards collected
-            elif event.key == pygame.K_e and game_started and not game_won and not tutorial_active and not shard_tutorial_active:
-                if player_score >= 5:
-                    disable_walls()
-        # Handle mouse clicks for the start button or level progression button
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:  # Left mouse button
-                mouse_pos = pygame.mouse.get_pos()
-                # Check for start button if not started
-                if not game_started and button_rect.collidepoint(mouse_pos):
-                    game_started = True
-                    # Reset to level 1
-                    reset_level(1)
-                # Check for level progression button if level completed
-                elif level_completed and level_button_rect and level_button_rect.collidepoint(mouse_pos):
-                    # Progress to next level
-                    reset_level(current_level + 1)
-                # Check for tutorial continue button
-                elif tutorial_active and tutorial_button_rect and tutorial_button_rect.collidepoint(mouse_pos):
-                    tutorial_active = False
-                    show_decoy_tutorial = False
-                # Check for shard tutorial continue button
-                elif shard_tutorial_active and shard_tutorial_button_rect and shard_tutorial_button_rect.collidepoint(mouse_pos):
-                    shard_tutorial_active = False
-    
-    # Show start screen if game not started
-    if not game_started:
-        button_rect = draw_start_screen()
-        pygame.display.flip()
-        clock.tick(FPS)
-        continue
-    
-    # If tutorial is active, pause the game and show tutorial
-    if tutorial_active:
-        tutorial_button_rect = draw_decoy_tutorial()
-        pygame.display.flip()
-        clock.tick(FPS)
-        continue
-    
-    # If shard tutorial is active, pause the game and show tutorial
-    if shard_tutorial_active:
-        shard_tutorial_button_rect = draw_shard_tutorial()
-        pygame.display.flip()
-        clock.tick(FPS)
-        continue
-    
-    # Main game logic (only runs if game has started)
-    # Get pressed keys for player movement (only if game not won)
-    if not game_won:
-        keys = pygame.key.get_pressed()
-        
-        # Store original position
-        original_x, original_y = player_x, player_y
-        
-        # Calculate potential new positions
-        new_x, new_y = player_x, player_y
-        
-        # Left movement (Left Arrow or A)
-        if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-            new_x = max(0, player_x - player_speed)
-        # Right movement (Right Arrow or D)
-        if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-            new_x = min(WORLD_WIDTH - player_size, player_x + player_speed)
-        # Up movement (Up Arrow or W)
-        if keys[pygame.K_UP] or keys[pygame.K_w]:
-            new_y = max(0, player_y - player_speed)
-        # Down movement (Down Arrow or S)
-        if keys[pygame.K_DOWN] or keys[pygame.K_s]:
-            new_y = min(WORLD_HEIGHT - player_size, player_y + player_speed)
-        
-        # Check wall collisions before applying movement
-        if not check_wall_collision(new_x, player_y):
-            player_x = new_x
-        if not check_wall_collision(player_x, new_y):
-            player_y = new_y
-            
-        # Try diagonal movement if both horizontal and vertical movement failed
-        # This allows sliding along walls instead of getting stuck
-        if player_x == original_x and player_y == original_y and (new_x != original_x or new_y != original_y):
-            # Try to move diagonally at least in one direction - half speed sliding
-            if not check_wall_collision(new_x, player_y + (new_y - player_y) * 0.5):
-                player_y += (new_y - player_y) * 0.5
-            if not check_wall_collision(player_x + (new_x - player_x) * 0.5, new_y):
-                player_x += (new_x - player_x) * 0.5
-    
-    # Update camera position to follow player
-    update_camera()
-    
-    # Update damage cooldown timer
-    if damage_cooldown > 0:
-        damage_cooldown -= clock.get_time() / 1000  # Subtract elapsed time in seconds
-    
-    # Check if player is dead and handle it
-    if player_health <= 0 and not player_dead:
-        player_dead = True
-        reset_player_position()  # Reset position
-        player_health = player_max_health  # Refill health
-        
-        # Visual/Audio feedback
-        if sound_enabled:
-            impact_sound.play()
-        trigger_screen_shake(0.7, 15)  # Strong shake effect
-    
-    # Update decoy status
-    update_decoy()
-    
-    # Update scanner
-    update_scanner()
-    
-    # Update environment
-    update_environment()
+    screen_xs, screen_ys, indices = visible_particles(decoy_ready_particles)
+    offset_x, offset_y = shake_offsets(len(indices))
+    
+    # Every trailing particle has a glow around it
+    particle_sprites.draw(screen, screen_xs + offset_x, screen_ys + offset_y,
+                          decoy_ready_particles.size[indices], decoy_ready_particles.alpha[indices],
+                          decoy_ready_particles.color[indices], True)
+
+def handle_sim_events():
+    """Turn the events raised by the simulation into sound, screen shake and UI feedback"""
+    global show_alert, firewall_alert_time, showing_upgrade, upgrade_timer, scanner_trail
+    global tutorial_active, shard_tutorial_active, show_shard_tutorial
+    
+    for event in sim.pop_events():
+        if event == EVENT_WALL_HIT:
+            # Minor screen shake for wall damage
+            trigger_screen_shake(0.1, 2)
+        elif event == EVENT_FIREWALL_HIT:
+            show_alert = True  # Show firewall alert
+            play_sound(impact_sound)
+            trigger_screen_shake()
+        elif event == EVENT_SCANNER_HIT:
+            play_sound(impact_sound)
+            trigger_screen_shake(0.2, 4)
+        elif event == EVENT_PLAYER_RESET:
+            show_alert = True
+            firewall_alert_time = 0
+            # Trigger intense screen shake
+            trigger_screen_shake(0.4, 5)
+            play_sound(impact_sound)
+        elif event == EVENT_PLAYER_DIED:
+            play_sound(impact_sound)
+            trigger_screen_shake(0.7, 15)  # Strong shake effect
+        elif event == EVENT_SHARD_COLLECTED:
+            trigger_screen_shake(0.2, 3)
+            play_sound(collect_sound)
+            # Show tutorial on first shard collection
+            if show_shard_tutorial:
+                shard_tutorial_active = True
+                show_shard_tutorial = False
+        elif event == EVENT_DECOY_SPAWNED:
+            # Show tutorial on first use
+            if show_decoy_tutorial and sim.state.decoy.count == 1:
+                tutorial_active = True
+        elif event == EVENT_SCANNER_SPAWNED:
+            scanner_trail = []  # Reset trail
+        elif event == EVENT_WALLS_DISABLED:
+            showing_upgrade = True
+            upgrade_timer = 0
+        elif event == EVENT_NODE_REACHED:
+            # Make level completion more obvious
+            play_sound(collect_sound)
+            trigger_screen_shake(0.5, 10)
+
+def interpolate_positions(alpha):
+    """Blend moving entities between the last two logic ticks for smooth drawing"""
+    global render_player_x, render_player_y, render_firewall_x, render_firewall_y
+    global render_scanner_x, render_scanner_y, render_pursuer_firewalls, render_pursuer_scanners
+    
+    player, firewall, scanner = sim.state.player, sim.state.firewall, sim.state.scanner
+    render_player_x = player.prev_x + (player.x - player.prev_x) * alpha
+    render_player_y = player.prev_y + (player.y - player.prev_y) * alpha
+    render_firewall_x = firewall.prev_x + (firewall.x - firewall.prev_x) * alpha
+    render_firewall_y = firewall.prev_y + (firewall.y - firewall.prev_y) * alpha
+    render_scanner_x = scanner.prev_x + (scanner.x - scanner.prev_x) * alpha
+    render_scanner_y = scanner.prev_y + (scanner.y - scanner.prev_y) * alpha
+    render_pursuer_firewalls, render_pursuer_scanners = [
+        (records['prev_x'] + (records['x'] - records['prev_x']) * alpha,
+         records['prev_y'] + (records['y'] - records['prev_y']) * alpha)
+        for records in (sim.state.pursuers.firewalls, sim.state.pursuers.scanners)]
+
+def update_logic(actions=0):
+    """
+    Run the fixed-timestep logic ticks owed for the time elapsed since the last
+    frame and return how far (0-1) we are into the next tick, for interpolation
+    """
+    global logic_accumulator, pending_actions
     
-    # Update data shards
-    update_data_shards()
+    pending_actions |= actions
+    logic_accumulator += min(clock.get_time() / 1000, MAX_FRAME_TIME)
     
-    # Update particles
+    while logic_accumulator >= LOGIC_DT:
+        if replay is not None:
+            replay.step()
+        else:
+            inputs = read_inputs(pending_actions)
+            events_before = len(sim.events)
+            sim.step(inputs, LOGIC_DT)
+            if recorder is not None:
+                recorder.record_step(inputs, sim.events[events_before:])
+        pending_actions = 0  # Key presses only apply to a single tick
+        logic_accumulator -= LOGIC_DT
+    
+    handle_sim_events()
+    return logic_accumulator / LOGIC_DT
+
+def update_effects():
+    """Update purely visual effects once per drawn frame"""
+    update_camera()
+    update_shard_glow()
     update_particles()
-    
-    # Update decoy-ready particles
     update_decoy_ready_particles()
-    
-    # Update screen shake effect
     update_screen_shake()
-    
-    # Check for shard collection
-    check_shard_collection()
+
+def draw_frame():
+    """Draw the game world and HUD for the current simulation state"""
+    global level_button_rect
     
     # Clear screen
     screen.fill(BLACK)
@@ -2716,12 +2052,15 @@ while running:
     # Draw firewall
     draw_firewall()
     
+    # Draw the extra firewalls and scanners of the later levels
+    draw_pursuers()
+    
     # Draw decoy if active
-    if decoy_active:
+    if sim.state.decoy.active:
         draw_decoy()
     
     # Draw scanner if active
-    if scanner_active:
+    if sim.state.scanner.active:
         draw_scanner()
     
     # Draw player
@@ -2737,20 +2076,8 @@ while running:
     if showing_upgrade:
         show_upgrade_message()
     
-    # Check collision with security node
-    if not game_won and check_node_collision():
-        game_won = True
-        # Make level completion more obvious
-        if sound_enabled:
-            collect_sound.play()
-        trigger_screen_shake(0.5, 10)
-    
-    # Check collision with firewall only if game isn't won
-    if not game_won and check_firewall_collision():
-        reset_player_position()
-    
     # Show win message if game is won
-    if game_won:
+    if sim.state.game_won:
         level_button_rect = show_win_message()
     else:
         level_button_rect = None
@@ -2758,17 +2085,221 @@ while running:
     # Show alert message if player hit the firewall
     if show_alert:
         show_alert_message()
-    
-    # Update display
-    pygame.display.flip()
-    
-    # Cap the frame rate
-    clock.tick(FPS)
-
-# Stop sounds before quitting
-if sound_enabled:
-    pygame.mixer.stop()
 
-# Quit pygame
-pygame.quit()
-sys.exit()
+def read_inputs(actions=0):
+    """Build the simulation input bitmask from the held movement keys plus this frame's actions"""
+    keys = pygame.key.get_pressed()
+    inputs = actions
+    
+    # Left movement (Left Arrow or A)
+    if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+        inputs |= INPUT_LEFT
+    # Right movement (Right Arrow or D)
+    if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+        inputs |= INPUT_RIGHT
+    # Up movement (Up Arrow or W)
+    if keys[pygame.K_UP] or keys[pygame.K_w]:
+        inputs |= INPUT_UP
+    # Down movement (Down Arrow or S)
+    if keys[pygame.K_DOWN] or keys[pygame.K_s]:
+        inputs |= INPUT_DOWN
+    
+    return inputs
+
+def present_frame(fps):
+    """Draw the profiler overlay if enabled, push the frame to the display and wait for the next one"""
+    if profiler.enabled:
+        overlay_rect = profiler.draw(screen, profiler_font, (VIEWPORT_WIDTH - 330, 50))
+        compositor.mark('profiler', overlay_rect)
+    compositor.present()
+    profiler.end_frame()
+    clock.tick(fps)
+
+# Time the main loop's phases and the calls inside them while profiling is enabled
+profiler.instrument(globals(), [
+    'update_logic', 'handle_sim_events', 'update_effects', 'update_camera', 'update_shard_glow',
+    'update_particles', 'update_decoy_ready_particles', 'update_screen_shake',
+    'draw_frame', 'draw_grid', 'draw_particles', 'draw_decoy_ready_particles', 'draw_walls',
+    'draw_data_shards', 'draw_security_node', 'draw_firewall', 'draw_pursuers', 'draw_decoy', 'draw_scanner',
+    'draw_player', 'draw_score', 'draw_hud', 'show_upgrade_message', 'show_win_message',
+    'show_alert_message', 'draw_start_screen', 'draw_decoy_tutorial', 'draw_shard_tutorial'
+])
+SIM_PROFILED_METHODS = [
+    'step', 'move_player', 'update_decoy', 'update_scanner', 'update_pursuers', 'update_environment',
+    'update_data_shards', 'check_shard_collection', 'update_firewall'
+]
+profiler.instrument(sim, SIM_PROFILED_METHODS, prefix='sim.')
+
+def main():
+    global tutorial_active, shard_tutorial_active, show_decoy_tutorial
+    
+    # Start ambient sound loop if available
+    if sound_enabled:
+        try:
+            ambient_sound.play(-1)  # -1 makes it loop indefinitely
+        except:
+            print("Could not play ambient sound")
+    
+    # Initialize particles
+    spawn_particles(50)  # Start with some particles
+    
+    # Main game loop
+    running = True
+    game_started = False  # Flag to track if the main game has started
+    if replay_recording is not None:
+        # Replays skip the start screen
+        game_started = True
+        start_game()
+    button_rect = None  # Store the start button rect
+    tutorial_button_rect = None  # Store the tutorial continue button rect
+    shard_tutorial_button_rect = None  # Store the shard tutorial continue button rect
+    shown_screen = None  # Which screen the last frame showed
+    screen_frames = 0  # Frames the current screen has been showing for
+    
+    while running:
+        profiler.begin_frame()
+        
+        # Q/E presses collected from this frame's events
+        actions = 0
+        
+        # Handle events
+        for event in pygame.event.get():
+            if event.type in INPUT_EVENT_TYPES:
+                idle_throttle.note_input()
+            
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE and sim.state.game_won and sim.state.current_level >= sim.state.max_level:
+                    running = False
+                # F3 toggles the frame profiler
+                elif event.key == pygame.K_F3:
+                    profiler.toggle()
+                    compositor.mark_full()
+                # Space to start game from the start screen
+                elif event.key == pygame.K_SPACE and not game_started:
+                    game_started = True
+                    start_game()
+                # Q key to spawn decoy (only if game is started and no tutorial is showing)
+                elif event.key == pygame.K_q and game_started and not tutorial_active and not shard_tutorial_active:
+                    actions |= INPUT_DECOY
+                # E key to disable walls if enough data shards collected
+                elif event.key == pygame.K_e and game_started and not tutorial_active and not shard_tutorial_active:
+                    actions |= INPUT_DISABLE_WALLS
+                # R key to retry the level from its start (replays retry when the recording did)
+                elif event.key == pygame.K_r and game_started and replay is None and not tutorial_active and not shard_tutorial_active:
+                    retry_level()
+            # Handle mouse clicks for the start button or level progression button
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:  # Left mouse button
+                    mouse_pos = pygame.mouse.get_pos()
+                    # Check for start button if not started
+                    if not game_started and button_rect and button_rect.collidepoint(mouse_pos):
+                        game_started = True
+                        start_game()
+                    # Check for level progression button if level completed
+                    elif level_completed and level_button_rect and level_button_rect.collidepoint(mouse_pos):
+                        # Progress to next level
+                        reset_level(sim.state.current_level + 1)
+                    # Check for tutorial continue button
+                    elif tutorial_active and tutorial_button_rect and tutorial_button_rect.collidepoint(mouse_pos):
+                        tutorial_active = False
+                        show_decoy_tutorial = False
+                    # Check for shard tutorial continue button
+                    elif shard_tutorial_active and shard_tutorial_button_rect and shard_tutorial_button_rect.collidepoint(mouse_pos):
+                        shard_tutorial_active = False
+        
+        # Present the whole first frame of every screen, since nothing on the display can be reused
+        if not game_started:
+            current_screen = 'start'
+        elif tutorial_active:
+            current_screen = 'decoy_tutorial'
+        elif shard_tutorial_active:
+            current_screen = 'shard_tutorial'
+        else:
+            current_screen = 'game'
+        if current_screen != shown_screen:
+            shown_screen = current_screen
+            screen_frames = 0
+            compositor.mark_full()
+        screen_frames += 1
+        
+        # Show start screen if game not started
+        if not game_started:
+            button_rect = draw_start_screen()
+            present_frame(idle_throttle.fps(static=True))
+            continue
+        
+        # If a tutorial is active, pause the game and show it
+        if tutorial_active or shard_tutorial_active:
+            darken = screen_frames <= OVERLAY_SETTLE_FRAMES
+            if tutorial_active:
+                tutorial_button_rect = draw_decoy_tutorial(darken)
+            else:
+                shard_tutorial_button_rect = draw_shard_tutorial(darken)
+            present_frame(idle_throttle.fps(static=True, animating=darken))
+            continue
+        
+        # Advance the game logic at its fixed rate, then draw an interpolated frame
+        alpha = update_logic(actions)
+        if replay is not None and replay.finished:
+            running = False
+        interpolate_positions(alpha)
+        update_effects()
+        draw_frame()
+        
+        # Update display and cap the frame rate - the final win screen counts
+        # as static once nobody touches the input
+        compositor.mark_full()
+        game_complete = sim.state.game_won and sim.state.current_level >= sim.state.max_level
+        present_frame(idle_throttle.fps(static=game_complete))
+    
+    # Stop sounds before quitting
+    if sound_enabled:
+        pygame.mixer.stop()
+    
+    # Save the session, or report how the replay went
+    if recorder is not None:
+        path = record_path or default_recording_path(recorder.seed)
+        recorder.save(path)
+        print(f"Session recorded to {path}")
+    if replay is not None:
+        print(f"Replayed {replay.tick} ticks, {replay.mismatches} differing from the recording")
+    
+    # Save the profiler stats if it was used this session
+    if profiler.has_samples():
+        profiler.dump(profile_dump_path)
+        print(f"Frame profile written to {profile_dump_path}")
+    
+    # Quit pygame
+    pygame.quit()
+    sys.exit()
+
+if __name__ == '__main__':
+    # --seed N makes the run reproducible: same maze, shards, firewall and
+    # scanner behaviour, and the same effects, for the same inputs
+    if '--seed' in sys.argv:
+        arg_index = sys.argv.index('--seed') + 1
+        if arg_index < len(sys.argv):
+            run_seed = int(sys.argv[arg_index])
+    # --record PATH saves the session there instead of a new file in recordings/,
+    # --no-record doesn't save it
+    if '--record' in sys.argv:
+        arg_index = sys.argv.index('--record') + 1
+        if arg_index < len(sys.argv):
+            record_path = sys.argv[arg_index]
+    if '--no-record' in sys.argv:
+        recording_enabled = False
+    # --replay FILE plays a recorded session back in real time
+    if '--replay' in sys.argv:
+        arg_index = sys.argv.index('--replay') + 1
+        if arg_index < len(sys.argv):
+            replay_recording = load_recording(sys.argv[arg_index])
+    # --profile [PATH] starts with the frame profiler enabled
+    if '--profile' in sys.argv:
+        profiler.toggle()
+        arg_index = sys.argv.index('--profile') + 1
+        # The path is optional, so a following flag isn't taken for one
+        if arg_index < len(sys.argv) and not sys.argv[arg_index].startswith('-'):
+            profile_dump_path = sys.argv[arg_index]
+    main()
@@ -0,0 +1,94 @@
+"""
+Partial display updates and idle frame-rate throttling for Cyberpunk Hacker Duel.
+
+Screens that barely change (tutorials, the title screen left unattended) don't
+need the whole 800x600 frame pushed to the display at 60 FPS. Drawing code
+marks the regions it changed, grouped by layer, and DirtyRectCompositor hands
+only those to pygame.display.update(). IdleThrottle lowers the frame rate on
+such screens once nothing animates or nobody has touched the input for a while.
+"""
+import pygame
+
+
+class DirtyRectCompositor:
+    """
+    Collects the screen regions changed this frame, per layer.
+
+    A layer's regions from the previous frame are presented again as well, so
+    whatever a moving or shrinking element left behind gets cleared on screen.
+    """
+
+    def __init__(self, screen_rect):
+        self.screen_rect = pygame.Rect(screen_rect)
+        self.layers = {}  # layer name -> rects changed this frame
+        self.previous = {}  # layer name -> rects changed last frame
+        self.full = False
+
+    def mark(self, layer, rect):
+        """Record that the given region of a layer changed this frame"""
+        rect = self.screen_rect.clip(pygame.Rect(rect))
+        if rect.width and rect.height:
+            self.layers.setdefault(layer, []).append(rect)
+
+    def mark_full(self):
+        """Present the whole screen this frame (screen switches, gameplay)"""
+        self.full = True
+
+    def dirty_rects(self):
+        """This frame's regions to present, with overlapping ones merged"""
+        rects = []
+        for layer in set(self.layers) | set(self.previous):
+            rects.extend(self.layers.get(layer, ()))
+            rects.extend(self.previous.get(layer, ()))
+
+        merged = []
+        for rect in rects:
+            # Fold every already merged rect that overlaps this one into it
+            overlap = rect.collidelist(merged)
+            while overlap != -1:
+                rect = rect.union(merged.pop(overlap))
+                overlap = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+
+    def present(self):
+        """Push the changed regions to the display and start a new frame. Returns the rects updated."""
+        rects = [self.screen_rect] if self.full else self.dirty_rects()
+        if any(rect.contains(self.screen_rect) for rect in rects):
+            rects = [self.screen_rect]
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+
+        self.previous = self.layers
+        self.layers = {}
+        self.full = False
+        return rects
+
+
+class IdleThrottle:
+    """Picks the frame rate: full speed while playing, lower on static screens left alone"""
+
+    def __init__(self, active_fps=60, idle_fps=15, idle_after=30.0):
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after  # seconds without input before an animated static screen slows down
+        self.last_input = pygame.time.get_ticks()
+
+    def note_input(self):
+        self.last_input = pygame.time.get_ticks()
+
+    def idle_seconds(self):
+        return (pygame.time.get_ticks() - self.last_input) / 1000
+
+    def fps(self, static=False, animating=True):
+        """
+        Frame rate for the next frame. Gameplay always runs at full speed; a
+        static screen drops to idle_fps as soon as nothing animates, or after
+        idle_after seconds without input.
+        """
+        if not static:
+            return self.active_fps
+        if not animating or self.idle_seconds() >= self.idle_after:
+            return self.idle_fps
+        return self.active_fps
@@ -0,0 +1,1050 @@
+"""
+Headless simulation core for Cyberpunk Hacker Duel.
+
+Every gameplay rule - player movement, maze walls, the firewall, decoys, the
+scanner, data shards, the security node and the extra pursuers of the harder
+levels - lives in GameSimulation. Nothing in here touches the display, fonts
+or the sound mixer, so a simulation can be stepped thousands of times per
+second without a window. cyberpunk_hacker.py drives one GameSimulation from
+its main loop and simply draws whatever state it exposes.
+"""
+import math
+import random
+import struct
+import sys
+import time
+
+import numpy as np
+import pygame  # Only pygame.Rect is used, which works without pygame.init()
+
+from game_state import (
+    GameState, PlayerState, NodeState, FirewallState, DataShard, PursuerState, PLAYER_SIZE, ENVIRONMENT_MAZE
+)
+from maze import Maze
+from navigation import FlowField
+from pursuers import (
+    FIREWALL_PROFILES, SCANNER_PROFILES, SCALAR_LIMIT, FIREWALL_DRAWS, SCANNER_DRAWS, pursuer_counts,
+    new_firewalls, new_scanners, send_back, move_firewalls, move_scanners, move_firewall, move_scanner, far_spot,
+    firewall_hits, scanner_hits, near, flow_waypoints
+)
+
+# Viewport dimensions (the level 3+ firewall tracks the player relative to these)
+VIEWPORT_WIDTH, VIEWPORT_HEIGHT = 800, 600
+# Base world dimensions (entire game world) - will be scaled based on level
+BASE_WORLD_WIDTH, BASE_WORLD_HEIGHT = 1600, 1200
+
+# Fixed logic rate used by the game loop; rendering runs at its own rate and
+# interpolates between the last two logic ticks
+LOGIC_HZ = 120
+LOGIC_DT = 1 / LOGIC_HZ
+# Speeds are tuned in pixels per frame at this rate and scaled by elapsed time
+REFERENCE_FPS = 60
+
+# Input bitmask passed to GameSimulation.step()
+# Movement bits describe keys held during the tick, action bits describe
+# keys pressed during the tick
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_UP = 4
+INPUT_DOWN = 8
+INPUT_DECOY = 16  # Q - deploy decoy
+INPUT_DISABLE_WALLS = 32  # E - disable walls
+
+# Events pushed onto GameSimulation.events for the renderer to react to
+EVENT_WALL_HIT = 'wall_hit'  # Player took damage from a wall
+EVENT_FIREWALL_HIT = 'firewall_hit'  # Player took damage from the firewall
+EVENT_PLAYER_RESET = 'player_reset'  # Player was sent back to the start position
+EVENT_PLAYER_DIED = 'player_died'  # Player health reached zero
+EVENT_SHARD_COLLECTED = 'shard_collected'  # One or more data shards were collected
+EVENT_DECOY_SPAWNED = 'decoy_spawned'  # A decoy was deployed
+EVENT_SCANNER_SPAWNED = 'scanner_spawned'  # A scanner started tracking the decoy
+EVENT_WALLS_DISABLED = 'walls_disabled'  # Data shards were spent to disable walls
+EVENT_NODE_REACHED = 'node_reached'  # Player reached the security node
+EVENT_SCANNER_HIT = 'scanner_hit'  # Player took damage from one of the extra scanners
+
+def chance(rng, probability, frames):
+    """
+    Roll a random event that has the given probability per reference frame,
+    for a tick that covers the given number of reference frames.
+    """
+    if frames == 1:
+        return rng.random() < probability
+    return rng.random() < 1 - (1 - probability) ** frames
+
+
+def overlap_times(start, size, other_start, other_size, velocity):
+    """
+    When, as a fraction of a tick, the span [start, start + size) moving by
+    velocity overlaps the fixed span [other_start, other_start + other_size):
+    (first, last) clipped to the tick, with first >= last if it never does.
+    """
+    if velocity == 0:
+        overlapping = start < other_start + other_size and other_start < start + size
+        return (0.0, 1.0) if overlapping else (1.0, 0.0)
+    first = (other_start - start - size) / velocity
+    last = (other_start + other_size - start) / velocity
+    if velocity < 0:
+        first, last = last, first
+    return max(first, 0.0), min(last, 1.0)
+
+
+def segment_meets_circle(x1, y1, x2, y2, center_x, center_y, radius):
+    """Whether the segment from (x1, y1) to (x2, y2) passes closer than radius to the centre"""
+    dx, dy = x2 - x1, y2 - y1
+    length_squared = dx * dx + dy * dy
+    # Closest point of the segment to the centre
+    t = 0.0 if length_squared == 0 else min(1.0, max(0.0, ((center_x - x1) * dx + (center_y - y1) * dy) /
+                                                     length_squared))
+    return math.sqrt((x1 + t * dx - center_x) ** 2 + (y1 + t * dy - center_y) ** 2) < radius
+
+
+def new_seed():
+    """A fresh seed for a run that wasn't given one, so it can still be replayed"""
+    return random.SystemRandom().randrange(2 ** 32)
+
+
+# random.Random internal state: the Mersenne Twister words and position, then
+# whether a gauss() value is cached and that value
+RNG_STATE = struct.Struct('<625I?d')
+
+
+class Snapshot:
+    """
+    Everything needed to put a GameSimulation back exactly where it was: its
+    state and the position of its random stream.
+
+    Taking and restoring one only copies the small state objects (the maze is
+    shared, since it never changes once generated), so both take microseconds.
+    to_bytes() gives a compact binary form for saving checkpoints or sending
+    them over the network.
+    """
+    __slots__ = ('state', 'rng_state')
+
+    def __init__(self, state, rng_state):
+        self.state = state
+        self.rng_state = rng_state
+
+    def to_bytes(self):
+        version, words, gauss_next = self.rng_state
+        rng = RNG_STATE.pack(*words, gauss_next is not None, gauss_next or 0.0)
+        return rng + self.state.to_bytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        *words, has_gauss, gauss_next = RNG_STATE.unpack_from(data)
+        state, _ = GameState.from_bytes(data, RNG_STATE.size)
+        return cls(state, (3, tuple(words), gauss_next if has_gauss else None))
+
+
+class GameSimulation:
+    """The rules that advance a GameState one tick at a time"""
+
+    def __init__(self, seed=None):
+        # Gameplay randomness (maze layout, shards, firewall and scanner
+        # behaviour) all comes from this stream, so a run is reproducible from
+        # its seed. Cosmetic randomness belongs to the renderer.
+        self.reseed(seed)
+
+        # Start in the first quarter of the map, with the security node on
+        # the right side of the world
+        start_x = BASE_WORLD_WIDTH // 4 - PLAYER_SIZE // 2
+        start_y = BASE_WORLD_HEIGHT - 200
+        self.state = GameState(
+            world_width=BASE_WORLD_WIDTH,
+            world_height=BASE_WORLD_HEIGHT,
+            player=PlayerState(x=start_x, y=start_y, start_x=start_x, start_y=start_y),
+            node=NodeState(x=BASE_WORLD_WIDTH - 150, y=BASE_WORLD_HEIGHT // 2),
+            # The firewall starts in the middle of the world
+            firewall=FirewallState(y=BASE_WORLD_HEIGHT // 2 - 100),
+        )
+
+        # Positions at the start of the last tick, used to interpolate rendering
+        self.save_previous_positions()
+
+        # Events raised since the renderer last drained them
+        self.events = []
+
+        # Path distances to the decoy, kept between ticks - see scanner_waypoint()
+        self.scanner_flow = None
+
+        # Initialize with some shards
+        for _ in range(2):
+            self.spawn_data_shard()
+
+    def reseed(self, seed=None):
+        """Restart the gameplay random stream from seed (a fresh one if None)"""
+        self.seed = new_seed() if seed is None else seed
+        self.rng = random.Random(self.seed)
+
+    def snapshot(self):
+        """A Snapshot of the current state, for restore() to go back to"""
+        return Snapshot(self.state.copy(), self.rng.getstate())
+
+    def restore(self, snapshot):
+        """
+        Put the simulation back to a snapshot, much faster than reset_level()
+        regenerating everything. The snapshot stays usable for further restores.
+        """
+        maze = self.state.walls.maze
+        self.state = snapshot.state.copy()
+        # Restoring the same level over and over (retries, rollback from
+        # Snapshot.from_bytes()) keeps the maze in play, along with the chunks
+        # it has generated
+        walls = self.state.walls
+        if walls.maze is not maze and walls.maze.parameters() == maze.parameters():
+            walls.maze = maze
+        self.rng.setstate(snapshot.rng_state)
+        self.events.clear()
+
+    def pop_events(self):
+        """Return and clear the events raised since the last call"""
+        events = self.events
+        self.events = []
+        return events
+
+    def save_previous_positions(self):
+        """Remember current positions so the renderer can interpolate from them"""
+        state = self.state
+        player, firewall, scanner = state.player, state.firewall, state.scanner
+        player.prev_x, player.prev_y = player.x, player.y
+        firewall.prev_x, firewall.prev_y = firewall.x, firewall.y
+        scanner.prev_x, scanner.prev_y = scanner.x, scanner.y
+        pursuers = state.pursuers
+        if len(pursuers.firewalls) or len(pursuers.scanners):
+            for records in (pursuers.firewalls, pursuers.scanners):
+                records['prev_x'], records['prev_y'] = records['x'], records['y']
+
+    def step(self, inputs=0, dt=LOGIC_DT):
+        """
+        Advance the simulation by one tick.
+
+        inputs is a bitmask of INPUT_* flags and dt is the time covered by the
+        tick in seconds. All movement, timers and random events scale with dt,
+        so the same amount of game time plays out identically whatever the
+        tick rate.
+        """
+        state = self.state
+        player = state.player
+        state.ticks += 1
+        self.save_previous_positions()
+        frames = dt * REFERENCE_FPS
+
+        if not state.game_won:
+            if inputs & INPUT_DECOY and state.decoy.can_use:
+                self.spawn_decoy()
+            if inputs & INPUT_DISABLE_WALLS and player.score >= 5:
+                self.disable_walls()
+            self.move_player(inputs, frames)
+
+        # Update damage cooldown timer
+        if player.damage_cooldown > 0:
+            player.damage_cooldown -= dt
+
+        # Check if player is dead and handle it
+        if player.health <= 0 and not player.dead:
+            player.dead = True
+            self.reset_player_position()
+            player.health = player.max_health
+            self.events.append(EVENT_PLAYER_DIED)
+
+        self.update_decoy(dt)
+        self.update_scanner(frames)
+        self.update_pursuers(frames)
+        self.update_environment(dt)
+        self.update_data_shards(dt)
+        self.check_shard_collection()
+        self.update_firewall(frames)
+
+        # Check collision with security node
+        if not state.game_won and self.check_node_collision():
+            state.game_won = True
+            self.events.append(EVENT_NODE_REACHED)
+
+        # Check collision with the firewalls only if game isn't won
+        if not state.game_won and (self.check_firewall_collision() or self.check_pursuer_collision()):
+            self.reset_player_position()
+
+    def move_player(self, inputs, frames=1):
+        """Move the player according to the held movement keys, sliding along walls"""
+        state = self.state
+        player = state.player
+        player_x, player_y = player.x, player.y
+        player_speed = player.speed * frames
+        half_player = player.size / 2
+
+        # Calculate potential new positions, within the world
+        new_x, new_y = player_x, player_y
+        if inputs & INPUT_LEFT:
+            new_x = max(half_player, player_x - player_speed)
+        if inputs & INPUT_RIGHT:
+            new_x = min(state.world_width - player.size, player_x + player_speed)
+        if inputs & INPUT_UP:
+            new_y = max(half_player, player_y - player_speed)
+        if inputs & INPUT_DOWN:
+            new_y = min(state.world_height - player.size, player_y + player_speed)
+
+        # One axis at a time, so a wall in the way of one still lets the
+        # player slide along it on the other
+        if new_x != player_x:
+            player.x = self.sweep_player(new_x, player_y)[0]
+        if new_y != player_y:
+            player.y = self.sweep_player(player.x, new_y)[1]
+
+    def generate_maze_walls(self):
+        """
+        Lay out the level's maze. Its walls are only generated chunk by chunk
+        as parts of the world come into play (see maze.py), so this just picks
+        the layout and where the way from the player to the node runs.
+        """
+        state = self.state
+        player, node, walls = state.player, state.node, state.walls
+        half_player = player.size // 2
+        # Always a new maze, since copies of the state share it
+        walls.maze = Maze(state.world_width, state.world_height, self.rng.getrandbits(32),
+                          walls.width, walls.height, walls.base_count,
+                          int(player.x) + half_player, int(player.y) + half_player, node.x, node.y)
+
+    def sweep_player(self, new_x, new_y):
+        """
+        Where the player stops moving in a straight line along one axis to
+        new_x, new_y: there, or against the first visible wall in the way -
+        however far the move, it can't skip over one. Running into a wall
+        deals damage.
+        """
+        state = self.state
+        player, walls = state.player, state.walls
+        if not walls.visible:
+            return new_x, new_y
+
+        # Player position is the center, the box needs top-left
+        half_player = player.size / 2
+        new_left, new_top = new_x - half_player, new_y - half_player
+        left, top = walls.maze.sweep(player.x - half_player, player.y - half_player,
+                                     player.size, player.size, new_left, new_top)
+        if (left, top) == (new_left, new_top):
+            return new_x, new_y
+
+        # Deal 1 damage when colliding with walls if damage cooldown expired
+        if player.damage_cooldown <= 0:
+            player.health -= 1  # Wall collision deals 1 damage
+            player.damage_cooldown = player.damage_cooldown_duration / 2  # Shorter cooldown for wall collisions
+            self.events.append(EVENT_WALL_HIT)
+        return left + half_player, top + half_player
+
+    def update_environment(self, dt):
+        # Handle wall timer if active - this is the only function that should
+        # automatically make walls visible again after being disabled
+        walls = self.state.walls
+        if walls.timer_active:
+            walls.timer += dt
+
+            # Check if wall timer is complete
+            if walls.timer >= walls.hide_duration:
+                walls.visible = True
+                walls.timer_active = False
+
+    def update_firewall(self, frames=1):
+        """Move the firewall based on level and decoy presence"""
+        state = self.state
+        firewall, decoy, player = state.firewall, state.decoy, state.player
+        firewall_height = firewall.height
+        firewall_speed = firewall.speed * frames
+        firewall_vertical_speed = firewall.vertical_speed * frames
+        current_level = state.current_level
+
+        if decoy.active:
+            # Calculate distance to decoy for variable speed
+            dx = decoy.x - firewall.x
+            dy = decoy.y - (firewall.y + firewall_height/2)  # Target middle of firewall to decoy
+            distance = math.sqrt(dx*dx + dy*dy)
+
+            # Horizontal attraction to decoy - stronger at higher levels
+            attraction_multiplier = 1.0 + (current_level * 0.2)
+
+            if firewall.x < decoy.x:
+                # Speed increases as distance increases - capped at 2x normal speed
+                speed_factor = min(2.0, max(1.0, distance / 300))
+                firewall.x += firewall_speed * speed_factor * attraction_multiplier
+            elif firewall.x > decoy.x:
+                speed_factor = min(2.0, max(1.0, distance / 300))
+                firewall.x -= firewall_speed * speed_factor * attraction_multiplier
+
+            # Vertical movement toward decoy - all levels now, but stronger at higher levels
+            vertical_attraction = 0.5 + (current_level * 0.25)
+
+            # Only move if decoy is not already aligned (within 10 pixels)
+            if abs(dy) > 10:
+                # Make vertical movement proportional to distance but with a cap
+                vert_speed_factor = min(1.5, max(0.5, abs(dy) / 200))
+                vert_step = firewall_vertical_speed * vert_speed_factor * vertical_attraction
+
+                if firewall.y + firewall_height/2 < decoy.y:  # If decoy is below firewall center
+                    firewall.y += vert_step
+                else:  # If decoy is above firewall center
+                    firewall.y -= vert_step
+
+            # Add subtle oscillation to make movement more natural
+            if chance(self.rng, 0.2, frames):  # 20% chance each frame
+                firewall.y += self.rng.uniform(-1.0, 1.0)
+            return
+
+        # Normal movement - depends on level
+        if current_level == 1:
+            # Level 1: Simple rightward movement with basic vertical bouncing
+            firewall.x += firewall_speed
+            firewall.y += firewall_vertical_speed * firewall.vertical_direction
+            self._bounce_firewall()
+
+        elif current_level == 2:
+            # Level 2: Occasional speed variations with more vertical movement
+            if self.rng.random() > 0.95:
+                # Randomly adjust speed slightly for brief moments
+                speed_variation = self.rng.uniform(0.8, 1.2)
+                firewall.x += firewall_speed * speed_variation
+            else:
+                firewall.x += firewall_speed
+
+            # Faster vertical movement
+            firewall.y += (firewall_vertical_speed * 1.5) * firewall.vertical_direction
+
+            # Occasional direction change (2% chance per frame)
+            if chance(self.rng, 0.02, frames):
+                firewall.vertical_direction *= -1
+
+            self._bounce_firewall()
+
+        else:  # Level 3+
+            # Level 3+: More smart tracking behavior
+            # Horizontal tracking
+            if self.rng.random() > 0.7:  # 30% chance to track player
+                if player.x > firewall.x + VIEWPORT_WIDTH/2:  # Only accelerate if player is far ahead
+                    firewall.x += firewall_speed * 1.3
+                else:
+                    firewall.x += firewall_speed * 0.9  # Slow down when close to player
+            else:
+                firewall.x += firewall_speed
+
+            # Vertical tracking - attempt to move toward player's y position
+            if self.rng.random() > 0.5:  # 50% chance to adjust vertically toward player
+                if player.y > firewall.y + firewall_height/2:
+                    firewall.y += firewall_vertical_speed * 2
+                elif player.y < firewall.y + firewall_height/2:
+                    firewall.y -= firewall_vertical_speed * 2
+            else:
+                # Continue in current direction
+                firewall.y += firewall_vertical_speed * 2 * firewall.vertical_direction
+                self._bounce_firewall()
+
+        # Reset if off screen horizontally
+        if firewall.x > state.world_width:
+            firewall.x = -firewall.width
+            # Randomize vertical position when coming back
+            firewall.y = self.rng.randint(0, state.world_height - firewall_height)
+            # Don't interpolate across the jump
+            firewall.prev_x, firewall.prev_y = firewall.x, firewall.y
+
+    def _bounce_firewall(self):
+        """Reverse the firewall's vertical direction at the top or bottom of the world"""
+        firewall = self.state.firewall
+        if firewall.y <= 0:
+            firewall.vertical_direction = 1
+        elif firewall.y + firewall.height >= self.state.world_height:
+            firewall.vertical_direction = -1
+
+    def reset_player_position(self):
+        player = self.state.player
+        player.x = player.start_x
+        player.y = player.start_y
+        player.prev_x, player.prev_y = player.x, player.y
+        self.events.append(EVENT_PLAYER_RESET)
+
+    def spawn_decoy(self):
+        state = self.state
+        decoy = state.decoy
+        if decoy.can_use:
+            decoy.active = True
+            decoy.x = state.player.x
+            decoy.y = state.player.y
+            decoy.duration = decoy.max_duration
+            decoy.can_use = False
+            decoy.cooldown = decoy.max_cooldown
+            decoy.count += 1
+            self.events.append(EVENT_DECOY_SPAWNED)
+
+            # If player has used decoy twice or more and not level 1, spawn a scanner
+            if decoy.count >= 2 and state.current_level > 1:
+                self.spawn_scanner()
+
+    def spawn_scanner(self):
+        state = self.state
+        scanner = state.scanner
+
+        # Don't spawn scanners in level 1
+        if state.current_level == 1:
+            return
+
+        # Spawn from firewall position
+        scanner.active = True
+        scanner.x = state.firewall.x + state.firewall.width // 2
+        scanner.y = self.rng.randint(50, state.world_height - 50)  # Random y position
+        scanner.prev_x, scanner.prev_y = scanner.x, scanner.y
+        self.events.append(EVENT_SCANNER_SPAWNED)
+
+        # Adjust scanner speed based on level
+        scanner.speed = SCANNER_PROFILES[min(state.current_level, 3)][1]
+
+    def update_decoy(self, dt):
+        decoy = self.state.decoy
+
+        # Update decoy timer if active
+        if decoy.active:
+            decoy.duration -= dt
+            if decoy.duration <= 0:
+                decoy.active = False
+
+        # Update cooldown if not ready
+        if not decoy.can_use:
+            decoy.cooldown -= dt
+            if decoy.cooldown <= 0:
+                decoy.can_use = True
+
+    def update_scanner(self, frames=1):
+        state = self.state
+        scanner, decoy = state.scanner, state.decoy
+        if not scanner.active or not decoy.active:
+            # Reset scanner if decoy disappears
+            if scanner.active and not decoy.active:
+                scanner.active = False
+            return
+
+        # The scanner isn't stopped by walls but steers around them, which
+        # only works while each move is shorter than a navigation cell, so
+        # long ticks are split into about one move per reference frame
+        moves = max(1, round(frames))
+        for _ in range(moves):
+            from_x, from_y = scanner.x, scanner.y
+            self.move_scanner(frames / moves)
+
+            # Check if scanner reached decoy anywhere along the way
+            if self.check_scanner_decoy_collision(from_x, from_y):
+                self.destroy_decoy()
+                return
+
+    def move_scanner(self, frames):
+        """Move the active scanner toward the decoy, following the level's behaviour"""
+        state = self.state
+        scanner, decoy = state.scanner, state.decoy
+
+        # Calculate direction to decoy
+        half_player = state.player.size // 2
+        decoy_center_x = decoy.x + half_player
+        decoy_center_y = decoy.y + half_player
+
+        dx = decoy_center_x - scanner.x
+        dy = decoy_center_y - scanner.y
+        distance = max(0.1, math.sqrt(dx * dx + dy * dy))
+
+        # Path around visible walls toward the decoy, heading straight for it
+        # once it's close (or if there's no path)
+        waypoint = self.scanner_waypoint(decoy_center_x, decoy_center_y)
+        if waypoint is None:
+            # Normalize direction
+            dx /= distance
+            dy /= distance
+        else:
+            dx = waypoint[0] - scanner.x
+            dy = waypoint[1] - scanner.y
+            waypoint_distance = max(0.1, math.sqrt(dx * dx + dy * dy))
+            dx /= waypoint_distance
+            dy /= waypoint_distance
+
+        scanner_speed = scanner.speed * frames
+
+        # Movement behavior varies by level
+        if state.current_level == 2:
+            # Level 2: Simple, somewhat inaccurate tracking
+            # Add some randomness to movement (makes it less accurate)
+            dx += self.rng.uniform(-0.2, 0.2)
+            dy += self.rng.uniform(-0.2, 0.2)
+
+            # Re-normalize after adding randomness
+            new_dist = max(0.1, math.sqrt(dx * dx + dy * dy))
+            dx /= new_dist
+            dy /= new_dist
+
+            # Move scanner toward decoy at constant speed
+            scanner.x += dx * scanner_speed
+            scanner.y += dy * scanner_speed
+
+        else:  # Level 3+
+            # Level 3: Advanced tracking with variable speed and prediction
+
+            # Speed varies with distance - speeds up when far, slows when close
+            speed_factor = min(1.5, max(0.8, distance / 200))
+
+            # Add slight prediction to target ahead of the decoy's position
+            # This makes the scanner appear "smarter"
+            if self.rng.random() > 0.5 and waypoint is None:  # 50% chance to use prediction
+                prediction_x = decoy_center_x + self.rng.randint(-10, 30)  # Predict slightly ahead
+                prediction_y = decoy_center_y + self.rng.randint(-20, 20)
+
+                # Calculate direction to prediction point instead
+                pred_dx = prediction_x - scanner.x
+                pred_dy = prediction_y - scanner.y
+                pred_dist = max(0.1, math.sqrt(pred_dx * pred_dx + pred_dy * pred_dy))
+
+                # Blend the original and prediction directions
+                dx = (dx + (pred_dx / pred_dist)) / 2
+                dy = (dy + (pred_dy / pred_dist)) / 2
+
+                # Re-normalize
+                final_dist = max(0.1, math.sqrt(dx * dx + dy * dy))
+                dx /= final_dist
+                dy /= final_dist
+
+            # Move scanner with variable speed
+            scanner.x += dx * scanner_speed * speed_factor
+            scanner.y += dy * scanner_speed * speed_factor
+
+            # Occasionally make sharp movements to appear more aggressive
+            if chance(self.rng, 0.05, frames):  # 5% chance each frame
+                scanner.x += dx * scanner.speed * 1.5
+                scanner.y += dy * scanner.speed * 1.5
+
+    def scanner_waypoint(self, target_x, target_y):
+        """
+        Where the scanner should head next on its way to the target around the
+        visible walls, or None to head straight for it (as it does while it's
+        further away than the navigation grid around the target reaches)
+        """
+        flow = self.flow_to(target_x, target_y)
+        if flow is None:
+            return None
+        return flow.waypoint(self.state.scanner.x, self.state.scanner.y)
+
+    def flow_to(self, target_x, target_y):
+        """The FlowField toward the target around the visible walls, or None if there are none"""
+        walls = self.state.walls
+        if not walls.visible or walls.maze.empty:
+            return None
+        nav = walls.maze.nav_grid(target_x, target_y)
+        flow = self.scanner_flow
+        if flow is None or flow.nav is not nav:
+            flow = self.scanner_flow = FlowField(nav)
+        flow.set_target(target_x, target_y)
+        return flow
+
+    def destroy_decoy(self):
+        self.state.decoy.active = False
+        self.state.scanner.active = False
+
+    def check_scanner_decoy_collision(self, from_x, from_y):
+        """Whether the scanner touched the decoy on its way from (from_x, from_y) to where it is"""
+        state = self.state
+        scanner, decoy = state.scanner, state.decoy
+        if not scanner.active or not decoy.active:
+            return False
+
+        # Calculate center of decoy
+        half_player = state.player.size // 2
+        decoy_center_x = decoy.x + half_player
+        decoy_center_y = decoy.y + half_player
+
+        # Test the whole path rather than where it ended, so a fast scanner
+        # can't step over the decoy
+        return segment_meets_circle(from_x, from_y, scanner.x, scanner.y,
+                                    decoy_center_x, decoy_center_y, scanner.radius + half_player)
+
+    def check_node_collision(self):
+        """Check if player has collided with the security node, return True if collided"""
+        player, node = self.state.player, self.state.node
+        player_rect = pygame.Rect(player.x, player.y, player.size, player.size)
+
+        # Calculate the node's square rectangle
+        square_size = node.radius * 2
+        node_rect = pygame.Rect(
+            node.x - square_size // 2,
+            node.y - square_size // 2,
+            square_size,
+            square_size
+        )
+
+        return player_rect.colliderect(node_rect)
+
+    def check_firewall_collision(self):
+        """
+        Whether the player and the firewall overlapped at any point during
+        the tick, taking both to have moved in a straight line from where they
+        started it - so however fast they move, one can't pass through the
+        other between ticks. Deals firewall damage.
+        """
+        player, firewall = self.state.player, self.state.firewall
+
+        # The player's movement as seen from the firewall
+        dx = (player.x - player.prev_x) - (firewall.x - firewall.prev_x)
+        dy = (player.y - player.prev_y) - (firewall.y - firewall.prev_y)
+        first_x, last_x = overlap_times(player.prev_x, player.size, firewall.prev_x, firewall.width, dx)
+        first_y, last_y = overlap_times(player.prev_y, player.size, firewall.prev_y, firewall.height, dy)
+
+        # Both horizontal and vertical components must overlap at once for a collision
+        collision = max(first_x, first_y) < min(last_x, last_y)
+
+        # If collision occurred and damage cooldown has expired, deal damage
+        if collision and player.damage_cooldown <= 0:
+            player.health -= 5  # Firewall deals 5 damage
+            player.damage_cooldown = player.damage_cooldown_duration  # Start cooldown
+            self.events.append(EVENT_FIREWALL_HIT)
+
+        return collision
+
+    def spawn_pursuers(self, firewall_count, scanner_count):
+        """Replace the extra pursuers with new ones, each with a random behaviour profile"""
+        state = self.state
+        if not firewall_count and not scanner_count:
+            # Nothing drawn from the random stream on the levels without any
+            state.pursuers = PursuerState()
+            return
+        # Their draws come from a generator seeded from the gameplay stream,
+        # which the state carries from here on, so runs stay reproducible
+        # from their seed
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+        state.pursuers = PursuerState(
+            new_firewalls(rng.integers(1, 3, firewall_count, endpoint=True), rng, state.world_width, state.world_height),
+            new_scanners(rng.integers(2, 3, scanner_count, endpoint=True), rng, state.world_width, state.world_height),
+            rng)
+
+    def update_pursuers(self, frames=1):
+        """
+        Move the extra firewalls and scanners: all of each in one vectorised
+        pass, or a row at a time when there are only a few. The scanners go
+        for the decoy while one is out and otherwise the player, and are sent
+        back when they reach either.
+        """
+        state = self.state
+        firewalls, scanners = state.pursuers.firewalls, state.pursuers.scanners
+        if not len(firewalls) and not len(scanners):
+            return
+        if state.pursuers.rng is None:
+            # States from BatchSimulation.state() come without one
+            state.pursuers.rng = np.random.default_rng(self.rng.getrandbits(64))
+        if len(firewalls) + len(scanners) <= SCALAR_LIMIT:
+            self.update_few_pursuers(frames)
+            return
+        rng = state.pursuers.rng
+        player, decoy = state.player, state.decoy
+        move_firewalls(firewalls, frames, rng, state.world_width, state.world_height,
+                       player.x, player.y, decoy.active, decoy.x, decoy.y)
+        if not len(scanners):
+            return
+
+        # Split into about one move per reference frame, as in update_scanner()
+        half_player = player.size // 2
+        moves = max(1, round(frames))
+        for _ in range(moves):
+            from_x, from_y = scanners['x'].copy(), scanners['y'].copy()
+            player_x, player_y = player.x + half_player, player.y + half_player
+            decoy_x, decoy_y = decoy.x + half_player, decoy.y + half_player
+            if decoy.active:
+                # Around the walls like the scanner, sharing its flow field
+                flow = self.flow_to(decoy_x, decoy_y)
+                waypoint_x, waypoint_y, steering = (0.0, 0.0, False) if flow is None else \
+                    flow_waypoints(flow, scanners['x'], scanners['y'], decoy_x, decoy_y)
+                move_scanners(scanners, frames / moves, rng, decoy_x, decoy_y, waypoint_x, waypoint_y, steering)
+                caught = scanner_hits(scanners, from_x, from_y, decoy_x, decoy_y, half_player)
+                if caught.any():
+                    self.destroy_decoy()
+            else:
+                # Straight at the player: a path to a target that changes cell
+                # every few frames would mean a new flow field as often
+                move_scanners(scanners, frames / moves, rng, player_x, player_y, 0.0, 0.0, False)
+                caught = False
+
+            hit = scanner_hits(scanners, from_x, from_y, player_x, player_y, half_player) & (not state.game_won)
+            if hit.any():
+                self.scanner_hit()
+            sent = caught | hit
+            if sent.any():
+                send_back(scanners, sent, rng, state.world_width, state.world_height)
+
+    def update_few_pursuers(self, frames=1):
+        """update_pursuers() a row at a time, for the levels with only a few pursuers"""
+        state = self.state
+        pursuers, player, decoy = state.pursuers, state.player, state.decoy
+        firewalls, scanners = pursuers.firewalls, pursuers.scanners
+        world_width, world_height = state.world_width, state.world_height
+        rng = pursuers.rng
+        if len(firewalls):
+            draws = rng.random((len(firewalls), FIREWALL_DRAWS)).tolist()
+            firewalls[:] = [move_firewall(firewall, firewall_draws, frames, world_width, world_height,
+                                          player.x, player.y, decoy.active, decoy.x, decoy.y)
+                            for firewall, firewall_draws in zip(firewalls.tolist(), draws)]
+        if not len(scanners):
+            return
+
+        half_player = player.size // 2
+        player_x, player_y = player.x + half_player, player.y + half_player
+        moves = max(1, round(frames))
+        rows = scanners.tolist()
+        for _ in range(moves):
+            chasing_decoy = decoy.active
+            decoy_x, decoy_y = decoy.x + half_player, decoy.y + half_player
+            target_x, target_y = (decoy_x, decoy_y) if chasing_decoy else (player_x, player_y)
+            flow = self.flow_to(decoy_x, decoy_y) if chasing_decoy else None
+            for index, scanner_draws in enumerate(rng.random((len(rows), SCANNER_DRAWS)).tolist()):
+                scanner = rows[index]
+                from_x, from_y, radius = scanner[0], scanner[1], scanner[4]
+                waypoint = None
+                if flow is not None and near(from_x, from_y, decoy_x, decoy_y):
+                    waypoint = flow.waypoint(from_x, from_y)
+                scanner = move_scanner(scanner, scanner_draws, frames / moves, target_x, target_y, waypoint)
+                caught = chasing_decoy and segment_meets_circle(from_x, from_y, scanner[0], scanner[1],
+                                                                decoy_x, decoy_y, radius + half_player)
+                if caught:
+                    self.destroy_decoy()
+                hit = not state.game_won and segment_meets_circle(from_x, from_y, scanner[0], scanner[1],
+                                                                  player_x, player_y, radius + half_player)
+                if hit:
+                    self.scanner_hit()
+                if caught or hit:
+                    scanner = far_spot(scanner, scanner_draws, world_width, world_height)
+                rows[index] = scanner
+        scanners[:] = rows
+
+    def scanner_hit(self):
+        """An extra scanner reached the player: 5 damage unless the damage cooldown is running"""
+        player = self.state.player
+        if player.damage_cooldown <= 0:
+            player.health -= 5  # Scanners deal 5 damage
+            player.damage_cooldown = player.damage_cooldown_duration  # Start cooldown
+            self.events.append(EVENT_SCANNER_HIT)
+
+    def check_pursuer_collision(self):
+        """check_firewall_collision() for the extra firewalls"""
+        player, firewalls = self.state.player, self.state.pursuers.firewalls
+        if not len(firewalls):
+            return False
+        if len(firewalls) <= SCALAR_LIMIT:
+            collision = False
+            for x, y, prev_x, prev_y, width, height, *_ in firewalls.tolist():
+                dx = (player.x - player.prev_x) - (x - prev_x)
+                dy = (player.y - player.prev_y) - (y - prev_y)
+                first_x, last_x = overlap_times(player.prev_x, player.size, prev_x, width, dx)
+                first_y, last_y = overlap_times(player.prev_y, player.size, prev_y, height, dy)
+                if max(first_x, first_y) < min(last_x, last_y):
+                    collision = True
+                    break
+        else:
+            collision = bool(firewall_hits(firewalls, player.prev_x, player.prev_y, player.x, player.y,
+                                           player.size).any())
+        if collision and player.damage_cooldown <= 0:
+            player.health -= 5  # Firewalls deal 5 damage
+            player.damage_cooldown = player.damage_cooldown_duration  # Start cooldown
+            self.events.append(EVENT_FIREWALL_HIT)
+        return collision
+
+    def spawn_data_shard(self):
+        state = self.state
+        player, node, shards = state.player, state.node, state.shards
+
+        # Don't spawn if at max capacity
+        if len(shards.active) >= shards.max_count:
+            return
+
+        shard_size = shards.size
+
+        # Find a valid position for the shard
+        for _ in range(50):
+            # Distribute shards across the world
+            x = self.rng.randint(50, state.world_width - 50)
+            y = self.rng.randint(50, state.world_height - 50)
+
+            # Check if too close to player, node, or other shards
+            if math.sqrt((x - player.x)**2 + (y - player.y)**2) < 100:
+                continue
+            if math.sqrt((x - node.x)**2 + (y - node.y)**2) < 100:
+                continue
+            if any(math.sqrt((x - shard.x)**2 + (y - shard.y)**2) < 80 for shard in shards.active):
+                continue
+
+            # Check collision with walls in maze environment
+            if state.current_environment == ENVIRONMENT_MAZE:
+                shard_rect = pygame.Rect(x - shard_size, y - shard_size, shard_size * 2, shard_size * 2)
+                if state.walls.maze.collides(shard_rect):
+                    continue
+
+            # Create a new data shard
+            shards.active.append(DataShard(
+                x=x,
+                y=y,
+                rotation=self.rng.uniform(0, 360),  # Random initial rotation
+                rotation_speed=self.rng.uniform(-2, 2)  # Random rotation speed
+            ))
+            return
+
+    def update_data_shards(self, dt):
+        shards = self.state.shards
+
+        # Update rotation for all shards (rotation speed is in degrees per reference frame)
+        frames = dt * REFERENCE_FPS
+        for shard in shards.active:
+            shard.rotation += shard.rotation_speed * frames
+            if shard.rotation >= 360:
+                shard.rotation -= 360
+
+        # Update spawn timer
+        shards.spawn_timer += dt
+        if shards.spawn_timer >= shards.spawn_interval and len(shards.active) < shards.max_count:
+            self.spawn_data_shard()
+            shards.spawn_timer = 0
+
+    def check_shard_collection(self):
+        player, shards = self.state.player, self.state.shards
+
+        # Create player hitbox
+        player_center_x = player.x + player.size // 2
+        player_center_y = player.y + player.size // 2
+        reach = player.size // 2 + shards.size
+
+        # Check each shard
+        remaining = []
+        collected = 0
+        for shard in shards.active:
+            distance = math.sqrt((player_center_x - shard.x)**2 + (player_center_y - shard.y)**2)
+            if distance < reach:
+                collected += 1
+            else:
+                remaining.append(shard)
+
+        if collected:
+            shards.active[:] = remaining
+            player.score += collected
+            self.events.append(EVENT_SHARD_COLLECTED)
+
+    def disable_walls(self):
+        """
+        Disables the walls when player spends 5 data shards.
+        This is the ONLY function that should modify the walls' visible status.
+        Walls will automatically reappear after hide_duration seconds.
+        """
+        player, walls = self.state.player, self.state.walls
+        if player.score >= 5:
+            # Only disable walls if they're currently visible
+            if walls.visible:
+                # Hide walls and start timer
+                walls.visible = False
+                walls.timer_active = True
+                walls.timer = 0
+                player.score -= 5  # Subtract 5 data shards
+                self.events.append(EVENT_WALLS_DISABLED)
+
+    def reset_level(self, level):
+        state = self.state
+        player, node, firewall = state.player, state.node, state.firewall
+        decoy, scanner, walls = state.decoy, state.scanner, state.walls
+
+        # Reset game state
+        state.current_level = level
+        player.dead = False
+
+        # Reset player health
+        player.health = player.max_health
+        player.damage_cooldown = 0
+
+        # Reset completion state
+        state.game_won = False
+
+        # Scale world dimensions based on level
+        scaling_factor = 1.0 + (level - 1) * 0.3
+        state.world_width = int(BASE_WORLD_WIDTH * scaling_factor)
+        state.world_height = int(BASE_WORLD_HEIGHT * scaling_factor)
+
+        # Reset player
+        player.x = 200
+        player.y = 300
+
+        # Reset dynamic game variables
+        decoy.can_use = True
+        decoy.active = False
+        scanner.active = False
+
+        # Reset wall variables - walls should be visible by default at level start
+        walls.visible = True
+        walls.timer_active = False
+        walls.timer = 0
+
+        # Keep data shards between levels, topping up for higher levels
+        for _ in range(level * 3):
+            self.spawn_data_shard()
+
+        # Position security node on the right side of the world - ensure it's far enough for each level
+        if level == 1:
+            node.x = state.world_width - 150
+        elif level == 2:
+            node.x = state.world_width - 200  # Further right in level 2
+        else:
+            node.x = state.world_width - 250  # Even further right in level 3
+
+        node.y = state.world_height // 2
+
+        # Level-specific firewall and scanner settings, which the extra
+        # pursuers of later levels share
+        profile = min(level, 3)
+        firewall.speed, firewall.width, firewall.height, firewall.vertical_speed = FIREWALL_PROFILES[profile]
+
+        # No scanners in level 1
+        scanner.active = level > 1
+        if scanner.active:
+            scanner.radius, scanner.speed = SCANNER_PROFILES[profile]
+
+        # Reset firewall position to left side of the world
+        firewall.x = -firewall.width  # Start off-screen
+        firewall.y = self.rng.randint(0, state.world_height - firewall.height)
+
+        # Spawn scanner if active
+        if scanner.active:
+            self.spawn_scanner()
+
+        # Generate maze walls for the level
+        self.generate_maze_walls()
+
+        # More firewalls and scanners on the levels past 3
+        self.spawn_pursuers(*pursuer_counts(level))
+        self.save_previous_positions()
+
+
+def run_headless(sessions=100, ticks=7200, level=1, seed=None):
+    """
+    Run a batch of headless sessions driven by random inputs.
+
+    Returns the number of simulated ticks per second, which makes this a quick
+    smoke test and throughput check for build machines. With a seed, both the
+    inputs and every session's gameplay are identical from run to run.
+    """
+    rng = random.Random(seed)  # Drives the inputs and seeds each session
+
+    movement = (INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN,
+                INPUT_RIGHT | INPUT_UP, INPUT_RIGHT | INPUT_DOWN)
+    total_ticks = 0
+    start = time.perf_counter()
+    for _ in range(sessions):
+        sim = GameSimulation(rng.randrange(2 ** 32))
+        sim.reset_level(level)
+        inputs = INPUT_RIGHT
+        for _ in range(ticks):
+            # Change direction a few times per second and occasionally use abilities
+            if rng.random() < 0.025:
+                inputs = rng.choice(movement)
+            extra = INPUT_DECOY if rng.random() < 0.005 else 0
+            sim.step(inputs | extra, LOGIC_DT)
+            sim.events.clear()
+            total_ticks += 1
+            if sim.state.game_won:
+                break
+    elapsed = time.perf_counter() - start
+    return total_ticks / max(elapsed, 1e-9)
+
+
+if __name__ == '__main__':
+    level = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    rate = run_headless(sessions=20, level=level, seed=0)
+    print(f"Headless simulation (level {level}): {rate:,.0f} ticks/second")
@@ -0,0 +1,346 @@
+"""
+Gameplay state for Cyberpunk Hacker Duel.
+
+Everything a game needs to carry on - the player, the security node, the
+firewall, the decoy, the scanner, the maze walls, the data shards and any
+extra pursuers - lives in one GameState made of small slotted dataclasses.
+GameSimulation holds the rules that change it, plus its random stream and
+event queue. Keeping the state in one place lets it be copied cheaply and
+serialised, and slotted attribute access is faster than looking names up in
+a dict.
+
+to_bytes()/from_bytes() pack a state into a compact binary form: the scalar
+fields of every part through one precompiled struct each, the maze as the
+parameters it's generated from, and the shards and pursuers as fixed-size
+records.
+"""
+import struct
+from dataclasses import dataclass, field, fields
+
+import numpy as np
+
+from maze import Maze
+from pursuers import FIREWALL_RECORD, SCANNER_RECORD
+
+# Player square size in pixels
+PLAYER_SIZE = 30
+
+# Environment settings
+ENVIRONMENT_OPEN = 0
+ENVIRONMENT_MAZE = 1
+
+
+# struct codes for the scalar field types; other fields are packed by hand
+SCALAR_CODES = {bool: '?', int: 'q', float: 'd'}
+COUNT = struct.Struct('<I')
+# A PCG64 generator's state: whether there is one, its 128-bit state and
+# increment, and whether it has half of a 64-bit draw cached and that half
+GENERATOR = struct.Struct('<?16s16s?I')
+
+
+def generator(rng_state):
+    """A NumPy generator carrying on from a PCG64 bit generator's state"""
+    bit_generator = np.random.PCG64(0)
+    bit_generator.state = rng_state
+    return np.random.Generator(bit_generator)
+
+
+class SlottedState:
+    """copy(), dict conversion and binary packing for state made only of immutable values"""
+    __slots__ = ()
+
+    # Set for every state class at the bottom of this module
+    SCALARS = ()  # Names of the scalar fields, in packing order
+    SCALAR_STRUCT = None
+
+    def copy(self):
+        clone = object.__new__(type(self))
+        for name in self.__slots__:
+            setattr(clone, name, getattr(self, name))
+        return clone
+
+    def pack(self, out):
+        """Append the binary form to the bytearray out"""
+        out += self.SCALAR_STRUCT.pack(*[getattr(self, name) for name in self.SCALARS])
+
+    @classmethod
+    def unpack(cls, data, offset):
+        """Read an instance packed at offset. Returns it and the offset after it."""
+        values = cls.SCALAR_STRUCT.unpack_from(data, offset)
+        return cls(**dict(zip(cls.SCALARS, values))), offset + cls.SCALAR_STRUCT.size
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+@dataclass(slots=True)
+class PlayerState(SlottedState):
+    x: float
+    y: float
+    start_x: float  # Where the player is sent back to by the firewall or on death
+    start_y: float
+    prev_x: float = 0  # Position at the start of the last tick, for interpolation
+    prev_y: float = 0
+    size: int = PLAYER_SIZE
+    speed: float = 5
+    dead: bool = False
+    max_health: int = 100
+    health: int = 100
+    damage_cooldown: float = 0  # Cooldown between damage events
+    damage_cooldown_duration: float = 1.0  # Seconds of invulnerability after taking damage
+    score: int = 0  # Data shards collected
+
+
+@dataclass(slots=True)
+class NodeState(SlottedState):
+    x: int
+    y: int
+    radius: int = 20
+
+
+@dataclass(slots=True)
+class FirewallState(SlottedState):
+    x: float = 0
+    y: float = 0
+    width: int = 8
+    height: int = 200
+    speed: float = 3
+    vertical_speed: float = 1  # Speed at which the firewall moves vertically
+    vertical_direction: int = 1  # 1 = down, -1 = up
+    prev_x: float = 0
+    prev_y: float = 0
+
+
+@dataclass(slots=True)
+class DecoyState(SlottedState):
+    active: bool = False
+    x: float = 0
+    y: float = 0
+    duration: float = 0  # Seconds the active decoy has left
+    max_duration: float = 2
+    cooldown: float = 0  # Seconds until the decoy can be used again
+    max_cooldown: float = 5
+    can_use: bool = True
+    count: int = 0  # Times the decoy has been used
+
+
+@dataclass(slots=True)
+class ScannerState(SlottedState):
+    active: bool = False
+    x: float = 0
+    y: float = 0
+    radius: int = 5
+    speed: float = 6
+    prev_x: float = 0
+    prev_y: float = 0
+
+
+@dataclass(slots=True)
+class WallState(SlottedState):
+    """
+    The maze walls and whether they're up.
+
+    The maze is replaced, never modified, when walls are generated, so copies
+    share it.
+    """
+    maze: Maze = field(default_factory=Maze)
+    width: int = 10
+    height: int = 50
+    base_count: int = 20  # Walls per 800x600 of world, scaled with the world size
+    visible: bool = True
+    timer_active: bool = False
+    timer: float = 0  # Seconds since the walls were disabled
+    hide_duration: float = 15  # How long walls stay hidden in seconds
+
+    def to_dict(self):
+        return dict(SlottedState.to_dict(self), maze=self.maze.to_dict())
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**dict(data, maze=Maze.from_dict(data['maze'])))
+
+    def pack(self, out):
+        SlottedState.pack(self, out)
+        self.maze.pack(out)
+
+    @classmethod
+    def unpack(cls, data, offset):
+        walls, offset = super(WallState, cls).unpack(data, offset)
+        walls.maze, end = Maze.unpack(data, offset)
+        return walls, end
+
+
+@dataclass(slots=True)
+class DataShard(SlottedState):
+    x: int
+    y: int
+    rotation: float  # Degrees
+    rotation_speed: float  # Degrees per reference frame
+
+
+@dataclass(slots=True)
+class ShardState(SlottedState):
+    active: list = field(default_factory=list)  # DataShard per shard in the world
+    max_count: int = 3  # Maximum number of shards spawned over time
+    size: int = 15  # Size of the triangular shards
+    spawn_timer: float = 0
+    spawn_interval: float = 5  # seconds
+
+    def copy(self):
+        clone = SlottedState.copy(self)
+        clone.active = [shard.copy() for shard in self.active]
+        return clone
+
+    def to_dict(self):
+        data = SlottedState.to_dict(self)
+        data['active'] = [shard.to_dict() for shard in self.active]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**dict(data, active=[DataShard.from_dict(shard) for shard in data['active']]))
+
+    def pack(self, out):
+        SlottedState.pack(self, out)
+        out += COUNT.pack(len(self.active))
+        for shard in self.active:
+            shard.pack(out)
+
+    @classmethod
+    def unpack(cls, data, offset):
+        shards, offset = super(ShardState, cls).unpack(data, offset)
+        count, = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            shard, offset = DataShard.unpack(data, offset)
+            shards.active.append(shard)
+        return shards, offset
+
+
+@dataclass(slots=True)
+class PursuerState(SlottedState):
+    """
+    Firewalls and scanners beyond the level's one of each, as the structured
+    arrays pursuers.py moves, one row per pursuer, and the NumPy generator
+    their random draws come from (None on levels without any), which is
+    copied and saved along with them
+    """
+    firewalls: np.ndarray = field(default_factory=lambda: np.zeros(0, FIREWALL_RECORD))
+    scanners: np.ndarray = field(default_factory=lambda: np.zeros(0, SCANNER_RECORD))
+    rng: np.random.Generator = None
+
+    def copy(self):
+        rng = None if self.rng is None else generator(self.rng.bit_generator.state)
+        return PursuerState(self.firewalls.copy(), self.scanners.copy(), rng)
+
+    def to_dict(self):
+        data = {name: [dict(zip(records.dtype.names, record)) for record in records.tolist()]
+                for name, records in (('firewalls', self.firewalls), ('scanners', self.scanners))}
+        data['rng'] = None if self.rng is None else self.rng.bit_generator.state
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        rng = None if data.get('rng') is None else generator(data['rng'])
+        return cls(*[np.array([tuple(record[name] for name in dtype.names) for record in data[key]], dtype)
+                     for key, dtype in (('firewalls', FIREWALL_RECORD), ('scanners', SCANNER_RECORD))], rng)
+
+    def pack(self, out):
+        for records in (self.firewalls, self.scanners):
+            out += COUNT.pack(len(records))
+            out += records.tobytes()
+        if self.rng is None:
+            out += GENERATOR.pack(False, bytes(16), bytes(16), False, 0)
+        else:
+            rng_state = self.rng.bit_generator.state
+            out += GENERATOR.pack(True, rng_state['state']['state'].to_bytes(16, 'little'),
+                                  rng_state['state']['inc'].to_bytes(16, 'little'),
+                                  bool(rng_state['has_uint32']), rng_state['uinteger'])
+
+    @classmethod
+    def unpack(cls, data, offset):
+        arrays = []
+        for dtype in (FIREWALL_RECORD, SCANNER_RECORD):
+            count, = COUNT.unpack_from(data, offset)
+            offset += COUNT.size
+            arrays.append(np.frombuffer(data, dtype, count, offset).copy())
+            offset += count * dtype.itemsize
+        has_rng, rng_state, inc, has_uint32, uinteger = GENERATOR.unpack_from(data, offset)
+        rng = None
+        if has_rng:
+            rng = generator({
+                'bit_generator': 'PCG64',
+                'state': {'state': int.from_bytes(rng_state, 'little'), 'inc': int.from_bytes(inc, 'little')},
+                'has_uint32': int(has_uint32), 'uinteger': uinteger,
+            })
+        return cls(*arrays, rng), offset + GENERATOR.size
+
+
+@dataclass(slots=True)
+class GameState:
+    """The complete state of one game"""
+    world_width: int
+    world_height: int
+    player: PlayerState
+    node: NodeState
+    firewall: FirewallState = field(default_factory=FirewallState)
+    decoy: DecoyState = field(default_factory=DecoyState)
+    scanner: ScannerState = field(default_factory=ScannerState)
+    walls: WallState = field(default_factory=WallState)
+    shards: ShardState = field(default_factory=ShardState)
+    pursuers: PursuerState = field(default_factory=PursuerState)
+    current_environment: int = ENVIRONMENT_MAZE  # Always use maze environment
+    current_level: int = 1
+    max_level: int = 3
+    game_won: bool = False
+    ticks: int = 0  # Number of completed simulation ticks
+
+    # Fields holding a sub-state, and the class that state is made of
+    PARTS = {
+        'player': PlayerState, 'node': NodeState, 'firewall': FirewallState, 'decoy': DecoyState,
+        'scanner': ScannerState, 'walls': WallState, 'shards': ShardState, 'pursuers': PursuerState,
+    }
+
+    def copy(self):
+        """An independent copy; only the maze is shared"""
+        clone = object.__new__(GameState)
+        for name in self.__slots__:
+            value = getattr(self, name)
+            setattr(clone, name, value.copy() if name in self.PARTS else value)
+        return clone
+
+    def to_dict(self):
+        """Plain lists, dicts and numbers, ready for json.dump()"""
+        return {name: getattr(self, name).to_dict() if name in self.PARTS else getattr(self, name)
+                for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: cls.PARTS[name].from_dict(value) if name in cls.PARTS else value
+                      for name, value in data.items()})
+
+    def to_bytes(self):
+        out = bytearray(self.SCALAR_STRUCT.pack(*[getattr(self, name) for name in self.SCALARS]))
+        for name in self.PARTS:
+            getattr(self, name).pack(out)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """Read a state written by to_bytes() at offset. Returns it and the offset after it."""
+        values = dict(zip(cls.SCALARS, cls.SCALAR_STRUCT.unpack_from(data, offset)))
+        offset += cls.SCALAR_STRUCT.size
+        for name, part in cls.PARTS.items():
+            values[name], offset = part.unpack(data, offset)
+        return cls(**values), offset
+
+
+for state_class in (PlayerState, NodeState, FirewallState, DecoyState, ScannerState,
+                    WallState, DataShard, ShardState, PursuerState, GameState):
+    state_class.SCALARS = tuple(f.name for f in fields(state_class) if f.type in SCALAR_CODES)
+    state_class.SCALAR_STRUCT = struct.Struct(
+        '<' + ''.join(SCALAR_CODES[f.type] for f in fields(state_class) if f.type in SCALAR_CODES))
@@ -0,0 +1,394 @@
+"""
+Chunked maze walls for Cyberpunk Hacker Duel.
+
+The world is cut into CHUNK_SIZE squares, and a Maze only generates the walls
+of a chunk when something first asks about that part of the world: collision
+checks around the player, shard spawns, a pursuer's navigation grid, or the
+renderer looking ahead of the camera. Each chunk has its own random stream,
+seeded from the maze's seed and the chunk's position, so a chunk comes out
+the same whenever and in whatever order it's generated. That lets the maze
+keep only the MAX_CHUNKS chunks used most recently and forget the rest, to
+generate again if they're needed - memory and per-frame work depend on how
+much of the world is in play, not on how large it has grown.
+
+The level's wall count is dealt out between the chunks up front, in
+proportion to their free slots and with the remainder going to chunks picked
+from the seed, so the chunks add up to the exact total whichever of them are
+generated. Since chunks can't look at each other, the node is kept reachable
+along a corridor: straight lines from the player's start to random heights on
+the borders between chunk columns and on to the node. Each chunk the corridor
+crosses checks the player can get between the points where it enters and
+leaves, and moves any walls in the way aside.
+
+A Maze is defined by its parameters alone, which is all a saved state
+stores. Chunks never change once generated, so copies of a state share it.
+"""
+import math
+import random
+import struct
+from collections import OrderedDict
+
+import pygame
+
+from navigation import NavGrid
+from spatial_grid import SpatialGrid
+
+# Chunk size in pixels: a whole number of wall index cells, navigation cells
+# and generator slots
+CHUNK_SIZE = 480
+
+# Cell size of each chunk's wall spatial index (matches the background grid spacing)
+WALL_CELL_SIZE = 40
+
+# Chunks and navigation grids kept in memory
+MAX_CHUNKS = 64
+MAX_NAV_GRIDS = 2
+
+# Navigation grids cover this many chunks either side of the target's chunk
+NAV_RADIUS = 2
+
+# The level's wall count is base_count per this much area
+BASE_AREA = 800 * 600
+
+# Space around a wall in each slot of a chunk's grid of slots
+SLOT_MARGIN = 10
+# Space kept clear along the world's edges
+EDGE_MARGIN = 50
+# Walls stay this far either way from the start and the node
+SAFE_DISTANCE = 170
+
+# How far the corridor's corners may wander from the straight line between
+# start and node
+CORRIDOR_WANDER = 120
+
+# Room kept around walls on the way through each chunk: half
+# game_state.PLAYER_SIZE, so the player fits (game_state imports this module)
+PLAYER_CLEARANCE = 15
+
+
+class Maze:
+    """The walls of one level's world, generated a chunk at a time"""
+
+    PACKED = struct.Struct('<10q')  # The constructor's arguments, in order
+
+    def __init__(self, world_width=0, world_height=0, seed=0, wall_width=10, wall_height=50, base_count=0,
+                 start_x=0, start_y=0, goal_x=0, goal_y=0):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.seed = seed
+        self.wall_width = wall_width
+        self.wall_height = wall_height
+        self.base_count = base_count
+        self.start_x, self.start_y = start_x, start_y
+        self.goal_x, self.goal_y = goal_x, goal_y
+
+        self.columns = -(-world_width // CHUNK_SIZE)
+        self.rows = -(-world_height // CHUNK_SIZE)
+        self.empty = base_count <= 0 or self.columns <= 0 or self.rows <= 0
+        self.safe_areas = [pygame.Rect(x - SAFE_DISTANCE, y - SAFE_DISTANCE, SAFE_DISTANCE * 2, SAFE_DISTANCE * 2)
+                           for x, y in ((start_x, start_y), (goal_x, goal_y))]
+        self.corridor = sorted(((start_x, start_y), (goal_x, goal_y)))  # Left end first
+        self.slot_size = max(wall_width, wall_height) + SLOT_MARGIN
+        self.counts = None  # Walls in each chunk, row by row, once dealt out
+        self.chunks = OrderedDict()  # (column, row) -> (walls, SpatialGrid), most recently used last
+        self.nav_grids = OrderedDict()  # Chunk range -> NavGrid, most recently used last
+
+    def parameters(self):
+        return (self.world_width, self.world_height, self.seed, self.wall_width, self.wall_height,
+                self.base_count, self.start_x, self.start_y, self.goal_x, self.goal_y)
+
+    def pack(self, out):
+        out += self.PACKED.pack(*self.parameters())
+
+    @classmethod
+    def unpack(cls, data, offset):
+        return cls(*cls.PACKED.unpack_from(data, offset)), offset + cls.PACKED.size
+
+    def to_dict(self):
+        return dict(zip(('world_width', 'world_height', 'seed', 'wall_width', 'wall_height', 'base_count',
+                         'start_x', 'start_y', 'goal_x', 'goal_y'), self.parameters()))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def chunk(self, column, row):
+        """The walls of a chunk and their spatial index, generated if they aren't in memory"""
+        key = (column, row)
+        chunks = self.chunks
+        chunk = chunks.get(key)
+        if chunk is None:
+            walls = self._generate(column, row)
+            chunk = chunks[key] = (walls, SpatialGrid(WALL_CELL_SIZE, walls))
+            if len(chunks) > MAX_CHUNKS:
+                chunks.popitem(last=False)
+        else:
+            chunks.move_to_end(key)
+        return chunk
+
+    def _chunks_over(self, rect):
+        """(column, row) of the chunks the rect overlaps"""
+        first_column = max(0, rect.left // CHUNK_SIZE)
+        last_column = min(self.columns - 1, (rect.right - 1) // CHUNK_SIZE)
+        first_row = max(0, rect.top // CHUNK_SIZE)
+        last_row = min(self.rows - 1, (rect.bottom - 1) // CHUNK_SIZE)
+        return [(column, row) for row in range(first_row, last_row + 1)
+                for column in range(first_column, last_column + 1)]
+
+    def collides(self, rect):
+        """Return True if the rect overlaps any wall"""
+        if self.empty:
+            return False
+        # Walls never cross chunk borders, so only the chunks under the rect
+        # matter - usually just one
+        column, row = rect.left // CHUNK_SIZE, rect.top // CHUNK_SIZE
+        if (column == (rect.right - 1) // CHUNK_SIZE and row == (rect.bottom - 1) // CHUNK_SIZE and
+                0 <= column < self.columns and 0 <= row < self.rows):
+            return self.chunk(column, row)[1].collides(rect)
+        for column, row in self._chunks_over(rect):
+            if self.chunk(column, row)[1].collides(rect):
+                return True
+        return False
+
+    def query(self, rect):
+        """The walls overlapping the rect"""
+        if self.empty:
+            return []
+        walls = []
+        for column, row in self._chunks_over(rect):
+            # Each chunk's index only needs to look at its part of the rect
+            part = rect.clip(column * CHUNK_SIZE, row * CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE)
+            walls += self.chunk(column, row)[1].query(part)
+        return walls
+
+    def sweep(self, left, top, width, height, new_left, new_top):
+        """
+        Where a box moving in a straight line along one axis from (left, top)
+        toward (new_left, new_top) stops: there, or touching the first wall in
+        the way, however far it moves. Walls the box already overlaps don't
+        stop it, so it can always get out of them.
+        """
+        if self.empty:
+            return new_left, new_top
+        right, bottom = left + width, top + height
+        # Every wall in the way overlaps the area the box sweeps through
+        area_left, area_top = math.floor(min(left, new_left)), math.floor(min(top, new_top))
+        area = pygame.Rect(area_left, area_top, math.ceil(max(right, new_left + width)) - area_left,
+                           math.ceil(max(bottom, new_top + height)) - area_top)
+        for wall in self.query(area):
+            if wall.left < right and left < wall.right and wall.top < bottom and top < wall.bottom:
+                continue
+            # The stop moves up to each wall in the way, so it ends at the nearest
+            if new_left > left and wall.left < new_left + width:
+                new_left = wall.left - width
+            elif new_left < left and wall.right > new_left:
+                new_left = wall.right
+            elif new_top > top and wall.top < new_top + height:
+                new_top = wall.top - height
+            elif new_top < top and wall.bottom > new_top:
+                new_top = wall.bottom
+        return new_left, new_top
+
+    def all_walls(self):
+        """
+        Every wall in the world. Chunks are kept while there's room, and
+        after that generated without being kept, so this doesn't push out
+        the ones in use.
+        """
+        if self.empty:
+            return []
+        walls = []
+        for row in range(self.rows):
+            for column in range(self.columns):
+                if (column, row) in self.chunks or len(self.chunks) < MAX_CHUNKS:
+                    walls += self.chunk(column, row)[0]
+                else:
+                    walls += self._generate(column, row)
+        return walls
+
+    def nav_grid(self, x, y):
+        """
+        The NavGrid of the chunks within NAV_RADIUS of the one containing the
+        point (or nearest to it). Pursuers further away head straight in.
+        """
+        column = min(max(0, int(x // CHUNK_SIZE)), self.columns - 1)
+        row = min(max(0, int(y // CHUNK_SIZE)), self.rows - 1)
+        first_column, last_column = max(0, column - NAV_RADIUS), min(self.columns - 1, column + NAV_RADIUS)
+        first_row, last_row = max(0, row - NAV_RADIUS), min(self.rows - 1, row + NAV_RADIUS)
+        key = (first_column, last_column, first_row, last_row)
+        nav_grids = self.nav_grids
+        nav = nav_grids.get(key)
+        if nav is None:
+            walls = [wall for nav_row in range(first_row, last_row + 1)
+                     for nav_column in range(first_column, last_column + 1)
+                     for wall in self.chunk(nav_column, nav_row)[0]]
+            left, top = first_column * CHUNK_SIZE, first_row * CHUNK_SIZE
+            nav = nav_grids[key] = NavGrid(min(self.world_width, (last_column + 1) * CHUNK_SIZE) - left,
+                                           min(self.world_height, (last_row + 1) * CHUNK_SIZE) - top,
+                                           walls, left=left, top=top)
+            if len(nav_grids) > MAX_NAV_GRIDS:
+                nav_grids.popitem(last=False)
+        else:
+            nav_grids.move_to_end(key)
+        return nav
+
+    def _generate(self, column, row):
+        """
+        Place a chunk's walls. They go in randomly chosen slots of a grid over
+        the chunk, one per slot, so they never overlap or cross into another
+        chunk. Then any walls on the corridor's way through the chunk move to
+        other slots.
+        """
+        rng = random.Random(f'{self.seed}:{column}:{row}')
+        slots = self._slots(column, row)
+        chosen = rng.sample(range(len(slots)), self._wall_count(column, row))
+        walls = [self._wall_in_slot(rng, *slots[index]) for index in chosen]
+        stretch = self._corridor_stretch(column, row)
+        if stretch is not None and walls:
+            walls = self._clear_way(rng, column, row, walls, slots, chosen, stretch)
+        return walls
+
+    def _slot_ranges(self, column, row):
+        """Columns and rows of the chunk's slots clear of the world's edges"""
+        slot_size = self.slot_size
+        left, top = column * CHUNK_SIZE, row * CHUNK_SIZE
+        last = CHUNK_SIZE // slot_size - 1
+        return (range(max(0, -((left - EDGE_MARGIN) // slot_size)),
+                      min(last, (self.world_width - EDGE_MARGIN - slot_size - left) // slot_size) + 1),
+                range(max(0, -((top - EDGE_MARGIN) // slot_size)),
+                      min(last, (self.world_height - EDGE_MARGIN - slot_size - top) // slot_size) + 1))
+
+    def _near_safe_area(self, column, row):
+        return pygame.Rect(column * CHUNK_SIZE, row * CHUNK_SIZE, CHUNK_SIZE,
+                           CHUNK_SIZE).collidelist(self.safe_areas) != -1
+
+    def _slots(self, column, row):
+        """
+        Top-left corners of the chunk's slots clear of the world's edges and
+        the safe areas, as plain numbers - a chunk is generated often enough
+        for Rects to show up
+        """
+        slot_size = self.slot_size
+        left, top = column * CHUNK_SIZE, row * CHUNK_SIZE
+        slot_columns, slot_rows = self._slot_ranges(column, row)
+        slots = [(left + slot_column * slot_size, top + slot_row * slot_size)
+                 for slot_row in slot_rows for slot_column in slot_columns]
+        if self._near_safe_area(column, row):
+            slots = [(x, y) for x, y in slots
+                     if pygame.Rect(x, y, slot_size, slot_size).collidelist(self.safe_areas) == -1]
+        return slots
+
+    def _wall_count(self, column, row):
+        """How many of the level's walls go in the chunk"""
+        if self.counts is None:
+            self.counts = self._deal_walls()
+        return self.counts[row * self.columns + column]
+
+    def _deal_walls(self):
+        """
+        Split the level's wall count between the chunks in proportion to
+        their free slots. Rounded down, the shares leave a few walls over,
+        which go one each to chunks picked at random from those whose share
+        was rounded, so the total is exact.
+        """
+        room = []
+        for row in range(self.rows):
+            for column in range(self.columns):
+                if self._near_safe_area(column, row):
+                    room.append(len(self._slots(column, row)))
+                else:
+                    slot_columns, slot_rows = self._slot_ranges(column, row)
+                    room.append(len(slot_columns) * len(slot_rows))
+        free = sum(room)
+        if not free:
+            return room
+        total = min(free, self.base_count * self.world_width * self.world_height // BASE_AREA)
+        counts = [total * slots // free for slots in room]
+        rounded = [index for index, slots in enumerate(room) if total * slots % free]
+        for index in random.Random(f'{self.seed}:counts').sample(rounded, total - sum(counts)):
+            counts[index] += 1
+        return counts
+
+    def _clear_way(self, rng, column, row, walls, slots, chosen, stretch):
+        """
+        Check the player can get along the corridor's stretch through the
+        chunk: find the route between its ends that crosses the fewest walls,
+        on a grid of cells the player can stand anywhere in. Walls on the
+        route move to free slots clear of it, or are left out if there are
+        none, so it's always open.
+        """
+        left, top = column * CHUNK_SIZE, row * CHUNK_SIZE
+        width, height = min(CHUNK_SIZE, self.world_width - left), min(CHUNK_SIZE, self.world_height - top)
+        check = NavGrid(width, height, walls, left=left, top=top, clearance=PLAYER_CLEARANCE)
+        # The ends are on the chunk's borders when the corridor carries on into
+        # a neighbour, which takes them to be in its own cells next to these
+        start, end = [check.cell(min(max(x, left), left + width - 1), min(max(y, top), top + height - 1))
+                      for x, y in stretch]
+        route = check.route(start, end)
+        blocked = {cell for cell in route if not check.walkable[cell]}
+        if not blocked:
+            return walls
+
+        walls = [wall for wall in walls if blocked.isdisjoint(check.cells_under(wall))]
+        route = set(route)
+        used = set(chosen)
+        spare = [index for index in range(len(slots)) if index not in used]
+        rng.shuffle(spare)
+        slot_size = self.slot_size
+        for index in spare:
+            if len(walls) == len(chosen):
+                break
+            x, y = slots[index]
+            if route.isdisjoint(check.cells_under(pygame.Rect(x, y, slot_size, slot_size))):
+                walls.append(self._wall_in_slot(rng, x, y))
+        return walls
+
+    def _wall_in_slot(self, rng, x, y):
+        """A wall at a random position in the slot at (x, y), randomly rotated to be horizontal"""
+        slot_size = self.slot_size
+        rand = rng.random
+        if rand() > 0.5:
+            width, height = self.wall_width, self.wall_height
+        else:
+            width, height = self.wall_height, self.wall_width
+        # Same as randint(0, room), for a fraction of the cost
+        return pygame.Rect(x + int(rand() * (slot_size - width + 1)),
+                           y + int(rand() * (slot_size - height + 1)), width, height)
+
+    def _corridor_stretch(self, column, row):
+        """
+        The ends of the corridor's centre line within the chunk, or None if
+        it doesn't cross the chunk. Neighbouring chunks work out the point
+        where it crosses between them the same way.
+        """
+        left, top = column * CHUNK_SIZE, row * CHUNK_SIZE
+        # The stretch crossing the chunk's column is one straight line
+        left_x = max(left, self.corridor[0][0])
+        right_x = min(left + CHUNK_SIZE, self.corridor[1][0])
+        if left_x > right_x:
+            return None
+        left_y, right_y = self._corridor_y(left_x), self._corridor_y(right_x)
+        if left_y == right_y:
+            if not top <= left_y <= top + CHUNK_SIZE:
+                return None
+            return (left_x, left_y), (right_x, right_y)
+        # The part of it between the chunk's top and bottom
+        enter, leave = sorted(((top - left_y) / (right_y - left_y), (top + CHUNK_SIZE - left_y) / (right_y - left_y)))
+        enter, leave = max(0.0, enter), min(1.0, leave)
+        if enter > leave:
+            return None
+        return tuple((left_x + (right_x - left_x) * t, left_y + (right_y - left_y) * t) for t in (enter, leave))
+
+    def _corridor_y(self, x):
+        """
+        Height of the corridor's centre line at x: the start or end point, or
+        where it crosses a chunk column border
+        """
+        (start_x, start_y), (end_x, end_y) = self.corridor
+        if x == start_x:
+            return start_y
+        if x == end_x:
+            return end_y
+        straight = start_y + (end_y - start_y) * (x - start_x) / (end_x - start_x)
+        wander = random.Random(f'{self.seed}:corridor:{x // CHUNK_SIZE}').uniform(-CORRIDOR_WANDER, CORRIDOR_WANDER)
+        return min(max(straight + wander, EDGE_MARGIN), self.world_height - EDGE_MARGIN)
@@ -0,0 +1,253 @@
+"""
+Grid navigation for Cyberpunk Hacker Duel's pursuers.
+
+NavGrid is the walkable grid of part of a maze: that part of the world cut
+into NAV_CELL_SIZE squares, blocked wherever a wall overlaps one. Maze builds
+them around the cells pursuers are heading for, and like the walls they never
+change afterwards, so copies of the state share them.
+
+FlowField is a tree of shortest paths to one target cell: every cell in it
+knows its path cost and the next cell toward the target, so any number of
+agents can steer by looking up the cell they're in - O(1) per agent instead
+of a path search each. The tree grows outward from the target only as far as
+lookups need, ordered by A* toward the cell asked about, and later lookups
+pick up where the last one left off. An agent following the tree stays on
+cells already in it, so it usually only grows along the corridor between the
+agent and the target. Moving the target to another cell starts a new tree.
+
+NavGrid.route() also finds the way between two cells that crosses the fewest
+blocked cells, which maze generation uses to make sure the node can always
+be reached.
+"""
+import heapq
+
+# Cell size in pixels: half the wall index cells, so the gaps between nearby
+# walls stay open
+NAV_CELL_SIZE = 20
+
+# Step costs, roughly 1 : sqrt(2)
+ORTHOGONAL_COST = 2
+DIAGONAL_COST = 3
+
+UNREACHED = 1 << 30
+# FlowField.next values besides cell numbers
+UNKNOWN = -1
+NO_PATH = -2
+
+
+class NavGrid:
+    """
+    The cells of a maze agents can move through, over the width x height
+    area with its top-left corner at (left, top). With a clearance, cells
+    within that many pixels of a wall are blocked too, so an agent that size
+    either way of its centre can stand anywhere in the open cells.
+    """
+
+    def __init__(self, width, height, walls, cell_size=NAV_CELL_SIZE, left=0, top=0, clearance=0):
+        self.cell_size = cell_size
+        self.left = left
+        self.top = top
+        self.clearance = clearance
+        self.columns = -(-width // cell_size)
+        self.rows = -(-height // cell_size)
+        # Cells are numbered row by row with a ring of blocked cells around
+        # the area, so neighbours never need bounds checks
+        self.stride = stride = self.columns + 2
+        self.walkable = walkable = bytearray((self.rows + 2) * stride)
+        for row in range(1, self.rows + 1):
+            walkable[row * stride + 1:row * stride + 1 + self.columns] = b'\x01' * self.columns
+        self.inside = bytes(walkable)  # 1 for every cell in the area
+        for wall in walls:
+            for first, count in self._spans(wall):
+                walkable[first:first + count] = bytes(count)
+
+        # Neighbour offsets, each diagonal followed by the two cells it passes
+        # between - it can't cut a blocked corner
+        self.orthogonal = (-stride, 1, stride, -1)
+        self.diagonal = ((-stride + 1, -stride, 1), (stride + 1, stride, 1),
+                         (stride - 1, stride, -1), (-stride - 1, -stride, -1))
+
+    def _spans(self, rect):
+        """(first cell, count) of each row of cells the rect and its clearance overlap"""
+        size = self.cell_size
+        clearance = self.clearance
+        left, top = rect.left - self.left, rect.top - self.top
+        first_column = max(0, (left - clearance) // size)
+        last_column = min(self.columns - 1, (left + rect.width + clearance - 1) // size)
+        first_row = max(0, (top - clearance) // size)
+        last_row = min(self.rows - 1, (top + rect.height + clearance - 1) // size)
+        count = last_column - first_column + 1
+        if count > 0:
+            for row in range(first_row + 1, last_row + 2):
+                yield row * self.stride + first_column + 1, count
+
+    def cells_under(self, rect):
+        """Every cell the rect and the clearance around it overlap"""
+        return [cell for first, count in self._spans(rect) for cell in range(first, first + count)]
+
+    def route(self, start, goal):
+        """
+        Cells from start to goal, moving between side-by-side cells, that
+        cross as few blocked cells as possible - none if goal can be reached -
+        and of those routes the shortest, so it keeps close to the straight
+        line instead of wandering around open cells. Dijkstra's algorithm on
+        (blocked cells, steps), packed into one number.
+        """
+        walkable, inside = self.walkable, self.inside
+        # A blocked cell costs more than any number of steps could
+        blocked_cost = len(walkable)
+        cost = [UNREACHED * blocked_cost] * len(walkable)  # Cheapest way to each cell
+        previous = [-1] * len(walkable)
+        cost[start] = 0 if walkable[start] else blocked_cost
+        heap = [(cost[start], start)]
+        while heap:
+            cell_cost, cell = heapq.heappop(heap)
+            if cell == goal:
+                break
+            if cell_cost > cost[cell]:
+                continue  # Already reached more cheaply
+            for offset in self.orthogonal:
+                neighbour = cell + offset
+                if not inside[neighbour]:
+                    continue
+                step = cell_cost + (1 if walkable[neighbour] else blocked_cost + 1)
+                if step < cost[neighbour]:
+                    cost[neighbour] = step
+                    previous[neighbour] = cell
+                    heapq.heappush(heap, (step, neighbour))
+
+        cells = [goal]
+        while cells[-1] != start:
+            cells.append(previous[cells[-1]])
+        cells.reverse()
+        return cells
+
+    def cell(self, x, y):
+        """Number of the cell containing the point, or None outside the grid"""
+        size = self.cell_size
+        x -= self.left
+        y -= self.top
+        if not (0 <= x < self.columns * size and 0 <= y < self.rows * size):
+            return None
+        return (int(y // size) + 1) * self.stride + int(x // size) + 1
+
+    def center(self, cell):
+        row, column = divmod(cell, self.stride)
+        return self.left + (column - 0.5) * self.cell_size, self.top + (row - 0.5) * self.cell_size
+
+
+class FlowField:
+    """Shortest paths to a target cell, for steering agents around the walls of a NavGrid"""
+
+    def __init__(self, nav):
+        self.nav = nav
+        self.target = None
+
+    def set_target(self, x, y):
+        """Steer toward the point; the tree starts again if it's in another cell"""
+        cell = self.nav.cell(x, y)
+        if cell == self.target:
+            return
+        self.target = cell
+        size = len(self.nav.walkable)
+        self.distance = [UNREACHED] * size  # Path cost to the target
+        self.next = [UNKNOWN] * size  # Next cell toward the target, NO_PATH, or UNKNOWN until asked
+        self.done = bytearray(size)  # Cells in the tree, whose distance is final
+        self.open = []  # Heap of (distance + estimate, -distance, cell) waiting to join the tree
+        self.reference = None  # Cell the estimates are to
+        if cell is not None:
+            self.distance[cell] = 0  # Searched from even if a wall overlaps it
+            self.open.append((0, 0, cell))
+
+    def _grow(self, goal):
+        """
+        Add cells to the tree until it holds goal and every cell a shortest
+        path to goal could come through, or every reachable cell
+        """
+        nav = self.nav
+        stride = nav.stride
+        distance, done, walkable = self.distance, self.done, nav.walkable
+        orthogonal, diagonal = nav.orthogonal, nav.diagonal
+
+        # A* estimates are the cheapest possible cost to the first cell asked
+        # about. They keep the tree growing toward agents without reordering
+        # it for every lookup: any estimate that never drops by more than a
+        # step's cost from one cell to the next keeps distances exact.
+        if self.reference is None:
+            self.reference = goal
+        reference_row, reference_column = divmod(self.reference, stride)
+        straight, extra = ORTHOGONAL_COST, DIAGONAL_COST - ORTHOGONAL_COST
+        row, column = divmod(goal, stride)
+        rows, columns = abs(row - reference_row), abs(column - reference_column)
+        goal_estimate = straight * max(rows, columns) + extra * min(rows, columns)
+
+        open_cells = self.open
+        push, pop = heapq.heappush, heapq.heappop
+        # Cells on a shortest path to goal have an estimated total of at most
+        # goal's, so once goal is in the tree, carry on until every cell left
+        # is estimated above it. Ties go to the cell furthest along.
+        while open_cells and (not done[goal] or open_cells[0][0] <= distance[goal] + goal_estimate):
+            _, negative_cost, cell = pop(open_cells)
+            cost = -negative_cost
+            if done[cell] or cost != distance[cell]:
+                continue  # Already in the tree, or reached more cheaply since
+            done[cell] = 1
+            step = cost + ORTHOGONAL_COST
+            for offset in orthogonal:
+                neighbour = cell + offset
+                if walkable[neighbour] and distance[neighbour] > step:
+                    distance[neighbour] = step
+                    row, column = divmod(neighbour, stride)
+                    rows, columns = abs(row - reference_row), abs(column - reference_column)
+                    push(open_cells, (step + straight * max(rows, columns) + extra * min(rows, columns),
+                                      -step, neighbour))
+            step = cost + DIAGONAL_COST
+            for offset, side, other_side in diagonal:
+                neighbour = cell + offset
+                if (walkable[neighbour] and distance[neighbour] > step and
+                        walkable[cell + side] and walkable[cell + other_side]):
+                    distance[neighbour] = step
+                    row, column = divmod(neighbour, stride)
+                    rows, columns = abs(row - reference_row), abs(column - reference_column)
+                    push(open_cells, (step + straight * max(rows, columns) + extra * min(rows, columns),
+                                      -step, neighbour))
+
+    def waypoint(self, x, y):
+        """
+        Centre of the next cell on the shortest path from the point to the
+        target, or None where the agent should head straight for the target:
+        in or next to the target's cell, or where there's no path (outside
+        the grid, inside a wall or cut off from the target within it).
+        """
+        nav = self.nav
+        cell = nav.cell(x, y)
+        if cell is None or self.target is None or not nav.walkable[cell]:
+            return None
+        next_cell = self.next[cell]
+        if next_cell == UNKNOWN:
+            next_cell = self.next[cell] = self._next_cell(cell)
+        if next_cell == NO_PATH:
+            return None
+        return nav.center(next_cell)
+
+    def _next_cell(self, cell):
+        """
+        The first neighbour, in a fixed order, that a shortest path to the
+        target goes through. Which cells happen to be in the tree depends on
+        the lookups so far, but this only depends on the walls, the target
+        and the cell, so simulations restored from a snapshot steer the same.
+        """
+        self._grow(cell)
+        distance, done = self.distance, self.done
+        here = distance[cell]
+        if not done[cell] or here <= DIAGONAL_COST:
+            return NO_PATH  # Cut off, or close enough to head straight for the target
+        walkable = self.nav.walkable
+        for offset in self.nav.orthogonal:
+            if done[cell + offset] and distance[cell + offset] + ORTHOGONAL_COST == here:
+                return cell + offset
+        for offset, side, other_side in self.nav.diagonal:
+            if (done[cell + offset] and distance[cell + offset] + DIAGONAL_COST == here and
+                    walkable[cell + side] and walkable[cell + other_side]):
+                return cell + offset
+        return NO_PATH
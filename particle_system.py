@@ -0,0 +1,76 @@
+"""
+Struct-of-arrays particle storage for Cyberpunk Hacker Duel.
+
+Particles are kept in parallel NumPy arrays instead of a list of dicts, so
+ageing, fading and removal happen as a handful of array operations per frame
+no matter how many particles are alive. Live particles always occupy the
+first `count` slots of every array.
+"""
+import numpy as np
+
+
+class ParticleSystem:
+    """Fixed-capacity particle store with one array per particle attribute"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.size = np.zeros(capacity, dtype=np.float32)
+        self.alpha = np.zeros(capacity, dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.float32)
+        self.lifetime = np.zeros(capacity, dtype=np.float32)
+        self.fade_speed = np.zeros(capacity, dtype=np.float32)
+        self.fade_in = np.zeros(capacity, dtype=bool)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self._fields = ('x', 'y', 'size', 'alpha', 'age', 'lifetime', 'fade_speed', 'fade_in', 'color')
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def spawn(self, x, y, size, lifetime, color, alpha=0.0, fade_speed=0.0, fade_in=False):
+        """
+        Add particles. Every argument may be a scalar or an array with one value
+        per new particle (color is an RGB triple or an (n, 3) array). Particles
+        that don't fit in the remaining capacity are dropped.
+        """
+        x = np.atleast_1d(x)
+        spawn_count = min(len(x), self.capacity - self.count)
+        if spawn_count <= 0:
+            return 0
+
+        new = slice(self.count, self.count + spawn_count)
+        values = {
+            'x': x, 'y': y, 'size': size, 'alpha': alpha, 'age': 0.0,
+            'lifetime': lifetime, 'fade_speed': fade_speed, 'fade_in': fade_in,
+        }
+        for name, value in values.items():
+            value = np.asarray(value)
+            getattr(self, name)[new] = value[:spawn_count] if value.ndim else value
+        color = np.asarray(color)
+        self.color[new] = color[:spawn_count] if color.ndim == 2 else color
+
+        self.count += spawn_count
+        return spawn_count
+
+    def advance(self, dt):
+        """Age all live particles by dt seconds and drop the ones past their lifetime"""
+        count = self.count
+        age = self.age[:count]
+        age += dt
+        self.keep(age < self.lifetime[:count])
+
+    def keep(self, mask):
+        """Compact the live particles down to those selected by the boolean mask"""
+        if mask.all():
+            return
+        kept = int(np.count_nonzero(mask))
+        count = self.count
+        for name in self._fields:
+            array = getattr(self, name)
+            array[:kept] = array[:count][mask]
+        self.count = kept
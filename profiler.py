@@ -0,0 +1,127 @@
+"""
+Frame profiler for Cyberpunk Hacker Duel.
+
+FrameProfiler wraps the game's update and draw functions with timers, keeps
+the most recent durations of every section in a rolling window, and reports
+their p50/p95/p99 as an on-screen overlay or as a CSV/JSON dump. While it is
+disabled a wrapped function costs one extra attribute check per call.
+"""
+import csv
+import functools
+import json
+import time
+
+import numpy as np
+import pygame
+
+
+class FrameProfiler:
+    """Per-section timings over a rolling window of recent calls"""
+
+    def __init__(self, window=600, refresh_interval=0.5):
+        self.enabled = False
+        self.window = window  # Calls kept per section for the percentiles
+        self.refresh_interval = refresh_interval  # Seconds between overlay redraws
+        self.samples = {}  # section -> ring buffer of durations in seconds
+        self.calls = {}  # section -> total number of recorded calls
+        self.totals = {}  # section -> total recorded seconds
+        self.frame_start = None
+        self.overlay = None
+        self.overlay_time = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.frame_start = None
+        return self.enabled
+
+    def record(self, section, seconds):
+        samples = self.samples.get(section)
+        if samples is None:
+            samples = self.samples[section] = np.zeros(self.window)
+            self.calls[section] = 0
+            self.totals[section] = 0.0
+        samples[self.calls[section] % self.window] = seconds
+        self.calls[section] += 1
+        self.totals[section] += seconds
+
+    def wrap(self, section, func):
+        """Return func timed under the given section name"""
+        perf_counter = time.perf_counter
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(section, perf_counter() - start)
+
+        return timed
+
+    def instrument(self, target, names, prefix=''):
+        """
+        Replace the named functions with timed wrappers. target is a module's
+        globals() dict or an object whose methods should be timed.
+        """
+        for name in names:
+            if isinstance(target, dict):
+                target[name] = self.wrap(prefix + name, target[name])
+            else:
+                setattr(target, name, self.wrap(prefix + name, getattr(target, name)))
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter() if self.enabled else None
+
+    def end_frame(self):
+        """Record the time since begin_frame() as the 'frame' section"""
+        if self.enabled and self.frame_start is not None:
+            self.record('frame', time.perf_counter() - self.frame_start)
+        self.frame_start = None
+
+    def has_samples(self):
+        return bool(self.calls)
+
+    def stats(self):
+        """Rows of (section, calls, mean_ms, p50_ms, p95_ms, p99_ms, max_ms) over the rolling window"""
+        rows = []
+        for section, samples in self.samples.items():
+            recent = samples[:min(self.calls[section], self.window)] * 1000
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99])
+            rows.append((section, self.calls[section], float(recent.mean()),
+                         float(p50), float(p95), float(p99), float(recent.max())))
+        return rows
+
+    def dump(self, path):
+        """Write the stats to path, as JSON if it ends in .json and CSV otherwise"""
+        fields = ('section', 'calls', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+        rows = self.stats()
+        with open(path, 'w', newline='') as f:
+            if path.endswith('.json'):
+                json.dump([dict(zip(fields, row)) for row in rows], f, indent=2)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(fields)
+                for row in rows:
+                    writer.writerow([row[0], row[1]] + [f'{value:.4f}' for value in row[2:]])
+
+    def draw(self, target, font, pos=(10, 10), color=(0, 255, 0)):
+        """
+        Blit the stats table at pos and return the rect it covers. The table
+        is only re-rendered every refresh_interval seconds.
+        """
+        now = time.perf_counter()
+        if self.overlay is None or now - self.overlay_time >= self.refresh_interval:
+            self.overlay_time = now
+            lines = [f"{'section':<28}{'p50':>7}{'p95':>7}{'p99':>7} ms"]
+            for section, _, _, p50, p95, p99, _ in self.stats():
+                lines.append(f"{section[:28]:<28}{p50:>7.2f}{p95:>7.2f}{p99:>7.2f}")
+            rendered = [font.render(line, True, color) for line in lines]
+            line_height = font.get_linesize()
+            width = max(surf.get_width() for surf in rendered) + 12
+            self.overlay = pygame.Surface((width, line_height * len(rendered) + 12), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 190))
+            for i, surf in enumerate(rendered):
+                self.overlay.blit(surf, (6, 6 + i * line_height))
+        return target.blit(self.overlay, pos)
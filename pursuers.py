@@ -0,0 +1,404 @@
+"""
+Extra firewalls and scanners for Cyberpunk Hacker Duel's harder levels.
+
+Past level 3, more firewalls and scanners join the one of each every level
+has. They're held in NumPy structured arrays, a row per pursuer, and the
+functions here move and collision-test all of them in one vectorised pass,
+however many there are. Each pursuer has a behaviour profile - 1, 2 or 3 -
+and moves the way the firewall or scanner moves on that level.
+
+The extra firewalls sweep the world like the firewall. The extra scanners
+hunt the player until a decoy is out, then go for the decoy, steering around
+the walls as the scanner does; one that catches either is sent back to a
+random spot on the far half of the world.
+
+The arrays can have leading dimensions besides the pursuer one, and the
+positions they're tested against broadcast with them, so BatchSimulation
+moves every game's pursuers in the same calls as GameSimulation does one's.
+A few pursuers are quicker to move a row at a time than to pay NumPy's
+per-call overhead on, so up to SCALAR_LIMIT of them GameSimulation uses
+move_firewall() and move_scanner() on plain tuples instead, with the random
+draws for every row taken from the generator in one call.
+
+Collisions are tested against every pursuer directly rather than through a
+spatial index: there's only the player (or decoy) to test against, and with
+every pursuer moving every tick a grid would have to be rebuilt each time,
+which costs more than the one vectorised test it would save.
+"""
+import math
+
+import numpy as np
+
+# game_simulation.VIEWPORT_WIDTH, which the profile 3 firewall tracks the
+# player relative to (game_simulation imports this module)
+VIEWPORT_WIDTH = 800
+
+# Extra scanners only path around the walls within this distance of the
+# decoy, heading straight for it from further away, so the flow field grows
+# around the decoy instead of toward every scanner in the world
+STEER_DISTANCE = 240
+
+# Pursuers in a game up to which GameSimulation moves them a row at a time
+SCALAR_LIMIT = 32
+
+# Uniform draws per row for move_firewall() and move_scanner()
+FIREWALL_DRAWS = 7
+SCANNER_DRAWS = 8
+
+# One row per pursuer
+FIREWALL_RECORD = np.dtype([
+    ('x', '<f8'), ('y', '<f8'), ('prev_x', '<f8'), ('prev_y', '<f8'),
+    ('width', '<f8'), ('height', '<f8'), ('speed', '<f8'), ('vertical_speed', '<f8'),
+    ('vertical_direction', '<f8'),  # 1 = down, -1 = up
+    ('profile', '<i8'),
+])
+SCANNER_RECORD = np.dtype([
+    ('x', '<f8'), ('y', '<f8'), ('prev_x', '<f8'), ('prev_y', '<f8'),
+    ('radius', '<f8'), ('speed', '<f8'), ('profile', '<i8'),
+])
+
+# Firewall speed, width, height and vertical speed for each behaviour profile,
+# as the firewall has them on that level
+FIREWALL_PROFILES = {
+    1: (3, 8, 200, 1),  # Thin, short and slow - easy to dodge
+    2: (4, 10, 300, 1.5),
+    3: (5, 12, 400, 2),  # Fast, thick and tall - harder to dodge
+}
+# Scanner radius and speed for each behaviour profile; level 1 has no scanner
+SCANNER_PROFILES = {
+    2: (4, 4),  # Smaller and slower
+    3: (5, 6),
+}
+
+
+def pursuer_counts(level):
+    """Extra (firewalls, scanners) on a level: none up to level 3, then one and two more per level"""
+    extra = max(0, level - 3)
+    return extra, 2 * extra
+
+
+def chance(rng, probability, frames, shape):
+    """game_simulation.chance() rolled for every pursuer"""
+    return rng.random(shape) < 1 - (1 - probability) ** frames
+
+
+def overlap_times(start, size, other_start, other_size, velocity):
+    """game_simulation.overlap_times() for arrays"""
+    moving = velocity != 0
+    divisor = np.where(moving, velocity, 1.0)
+    enter = (other_start - start - size) / divisor
+    leave = (other_start + other_size - start) / divisor
+    overlapping = (start < other_start + other_size) & (other_start < start + size)
+    first = np.where(moving, np.maximum(np.where(velocity < 0, leave, enter), 0.0), np.where(overlapping, 0.0, 1.0))
+    last = np.where(moving, np.minimum(np.where(velocity < 0, enter, leave), 1.0), np.where(overlapping, 1.0, 0.0))
+    return first, last
+
+
+def segment_meets_circle(x1, y1, x2, y2, center_x, center_y, radius):
+    """game_simulation.segment_meets_circle() for arrays"""
+    dx, dy = x2 - x1, y2 - y1
+    length_squared = dx * dx + dy * dy
+    t = np.where(length_squared == 0, 0.0, np.clip(((center_x - x1) * dx + (center_y - y1) * dy) /
+                                                    np.where(length_squared == 0, 1.0, length_squared), 0.0, 1.0))
+    return np.sqrt((x1 + t * dx - center_x) ** 2 + (y1 + t * dy - center_y) ** 2) < radius
+
+
+def new_firewalls(profiles, rng, world_width, world_height):
+    """
+    Firewalls with the given behaviour profiles, waiting at random distances
+    off the left edge of the world so they come in one after another
+    """
+    firewalls = np.zeros(len(profiles), FIREWALL_RECORD)
+    for name, column in zip(('speed', 'width', 'height', 'vertical_speed'),
+                            zip(*[FIREWALL_PROFILES[profile] for profile in profiles])):
+        firewalls[name] = column
+    firewalls['profile'] = profiles
+    firewalls['vertical_direction'] = 1
+    firewalls['x'] = -firewalls['width'] - rng.uniform(0, world_width, len(profiles))
+    firewalls['y'] = rng.integers(0, (world_height - firewalls['height']).astype(np.int64), endpoint=True)
+    firewalls['prev_x'], firewalls['prev_y'] = firewalls['x'], firewalls['y']
+    return firewalls
+
+
+def new_scanners(profiles, rng, world_width, world_height):
+    """Scanners with the given behaviour profiles at random spots on the far half of the world"""
+    scanners = np.zeros(len(profiles), SCANNER_RECORD)
+    for name, column in zip(('radius', 'speed'), zip(*[SCANNER_PROFILES[profile] for profile in profiles])):
+        scanners[name] = column
+    scanners['profile'] = profiles
+    send_back(scanners, np.ones(len(profiles), dtype=bool), rng, world_width, world_height)
+    return scanners
+
+
+def send_back(scanners, sent, rng, world_width, world_height):
+    """Move the scanners where sent is set to random spots on the far half of the world"""
+    shape = scanners.shape
+    x = rng.uniform(world_width / 2, world_width - 50, shape)
+    y = rng.uniform(50, world_height - 50, shape)
+    scanners['x'] = np.where(sent, x, scanners['x'])
+    scanners['y'] = np.where(sent, y, scanners['y'])
+    # Don't interpolate or sweep across the jump
+    scanners['prev_x'] = np.where(sent, scanners['x'], scanners['prev_x'])
+    scanners['prev_y'] = np.where(sent, scanners['y'], scanners['prev_y'])
+
+
+def bounce(y, height, direction, world_height):
+    """Firewall vertical directions after reaching the top or bottom of the world at y"""
+    return np.where(y <= 0, 1, np.where(y + height >= world_height, -1, direction))
+
+
+def move_firewalls(firewalls, frames, rng, world_width, world_height, player_x, player_y,
+                   decoy_active, decoy_x, decoy_y):
+    """
+    Move firewalls by a tick of the given number of reference frames, each
+    the way the firewall moves on its profile's level: after the decoy while
+    one is out, otherwise on across the world and back in on the left at a
+    random height once past its right edge.
+    """
+    shape = firewalls.shape
+    profile = firewalls['profile']
+    x, y = firewalls['x'], firewalls['y']
+    height = firewalls['height']
+    direction = firewalls['vertical_direction']
+    speed = firewalls['speed'] * frames
+    vertical_speed = firewalls['vertical_speed'] * frames
+
+    # Chasing a decoy: faster the further away it is, and stronger at higher profiles
+    dx = decoy_x - x
+    dy = decoy_y - (y + height / 2)
+    distance = np.sqrt(dx * dx + dy * dy)
+    chase_x = x + np.sign(dx) * (speed * np.clip(distance / 300, 1.0, 2.0) * (1.0 + profile * 0.2))
+    vert_step = vertical_speed * np.clip(np.abs(dy) / 200, 0.5, 1.5) * (0.5 + profile * 0.25)
+    chase_y = np.where(np.abs(dy) > 10, np.where(dy > 0, y + vert_step, y - vert_step), y)
+    chase_y = np.where(chance(rng, 0.2, frames, shape), chase_y + rng.uniform(-1.0, 1.0, shape), chase_y)
+
+    # Profile 1 moves steadily right, profile 2 varies its speed now and then
+    # and profile 3 speeds up when the player is far ahead and slows down
+    # when close, some of the time
+    variation = np.where((profile == 2) & (rng.random(shape) > 0.95), rng.uniform(0.8, 1.2, shape), 1.0)
+    tracking = np.where(player_x > x + VIEWPORT_WIDTH / 2, 1.3, 0.9)
+    new_x = x + speed * np.where((profile == 3) & (rng.random(shape) > 0.7), tracking, variation)
+
+    # Vertically all bounce between the top and bottom of the world, faster
+    # at higher profiles. Profile 2 changes direction now and then, and
+    # profile 3 heads for the player's height half the time.
+    onward = y + vertical_speed * np.where(profile == 1, 1.0, np.where(profile == 2, 1.5, 2.0)) * direction
+    center_y = y + height / 2
+    toward = y + vertical_speed * 2 * np.sign(player_y - center_y)
+    steer = (profile == 3) & (rng.random(shape) > 0.5)
+    new_y = np.where(steer, toward, onward)
+    new_direction = np.where((profile == 2) & chance(rng, 0.02, frames, shape), -direction, direction)
+    new_direction = np.where(steer, direction, bounce(onward, height, new_direction, world_height))
+
+    # Firewalls leaving the world come back on the left at a random height
+    wrap = ~np.asarray(decoy_active) & (new_x > world_width)
+    if wrap.any():
+        new_x = np.where(wrap, -firewalls['width'], new_x)
+        heights = (world_height - height).astype(np.int64)
+        new_y = np.where(wrap, rng.integers(0, heights, endpoint=True), new_y)
+        # No sweeping across the jump
+        firewalls['prev_x'] = np.where(wrap, new_x, firewalls['prev_x'])
+        firewalls['prev_y'] = np.where(wrap, new_y, firewalls['prev_y'])
+
+    firewalls['x'] = np.where(decoy_active, chase_x, new_x)
+    firewalls['y'] = np.where(decoy_active, chase_y, new_y)
+    firewalls['vertical_direction'] = np.where(decoy_active, direction, new_direction)
+
+
+def move_scanners(scanners, frames, rng, target_x, target_y, waypoint_x, waypoint_y, steering):
+    """
+    Move scanners toward their targets by a step of the given number of
+    reference frames, each the way the scanner moves on its profile's level.
+    Where steering is set they head for their waypoint instead.
+    """
+    shape = scanners.shape
+    profile = scanners['profile']
+    x, y = scanners['x'], scanners['y']
+
+    dx = target_x - x
+    dy = target_y - y
+    distance = np.maximum(0.1, np.sqrt(dx * dx + dy * dy))
+    to_x = waypoint_x - x
+    to_y = waypoint_y - y
+    waypoint_distance = np.maximum(0.1, np.sqrt(to_x * to_x + to_y * to_y))
+    dx = np.where(steering, to_x / waypoint_distance, dx / distance)
+    dy = np.where(steering, to_y / waypoint_distance, dy / distance)
+
+    # Profile 2: simple, somewhat inaccurate tracking at constant speed
+    noisy_x = dx + rng.uniform(-0.2, 0.2, shape)
+    noisy_y = dy + rng.uniform(-0.2, 0.2, shape)
+    noisy_distance = np.maximum(0.1, np.sqrt(noisy_x * noisy_x + noisy_y * noisy_y))
+
+    # Profile 3: half the time aims slightly ahead of the target
+    pred_dx = target_x + rng.integers(-10, 30, size=shape, endpoint=True) - x
+    pred_dy = target_y + rng.integers(-20, 20, size=shape, endpoint=True) - y
+    pred_dist = np.maximum(0.1, np.sqrt(pred_dx * pred_dx + pred_dy * pred_dy))
+    blend_x = (dx + (pred_dx / pred_dist)) / 2
+    blend_y = (dy + (pred_dy / pred_dist)) / 2
+    blend_distance = np.maximum(0.1, np.sqrt(blend_x * blend_x + blend_y * blend_y))
+    predict = (rng.random(shape) > 0.5) & ~steering
+    advanced = profile >= 3
+    dx = np.where(advanced, np.where(predict, blend_x / blend_distance, dx), noisy_x / noisy_distance)
+    dy = np.where(advanced, np.where(predict, blend_y / blend_distance, dy), noisy_y / noisy_distance)
+
+    # Profile 3 speeds up when far from the target and slows down when close,
+    # and now and then makes a sharp movement
+    step = scanners['speed'] * frames * np.where(advanced, np.clip(distance / 200, 0.8, 1.5), 1.0)
+    step += np.where(advanced & chance(rng, 0.05, frames, shape), scanners['speed'] * 1.5, 0.0)
+    scanners['x'] = x + dx * step
+    scanners['y'] = y + dy * step
+
+
+def move_firewall(firewall, draws, frames, world_width, world_height, player_x, player_y,
+                  decoy_active, decoy_x, decoy_y):
+    """
+    move_firewalls() for one firewall as a tuple of its fields, returning the
+    moved one. draws are FIREWALL_DRAWS uniform numbers in [0, 1).
+    """
+    x, y, prev_x, prev_y, width, height, speed, vertical_speed, direction, profile = firewall
+    step = speed * frames
+    vertical_step = vertical_speed * frames
+
+    if decoy_active:
+        dx = decoy_x - x
+        dy = decoy_y - (y + height / 2)
+        if dx:
+            distance = math.sqrt(dx * dx + dy * dy)
+            x += math.copysign(step * min(2.0, max(1.0, distance / 300)) * (1.0 + profile * 0.2), dx)
+        if abs(dy) > 10:
+            vert_step = vertical_step * min(1.5, max(0.5, abs(dy) / 200)) * (0.5 + profile * 0.25)
+            y += vert_step if dy > 0 else -vert_step
+        if draws[0] < 1 - 0.8 ** frames:
+            y += draws[1] * 2 - 1
+        return x, y, prev_x, prev_y, width, height, speed, vertical_speed, direction, profile
+
+    steer = False
+    if profile == 1:
+        x += step
+        y += vertical_step * direction
+    elif profile == 2:
+        x += step * (0.8 + 0.4 * draws[3] if draws[2] > 0.95 else 1.0)
+        y += vertical_step * 1.5 * direction
+        if draws[5] < 1 - 0.98 ** frames:
+            direction = -direction
+    else:
+        if draws[2] > 0.7:
+            x += step * (1.3 if player_x > x + VIEWPORT_WIDTH / 2 else 0.9)
+        else:
+            x += step
+        steer = draws[4] > 0.5
+        if steer:
+            center_y = y + height / 2
+            if player_y != center_y:
+                y += vertical_step * 2 if player_y > center_y else -vertical_step * 2
+        else:
+            y += vertical_step * 2 * direction
+    if not steer:
+        if y <= 0:
+            direction = 1
+        elif y + height >= world_height:
+            direction = -1
+
+    if x > world_width:
+        # Back in on the left at a random height, without sweeping across the jump
+        x = -width
+        y = float(int(draws[6] * (int(world_height - height) + 1)))
+        prev_x, prev_y = x, y
+    return x, y, prev_x, prev_y, width, height, speed, vertical_speed, direction, profile
+
+
+def move_scanner(scanner, draws, frames, target_x, target_y, waypoint):
+    """
+    move_scanners() for one scanner as a tuple of its fields, heading for the
+    (x, y) waypoint unless it's None, and returning the moved one. draws are
+    SCANNER_DRAWS uniform numbers in [0, 1).
+    """
+    x, y, prev_x, prev_y, radius, speed, profile = scanner
+    dx = target_x - x
+    dy = target_y - y
+    distance = max(0.1, math.sqrt(dx * dx + dy * dy))
+    if waypoint is None:
+        dx /= distance
+        dy /= distance
+    else:
+        dx = waypoint[0] - x
+        dy = waypoint[1] - y
+        waypoint_distance = max(0.1, math.sqrt(dx * dx + dy * dy))
+        dx /= waypoint_distance
+        dy /= waypoint_distance
+
+    step = speed * frames
+    if profile < 3:
+        dx += draws[0] * 0.4 - 0.2
+        dy += draws[1] * 0.4 - 0.2
+        noisy_distance = max(0.1, math.sqrt(dx * dx + dy * dy))
+        return x + dx / noisy_distance * step, y + dy / noisy_distance * step, prev_x, prev_y, radius, speed, profile
+
+    if draws[4] > 0.5 and waypoint is None:
+        pred_dx = target_x + (int(draws[2] * 41) - 10) - x
+        pred_dy = target_y + (int(draws[3] * 41) - 20) - y
+        pred_dist = max(0.1, math.sqrt(pred_dx * pred_dx + pred_dy * pred_dy))
+        dx = (dx + pred_dx / pred_dist) / 2
+        dy = (dy + pred_dy / pred_dist) / 2
+        blend_distance = max(0.1, math.sqrt(dx * dx + dy * dy))
+        dx /= blend_distance
+        dy /= blend_distance
+    step *= min(1.5, max(0.8, distance / 200))
+    if draws[5] < 1 - 0.95 ** frames:
+        step += speed * 1.5
+    return x + dx * step, y + dy * step, prev_x, prev_y, radius, speed, profile
+
+
+def far_spot(scanner, draws, world_width, world_height):
+    """send_back() for one scanner as a tuple of its fields, using the last two of its draws"""
+    x = world_width / 2 + draws[-2] * (world_width / 2 - 50)
+    y = 50 + draws[-1] * (world_height - 100)
+    return (x, y, x, y) + tuple(scanner[4:])
+
+
+def firewall_hits(firewalls, player_prev_x, player_prev_y, player_x, player_y, player_size):
+    """
+    Which firewalls overlapped the player at any point during the tick,
+    taking both to have moved in a straight line from where they started it,
+    as in check_firewall_collision()
+    """
+    dx = (player_x - player_prev_x) - (firewalls['x'] - firewalls['prev_x'])
+    dy = (player_y - player_prev_y) - (firewalls['y'] - firewalls['prev_y'])
+    first_x, last_x = overlap_times(player_prev_x, player_size, firewalls['prev_x'], firewalls['width'], dx)
+    first_y, last_y = overlap_times(player_prev_y, player_size, firewalls['prev_y'], firewalls['height'], dy)
+    return np.maximum(first_x, first_y) < np.minimum(last_x, last_y)
+
+
+def scanner_hits(scanners, from_x, from_y, center_x, center_y, reach):
+    """Which scanners passed within their radius plus reach of the centre on their way from (from_x, from_y)"""
+    return segment_meets_circle(from_x, from_y, scanners['x'], scanners['y'], center_x, center_y,
+                                scanners['radius'] + reach)
+
+
+def near(x, y, target_x, target_y):
+    """Which points are within STEER_DISTANCE of the target"""
+    return (x - target_x) ** 2 + (y - target_y) ** 2 < STEER_DISTANCE * STEER_DISTANCE
+
+
+def flow_waypoints(flow, x, y, target_x, target_y):
+    """
+    FlowField.waypoint() for arrays of points near the field's target: the
+    waypoints' coordinates and where there is one. The field is asked once
+    per cell the points are in.
+    """
+    nav = flow.nav
+    size = nav.cell_size
+    column = (x - nav.left) // size
+    row = (y - nav.top) // size
+    inside = (0 <= column) & (column < nav.columns) & (0 <= row) & (row < nav.rows) & near(x, y, target_x, target_y)
+    cells = np.where(inside, (row + 1) * nav.stride + column + 1, -1).astype(np.int64)
+    unique, where = np.unique(cells, return_inverse=True)
+    waypoint_x, waypoint_y = np.zeros(len(unique)), np.zeros(len(unique))
+    found = np.zeros(len(unique), dtype=bool)
+    for index, cell in enumerate(unique.tolist()):
+        waypoint = None if cell < 0 else flow.waypoint(*nav.center(cell))
+        if waypoint is not None:
+            waypoint_x[index], waypoint_y[index] = waypoint
+            found[index] = True
+    where = where.reshape(x.shape)
+    return waypoint_x[where], waypoint_y[where], found[where]
@@ -0,0 +1,332 @@
+"""
+Pre-rendered surfaces for Cyberpunk Hacker Duel.
+
+Drawing the same static shapes from scratch every frame is where most of the
+renderer's time goes. The caches in this module render such content once and
+let the game loop draw it with a few blits per frame.
+"""
+import math
+import random
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+from maze import CHUNK_SIZE
+
+
+class WallLayer:
+    """
+    Maze walls pre-rendered into world-space chunk surfaces.
+
+    Chunks are baked from the maze as they come within lookahead pixels of
+    the view, and the ones drawn least recently are dropped once there are
+    more than max_chunks, so memory stays bounded however large the world
+    grows. Only chunks that contain walls get a surface, so empty parts of
+    the world cost neither memory nor blits.
+    """
+
+    def __init__(self, lookahead=CHUNK_SIZE // 2, max_chunks=24):
+        self.chunk_size = CHUNK_SIZE  # The maze's chunks
+        self.lookahead = lookahead
+        self.max_chunks = max_chunks
+        self.maze = None
+        self.color = (255, 255, 255)
+        self.chunks = OrderedDict()  # (chunk_x, chunk_y) -> SRCALPHA surface or None, most recently drawn last
+
+    def bake(self, maze, color):
+        """Draw the maze's walls from now on, replacing any previous chunks"""
+        self.maze = maze
+        self.color = color
+        self.chunks = OrderedDict()
+
+    def chunk(self, chunk_x, chunk_y):
+        key = (chunk_x, chunk_y)
+        chunks = self.chunks
+        if key in chunks:
+            chunks.move_to_end(key)
+            return chunks[key]
+        chunk_size = self.chunk_size
+        surf = None
+        walls = self.maze.chunk(chunk_x, chunk_y)[0]
+        if walls:
+            surf = pygame.Surface((chunk_size, chunk_size), pygame.SRCALPHA)
+            for wall in walls:
+                pygame.draw.rect(surf, self.color, wall.move(-chunk_x * chunk_size, -chunk_y * chunk_size))
+        chunks[key] = surf
+        if len(chunks) > self.max_chunks:
+            chunks.popitem(last=False)
+        return surf
+
+    def draw(self, target, camera_x, camera_y, view_width, view_height):
+        """Blit every chunk overlapping the view at its camera-relative position"""
+        if self.maze is None or self.maze.empty:
+            return
+        chunk_size = self.chunk_size
+        # Snap the camera to whole pixels once so neighbouring chunks line up
+        # without seams (rounding up matches how individual blits at
+        # world - camera positions land)
+        camera_x = math.ceil(camera_x)
+        camera_y = math.ceil(camera_y)
+        maze = self.maze
+        lookahead = self.lookahead
+        baked_ahead = False
+        for chunk_x in range(max(0, (camera_x - lookahead) // chunk_size),
+                             min(maze.columns - 1, (camera_x + view_width + lookahead - 1) // chunk_size) + 1):
+            for chunk_y in range(max(0, (camera_y - lookahead) // chunk_size),
+                                 min(maze.rows - 1, (camera_y + view_height + lookahead - 1) // chunk_size) + 1):
+                screen_x = chunk_x * chunk_size - camera_x
+                screen_y = chunk_y * chunk_size - camera_y
+                if not (-chunk_size < screen_x < view_width and -chunk_size < screen_y < view_height):
+                    # Chunks just outside the view are baked before they
+                    # scroll in, one per frame so frames stay even
+                    if not baked_ahead and (chunk_x, chunk_y) not in self.chunks:
+                        self.chunk(chunk_x, chunk_y)
+                        baked_ahead = True
+                    continue
+                surf = self.chunk(chunk_x, chunk_y)
+                if surf is not None:
+                    target.blit(surf, (screen_x, screen_y))
+
+
+class GridLayer:
+    """
+    Background grid pre-rendered into a few jittered, viewport-sized tiles.
+
+    Each tile is one grid cell larger than the viewport in both directions, so
+    scrolling is just blitting it at the camera offset modulo the spacing. A
+    different tile is shown every frame to keep the flicker. Tiles are baked
+    per alpha value instead of faded with surface alpha, which keeps them on
+    SDL's fast RLE blit path.
+    """
+
+    def __init__(self, view_width, view_height, spacing=40, jitter=3, variants=4, rng=None):
+        self.rng = rng or random.Random()
+        self.width = view_width + spacing
+        self.height = view_height + spacing
+        self.spacing = spacing
+        self.jitter = jitter
+        self.variants = variants
+        self.color = (255, 255, 255)
+        self.lines = []  # Per variant: (vertical, horizontal) lists of (position, alpha offset)
+        self.tiles = {}  # (variant, alpha) -> RLE-accelerated SRCALPHA surface
+        self.current = 0
+
+    def bake(self, color):
+        """Pick the jitter and alpha flicker of every line in every variant"""
+        self.color = color
+        self.tiles = {}
+        self.lines = []
+        rng = self.rng
+        for _ in range(self.variants):
+            vertical = [(x + rng.randint(-self.jitter, self.jitter), rng.randint(-20, 10))
+                        for x in range(0, self.width, self.spacing)]
+            horizontal = [(y + rng.randint(-self.jitter, self.jitter), rng.randint(-20, 10))
+                          for y in range(0, self.height, self.spacing)]
+            self.lines.append((vertical, horizontal))
+
+    def tile(self, variant, alpha):
+        key = (variant, alpha)
+        tile = self.tiles.get(key)
+        if tile is None:
+            vertical, horizontal = self.lines[variant]
+            tile = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+            for x, alpha_offset in vertical:
+                line_color = (*self.color, max(10, alpha + alpha_offset))
+                pygame.draw.line(tile, line_color, (x, 0), (x, self.height), 1)
+            for y, alpha_offset in horizontal:
+                line_color = (*self.color, max(10, alpha + alpha_offset))
+                pygame.draw.line(tile, line_color, (0, y), (self.width, y), 1)
+            # The tile is mostly transparent, which RLE blits skip over
+            tile.set_alpha(255, pygame.RLEACCEL)
+            self.tiles[key] = tile
+        return tile
+
+    def draw(self, target, camera_x, camera_y, alpha):
+        """Blit the next tile with its lines aligned to the world grid at the given alpha"""
+        if not self.lines:
+            return
+        # Never show the same tile twice in a row so the grid keeps flickering
+        if self.variants > 1:
+            self.current = (self.current + self.rng.randrange(1, self.variants)) % self.variants
+        tile = self.tile(self.current, int(alpha))
+        target.blit(tile, (-int(camera_x % self.spacing), -int(camera_y % self.spacing)))
+
+
+class StaticNoise:
+    """
+    A bank of pre-generated static frames for screen transitions.
+
+    The frames are built with NumPy the first time they are needed, at full
+    intensity, and faded with surface alpha when drawn.
+    """
+
+    def __init__(self, width, height, color, frames=8, specks=5000, max_alpha=180):
+        self.width = width
+        self.height = height
+        self.color = color
+        self.frame_count = frames
+        self.specks = specks
+        self.max_alpha = max_alpha
+        self.frames = []
+        self.current = 0
+
+    def build(self, rng=None):
+        rng = rng or np.random.default_rng()
+        self.frames = []
+        for _ in range(self.frame_count):
+            alpha = np.zeros((self.width, self.height), dtype=np.uint8)
+            xs = rng.integers(0, self.width, self.specks)
+            ys = rng.integers(0, self.height, self.specks)
+            sizes = rng.integers(1, 4, self.specks)
+            values = rng.integers(int(self.max_alpha * 0.3), self.max_alpha, self.specks, endpoint=True)
+            # Stamp the 1-3 pixel square specks one pixel offset at a time
+            for offset_x in range(3):
+                for offset_y in range(3):
+                    stamp = (sizes > max(offset_x, offset_y)) & (xs + offset_x < self.width) & (ys + offset_y < self.height)
+                    alpha[xs[stamp] + offset_x, ys[stamp] + offset_y] = values[stamp]
+            frame = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+            frame.fill((*self.color, 0))
+            pygame.surfarray.pixels_alpha(frame)[:] = alpha
+            self.frames.append(frame)
+
+    def draw(self, target, intensity, rng=None):
+        """Blit the next frame, scaled so its brightest specks have the given alpha"""
+        if not self.frames:
+            self.build(rng)
+        self.current = (self.current + 1) % len(self.frames)
+        frame = self.frames[self.current]
+        frame.set_alpha(max(0, min(255, round(255 * intensity / self.max_alpha))))
+        target.blit(frame, (0, 0))
+
+
+class ParticleSprites:
+    """
+    Pre-baked particle sprites stamped with a single Surface.blits call.
+
+    Sprites are keyed by color, whole-pixel radius, quantised alpha and whether
+    they carry a glow halo, and are baked the first time a key is needed.
+    """
+
+    def __init__(self, alpha_levels=32):
+        self.alpha_levels = alpha_levels
+        self.sprites = {}  # (color, radius, alpha_level, glow) -> (surface, extent)
+
+    def sprite(self, color, radius, alpha_level, glow):
+        key = (color, radius, alpha_level, glow)
+        cached = self.sprites.get(key)
+        if cached is None:
+            alpha = alpha_level * 255 // (self.alpha_levels - 1)
+            extent = radius * 2 if glow else radius
+            surf = pygame.Surface((extent * 2 + 1, extent * 2 + 1), pygame.SRCALPHA)
+            if glow:
+                pygame.draw.circle(surf, (*color, alpha // 3), (extent, extent), radius * 2)
+            pygame.draw.circle(surf, (*color, alpha), (extent, extent), radius)
+            cached = self.sprites[key] = (surf, extent)
+        return cached
+
+    def draw(self, target, screen_x, screen_y, sizes, alphas, colors, glow):
+        """
+        Stamp one sprite per particle. screen_x, screen_y, sizes and alphas are
+        arrays; colors is one RGB triple or an (n, 3) array and glow is a bool
+        or a bool array.
+        """
+        count = len(screen_x)
+        if count == 0:
+            return
+        alpha_levels = self.alpha_levels
+        radii = np.maximum(1, np.rint(sizes)).astype(np.int64)
+        levels = np.rint(np.clip(alphas, 0, 255) * ((alpha_levels - 1) / 255)).astype(np.int64)
+        colors = np.broadcast_to(np.asarray(colors, dtype=np.int64), (count, 3))
+        glow = np.broadcast_to(glow, (count,))
+
+        # Fully transparent particles don't need a stamp
+        shown = levels > 0
+        if not shown.all():
+            radii, levels, colors, glow = radii[shown], levels[shown], colors[shown], glow[shown]
+            screen_x, screen_y = screen_x[shown], screen_y[shown]
+
+        # Pack each particle's sprite key into one integer so the distinct
+        # sprites can be found with np.unique instead of a per-particle lookup
+        packed_color = (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+        keys = ((packed_color * 256 + radii) * alpha_levels + levels) * 2 + glow
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+
+        surfs = np.empty(len(unique_keys), dtype=object)
+        extents = np.empty(len(unique_keys), dtype=np.int64)
+        for index, key in enumerate(unique_keys.tolist()):
+            has_glow = bool(key & 1)
+            key >>= 1
+            level = key % alpha_levels
+            key //= alpha_levels
+            radius = key % 256
+            color = key // 256
+            surfs[index], extents[index] = self.sprite(
+                (color >> 16, (color >> 8) & 255, color & 255), radius, level, has_glow)
+
+        offsets = extents[inverse]
+        xs = (np.asarray(screen_x, dtype=np.int64) - offsets).tolist()
+        ys = (np.asarray(screen_y, dtype=np.int64) - offsets).tolist()
+        target.blits(zip(surfs[inverse].tolist(), zip(xs, ys)), doreturn=False)
+
+
+class SurfaceCache:
+    """
+    LRU-bounded cache of surfaces built on demand.
+
+    Returned surfaces are shared between callers, so they must not be drawn
+    on. Setting their alpha right before each blit is fine.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def clear(self):
+        self.surfaces.clear()
+
+    def get(self, key, build):
+        """Return the surface cached under key, calling build() to make it on a miss"""
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = self.surfaces[key] = build()
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surf
+
+
+class TextCache(SurfaceCache):
+    """Rendered text surfaces keyed by font, text, color and antialiasing"""
+
+    def render(self, font, text, color, antialias=True):
+        """Cached font.render(text, antialias, color)"""
+        # Font.render ignores the alpha of the color, so it isn't part of the key
+        key = ('text', font, text, tuple(color[:3]), antialias)
+        return self.get(key, lambda: font.render(text, antialias, color))
+
+    def glow(self, font, text, color, offsets, antialias=True):
+        """
+        The text blitted once at every (x, y) offset, pre-composited into one
+        surface padded so its center lines up with the plain text's center.
+        """
+        offsets = tuple(offsets)
+        key = ('glow', font, text, tuple(color[:3]), antialias, offsets)
+
+        def build():
+            text_surf = self.render(font, text, color, antialias)
+            pad_x = max(abs(x) for x, _ in offsets)
+            pad_y = max(abs(y) for _, y in offsets)
+            surf = pygame.Surface((text_surf.get_width() + pad_x * 2, text_surf.get_height() + pad_y * 2), pygame.SRCALPHA)
+            surf.blits([(text_surf, (pad_x + x, pad_y + y)) for x, y in offsets], doreturn=False)
+            return surf
+
+        return self.get(key, build)
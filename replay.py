@@ -0,0 +1,236 @@
+"""
+Session recording and replay for Cyberpunk Hacker Duel.
+
+The renderer only ever changes the simulation through reset_level(),
+step() and restoring the snapshot taken at the start of a level, and all
+gameplay randomness comes from the seeded sim.rng. So a session is fully
+described by its seed plus the inputs of every logic tick and the ticks at
+which levels were started or retried. A recording stores exactly that as a
+compact binary stream:
+
+    header   magic, format version, LOGIC_HZ, seed
+    records  (tick, value, kind) - one every time the inputs bitmask changes
+             or a level starts or is retried, and one per gameplay event raised
+
+The gameplay events are only there to check a replay against the original
+session. Replay a recording with rendering in real time with
+`python cyberpunk_hacker.py --replay FILE`, or headless at maximum speed:
+
+    python replay.py recordings/*.chdr
+"""
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+
+from game_simulation import (
+    GameSimulation, LOGIC_HZ, LOGIC_DT,
+    EVENT_WALL_HIT, EVENT_FIREWALL_HIT, EVENT_PLAYER_RESET, EVENT_PLAYER_DIED,
+    EVENT_SHARD_COLLECTED, EVENT_DECOY_SPAWNED, EVENT_SCANNER_SPAWNED, EVENT_WALLS_DISABLED,
+    EVENT_NODE_REACHED, EVENT_SCANNER_HIT
+)
+
+MAGIC = b'CHDR'
+FORMAT_VERSION = 8
+# Oldest version that replays the same: scanners path around walls since
+# version 3, the player has moved right up to walls instead of stopping short
+# since version 6, and mazes were laid out differently up to version 7.
+# (Version 1 recordings have no retries but are otherwise like 2.)
+MIN_FORMAT_VERSION = 8
+HEADER = struct.Struct('<4sHHQ')  # magic, format version, logic rate, seed
+RECORD = struct.Struct('<IBB')  # tick, value, kind
+
+# Record kinds
+RECORD_INPUT = 0  # The inputs bitmask is value from this tick on
+RECORD_LEVEL = 1  # reset_level(value) was called before this tick
+RECORD_END = 2  # The session ended before this tick
+RECORD_RETRY = 3  # The current level was restored to its start before this tick
+# Gameplay events raised by a tick, recorded with value 0
+FIRST_EVENT_KIND = 8
+EVENT_KINDS = {event: FIRST_EVENT_KIND + i for i, event in enumerate((
+    EVENT_WALL_HIT, EVENT_FIREWALL_HIT, EVENT_PLAYER_RESET, EVENT_PLAYER_DIED,
+    EVENT_SHARD_COLLECTED, EVENT_DECOY_SPAWNED, EVENT_SCANNER_SPAWNED, EVENT_WALLS_DISABLED,
+    EVENT_NODE_REACHED, EVENT_SCANNER_HIT
+))}
+
+# Where the game saves every session unless told otherwise
+RECORDING_DIR = 'recordings'
+RECORDING_EXTENSION = '.chdr'
+
+Recording = namedtuple('Recording', 'seed records')
+
+
+class SessionRecorder:
+    """Builds the recording of a session as the game drives its simulation"""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.data = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, LOGIC_HZ, seed))
+        self.tick = 0  # Logic ticks recorded so far
+        self.inputs = 0
+        self.ended = False
+
+    def record_level(self, level):
+        """Call after reset_level(level)"""
+        self.data += RECORD.pack(self.tick, level, RECORD_LEVEL)
+
+    def record_retry(self):
+        """Call after restoring the snapshot taken at the start of the level"""
+        self.data += RECORD.pack(self.tick, 0, RECORD_RETRY)
+
+    def record_step(self, inputs, events):
+        """Call after every sim.step(inputs) with the events that tick raised"""
+        if inputs != self.inputs:
+            self.inputs = inputs
+            self.data += RECORD.pack(self.tick, inputs, RECORD_INPUT)
+        for event in events:
+            self.data += RECORD.pack(self.tick, 0, EVENT_KINDS[event])
+        self.tick += 1
+
+    def end(self):
+        if not self.ended:
+            self.ended = True
+            self.data += RECORD.pack(self.tick, 0, RECORD_END)
+
+    def save(self, path):
+        """End the recording and write it to path"""
+        self.end()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(self.data)
+
+
+def default_recording_path(seed):
+    """A new file in RECORDING_DIR named after the current time and the seed"""
+    name = f"session-{time.strftime('%Y%m%d-%H%M%S')}-{seed}{RECORDING_EXTENSION}"
+    return os.path.join(RECORDING_DIR, name)
+
+
+def parse(data):
+    """Recording from the bytes written by SessionRecorder.save()"""
+    if len(data) < HEADER.size:
+        raise ValueError("Not a session recording: file too short")
+    magic, version, logic_hz, seed = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a session recording: bad magic")
+    if version < MIN_FORMAT_VERSION:
+        raise ValueError(f"Recording format version {version} is from older gameplay rules and won't replay the same")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported recording format version {version}")
+    if logic_hz != LOGIC_HZ:
+        raise ValueError(f"Recorded at {logic_hz} Hz but the simulation runs at {LOGIC_HZ} Hz")
+    body = memoryview(data)[HEADER.size:]
+    body = body[:len(body) - len(body) % RECORD.size]  # Drop a record cut off by a crash
+    return Recording(seed, list(RECORD.iter_unpack(body)))
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        return parse(f.read())
+
+
+class ReplayPlayer:
+    """
+    Feeds a recording back into a simulation one logic tick at a time.
+
+    A sim passed in must be a new GameSimulation(recording.seed), just like
+    the one the session started with. Level starts and retries go through the
+    reset_level and retry_level callables, so the renderer can pass its own
+    and reset its presentation too. Every tick whose events differ from the
+    recorded ones is counted in mismatches.
+    """
+
+    def __init__(self, recording, sim=None, reset_level=None, retry_level=None):
+        self.records = recording.records
+        self.sim = sim or GameSimulation(recording.seed)
+        self.reset_level = reset_level or self._reset_level
+        self.retry_level = retry_level or self._retry_level
+        self.level_start = None  # Snapshot taken by _reset_level()
+        self.index = 0
+        self.tick = 0
+        self.inputs = 0
+        self.mismatches = 0
+        self.finished = False
+
+    def _reset_level(self, level):
+        self.sim.reset_level(level)
+        self.level_start = self.sim.snapshot()
+
+    def _retry_level(self):
+        self.sim.restore(self.level_start)
+
+    def apply_records(self):
+        """Apply the input changes, level starts and retries due before the current tick"""
+        records = self.records
+        while self.index < len(records) and records[self.index][0] == self.tick:
+            _, value, kind = records[self.index]
+            if kind == RECORD_INPUT:
+                self.inputs = value
+            elif kind == RECORD_LEVEL:
+                self.reset_level(value)
+            elif kind == RECORD_RETRY:
+                self.retry_level()
+            elif kind == RECORD_END:
+                self.finished = True
+            else:
+                break  # The events of the tick about to run
+            self.index += 1
+        if self.index >= len(records):
+            self.finished = True  # Recordings cut off by a crash just stop
+
+    def step(self):
+        """Run the next recorded tick. Returns False once the recording is over."""
+        self.apply_records()
+        if self.finished:
+            return False
+
+        sim = self.sim
+        events_before = len(sim.events)
+        sim.step(self.inputs, LOGIC_DT)
+
+        # Compare the events raised with the recorded ones
+        records = self.records
+        expected = []
+        while self.index < len(records) and records[self.index][0] == self.tick and records[self.index][2] >= FIRST_EVENT_KIND:
+            expected.append(records[self.index][2])
+            self.index += 1
+        if expected != [EVENT_KINDS[event] for event in sim.events[events_before:]]:
+            self.mismatches += 1
+
+        self.tick += 1
+        return True
+
+
+def replay_headless(recording):
+    """Re-simulate a recording as fast as possible. Returns (ticks, mismatched ticks)."""
+    player = ReplayPlayer(recording)
+    events = player.sim.events
+    while player.step():
+        events.clear()
+    return player.tick, player.mismatches
+
+
+def main(paths):
+    if not paths:
+        print(f"usage: python replay.py RECORDING{RECORDING_EXTENSION} [...]")
+        return 2
+
+    total_ticks = 0
+    failed = 0
+    start = time.perf_counter()
+    for path in paths:
+        ticks, mismatches = replay_headless(load(path))
+        total_ticks += ticks
+        status = "ok" if not mismatches else f"{mismatches} tick(s) differ from the recording"
+        failed += bool(mismatches)
+        print(f"{path}: {ticks} ticks, {status}")
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(paths)} recording(s), {total_ticks} ticks in {elapsed:.2f}s "
+          f"({total_ticks / max(elapsed, 1e-9):,.0f} ticks/second)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
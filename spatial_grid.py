@@ -0,0 +1,74 @@
+"""
+Uniform grid spatial index for Cyberpunk Hacker Duel.
+
+Maze walls are bucketed into fixed-size cells so collision queries only look
+at the handful of walls near the query rectangle instead of every wall in the
+world. Query cost depends on how crowded the area around the query is, not on
+how many walls the level contains.
+"""
+import pygame
+
+
+class SpatialGrid:
+    """Buckets static rectangles by the grid cells they overlap"""
+
+    def __init__(self, cell_size=40, rects=()):
+        self.cell_size = cell_size
+        self.cells = {}  # (cell_x, cell_y) -> list of rects overlapping that cell
+        self.rects = []
+        for rect in rects:
+            self.insert(rect)
+
+    def __len__(self):
+        return len(self.rects)
+
+    def _cell_keys(self, rect):
+        """Yield the keys of every cell the rectangle overlaps"""
+        cell_size = self.cell_size
+        # Rect edges are exclusive, so the last covered pixel is right - 1
+        min_x = int(rect.left // cell_size)
+        max_x = int((rect.right - 1) // cell_size)
+        min_y = int(rect.top // cell_size)
+        max_y = int((rect.bottom - 1) // cell_size)
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                yield cell_x, cell_y
+
+    def insert(self, rect):
+        self.rects.append(rect)
+        cells = self.cells
+        for key in self._cell_keys(rect):
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [rect]
+            else:
+                bucket.append(rect)
+
+    def collides(self, rect):
+        """Return True if the rectangle overlaps any indexed rectangle"""
+        if not isinstance(rect, pygame.Rect):
+            rect = pygame.Rect(rect)
+        cells = self.cells
+        for key in self._cell_keys(rect):
+            bucket = cells.get(key)
+            if bucket and rect.collidelist(bucket) != -1:
+                return True
+        return False
+
+    def query(self, rect):
+        """Return the indexed rectangles overlapping the rectangle, without duplicates"""
+        if not isinstance(rect, pygame.Rect):
+            rect = pygame.Rect(rect)
+        cells = self.cells
+        found = []
+        seen = set()
+        for key in self._cell_keys(rect):
+            bucket = cells.get(key)
+            if not bucket:
+                continue
+            for index in rect.collidelistall(bucket):
+                hit = bucket[index]
+                if id(hit) not in seen:
+                    seen.add(id(hit))
+                    found.append(hit)
+        return found
@@ -0,0 +1,255 @@
+"""
+Parameter sweeps for balancing Cyberpunk Hacker Duel levels.
+
+Every combination of the given level settings is played by many scripted-bot
+games in BatchSimulation, spread over a process pool that keeps every core
+busy. For each combination the completion rate, time to reach the node and
+damage taken are written to CSV, or to Parquet if the output ends in .parquet
+(needs pyarrow).
+
+    python sweep.py --level 2 --firewall-speed 3 4 5 --scanner-speed 4 6
+    python sweep.py --level 3 --walls 15 20 25 --bot decoy --games 2048 -o walls.parquet
+
+Settings that aren't swept keep the level's defaults from reset_level(). All
+combinations play the same games - the same seeds for maze generation and
+bot decisions - so differences between rows come from the settings, and runs
+with the same --seed, --games and --workers give identical results.
+
+Games run at the game's own 120 Hz logic rate unless --tick-rate asks for
+fewer ticks per second of game time. Collisions are swept along each move, so
+nothing can pass through anything between ticks and a coarser rate plays by
+the same rules for a fraction of the work.
+"""
+import argparse
+import csv
+import itertools
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # Once per worker would be a lot
+
+import numpy as np
+
+from batch_simulation import BatchSimulation
+from game_simulation import (
+    LOGIC_HZ, LOGIC_DT, REFERENCE_FPS, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN, INPUT_DECOY, INPUT_DISABLE_WALLS
+)
+
+# Level settings that can be swept: option name -> BatchSimulation array, or
+# None for settings that shape level generation
+PARAMETERS = {
+    'firewall_width': 'firewall_width',
+    'firewall_height': 'firewall_height',
+    'firewall_speed': 'firewall_speed',
+    'firewall_vertical_speed': 'firewall_vertical_speed',
+    'scanner_radius': 'scanner_radius',
+    'scanner_speed': 'scanner_speed',
+    'decoy_max_cooldown': 'decoy_max_cooldown',
+    'decoy_max_duration': 'decoy_max_duration',
+    'walls': None,  # Walls per 800x600 of world (WallState.base_count)
+}
+
+# Games per task: configurations are split into chunks so that every worker
+# gets several tasks, but never chunks so small that vectorising stops paying off
+MAX_CHUNK_SIZE = 256
+MIN_CHUNK_SIZE = 32
+TASKS_PER_WORKER = 4
+
+MOVES = np.array((INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN,
+                  INPUT_RIGHT | INPUT_UP, INPUT_RIGHT | INPUT_DOWN,
+                  INPUT_LEFT | INPUT_UP, INPUT_LEFT | INPUT_DOWN))
+
+
+class RandomBot:
+    """Wanders like run_headless(): changes direction a few times a second and drops the odd decoy"""
+
+    def __init__(self, batch, rng, dt=LOGIC_DT):
+        self.rng = rng
+        self.inputs = np.full(batch.count, INPUT_RIGHT)
+        # Chances are per logic tick, so they're rolled for the ones each step covers
+        self.change_chance = 1 - (1 - 0.025) ** (dt / LOGIC_DT)
+        self.decoy_chance = 1 - (1 - 0.005) ** (dt / LOGIC_DT)
+
+    def __call__(self, batch):
+        rng = self.rng
+        change = rng.random(batch.count) < self.change_chance
+        self.inputs = np.where(change, MOVES[rng.integers(0, 6, batch.count)], self.inputs)
+        return self.inputs | np.where(rng.random(batch.count) < self.decoy_chance, INPUT_DECOY, 0)
+
+
+class GreedyBot:
+    """Heads straight for the node and takes a short random detour whenever a wall stops it"""
+
+    def __init__(self, batch, rng, dt=LOGIC_DT):
+        self.rng = rng
+        self.steps_per_tick = LOGIC_DT / dt  # Detours are 20-90 logic ticks long
+        self.frames = dt * REFERENCE_FPS
+        self.last_x = np.full(batch.count, np.nan)  # Positions at the previous call
+        self.last_y = np.full(batch.count, np.nan)
+        self.detour = np.zeros(batch.count, dtype=np.int64)  # Steps of detour left
+        self.detour_inputs = np.zeros(batch.count, dtype=np.int64)
+
+    def __call__(self, batch):
+        rng = self.rng
+        half = batch.player_size / 2
+        center_x = batch.player_x + half
+        center_y = batch.player_y + half
+        # Close enough to the node's line is within a step, or it would jitter across it
+        close = np.maximum(5, batch.player_speed * self.frames)
+        inputs = (np.where(center_x < batch.node_x - close, INPUT_RIGHT, 0) |
+                  np.where(center_x > batch.node_x + close, INPUT_LEFT, 0) |
+                  np.where(center_y < batch.node_y - close, INPUT_DOWN, 0) |
+                  np.where(center_y > batch.node_y + close, INPUT_UP, 0))
+
+        stuck = (batch.player_x == self.last_x) & (batch.player_y == self.last_y) & (self.detour <= 0)
+        detour = np.rint(rng.integers(20, 90, batch.count) * self.steps_per_tick).astype(np.int64)
+        self.detour = np.where(stuck, np.maximum(1, detour), self.detour - 1)
+        self.detour_inputs = np.where(stuck, MOVES[rng.integers(0, len(MOVES), batch.count)], self.detour_inputs)
+        self.last_x, self.last_y = batch.player_x, batch.player_y
+        return np.where(self.detour > 0, self.detour_inputs, inputs)
+
+
+class DecoyBot(GreedyBot):
+    """GreedyBot that drops a decoy when the firewall closes in and spends shards on walls when stuck"""
+
+    def __call__(self, batch):
+        inputs = GreedyBot.__call__(self, batch)
+        threatened = ((np.abs(batch.firewall_x - batch.player_x) < 200) &
+                      (np.abs(batch.firewall_y + batch.firewall_height / 2 - batch.player_y) < 300))
+        inputs = inputs | np.where(threatened & batch.decoy_can_use, INPUT_DECOY, 0)
+        return inputs | np.where((self.detour > 0) & (batch.score >= 5), INPUT_DISABLE_WALLS, 0)
+
+
+BOTS = {'random': RandomBot, 'greedy': GreedyBot, 'decoy': DecoyBot}
+
+
+def run_chunk(level, settings, bot_name, games, ticks, dt, seed):
+    """
+    Play games with the given settings and return the per-game results.
+    Runs in a worker process.
+    """
+    def configure(state):
+        if 'walls' in settings:
+            state.walls.base_count = settings['walls']
+
+    seeds = random.Random(seed)
+    batch = BatchSimulation.new(games, level, seeds.randrange(2 ** 32), configure)
+    for name, value in settings.items():
+        if PARAMETERS[name] is not None:
+            getattr(batch, PARAMETERS[name])[:] = value
+    bot = BOTS[bot_name](batch, np.random.default_rng(seeds.randrange(2 ** 32)), dt)
+
+    for _ in range(ticks):
+        batch.step(bot(batch), dt)
+        if batch.won.all():
+            break
+    return {
+        'won': batch.won,
+        'time_to_node': np.where(batch.won, batch.won_tick * dt, np.nan),
+        'damage_taken': batch.damage_taken,
+        'deaths': batch.deaths,
+        'wall_hits': batch.wall_hits,
+        'firewall_hits': batch.firewall_hits,
+        'scanner_hits': batch.scanner_hits,
+        'player_resets': batch.player_resets,
+        'decoys': batch.decoy_count,
+        'ticks': batch.ticks,
+    }
+
+
+def summarise(level, bot_name, settings, results):
+    """One output row from the per-game results of every chunk of a configuration"""
+    def joined(key):
+        return np.concatenate([result[key] for result in results])
+
+    won = joined('won')
+    time_to_node = joined('time_to_node')[won]
+    row = {'level': level, 'bot': bot_name, **settings, 'games': len(won),
+           'completion_rate': won.mean(),
+           'time_to_node_mean': time_to_node.mean() if len(time_to_node) else float('nan'),
+           'time_to_node_median': np.median(time_to_node) if len(time_to_node) else float('nan')}
+    for key in ('damage_taken', 'deaths', 'wall_hits', 'firewall_hits', 'scanner_hits', 'player_resets', 'decoys'):
+        row[f'{key}_mean'] = joined(key).mean()
+    return {name: value.item() if isinstance(value, np.generic) else value for name, value in row.items()}
+
+
+def require_pyarrow():
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        sys.exit("Writing Parquet needs pyarrow (pip install pyarrow), or write to a .csv file instead")
+    return pyarrow
+
+
+def write_rows(rows, path):
+    if path.endswith('.parquet'):
+        pyarrow = require_pyarrow()
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), path)
+        return
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--level', type=int, default=1)
+    for name in PARAMETERS:
+        parser.add_argument('--' + name.replace('_', '-'), dest=name, type=float, nargs='+', metavar='VALUE',
+                            help='values to sweep' + (' (walls per 800x600 of world)' if name == 'walls' else ''))
+    parser.add_argument('--bot', choices=BOTS, default='greedy', help='scripted player (default: greedy)')
+    parser.add_argument('--games', type=int, default=1024, help='games per configuration')
+    parser.add_argument('--seconds', type=float, default=120, help='game time before a game counts as failed')
+    parser.add_argument('--tick-rate', type=float, default=LOGIC_HZ, metavar='HZ',
+                        help=f'simulation ticks per second of game time (default: {LOGIC_HZ}); '
+                             f'lower runs faster, with coarser timing')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes (default: one per core)')
+    parser.add_argument('-o', '--output', default='sweep.csv', help='.csv or .parquet file')
+    args = parser.parse_args()
+    if args.output.endswith('.parquet'):
+        require_pyarrow()  # Fail now rather than after the sweep
+
+    swept = {name: getattr(args, name) for name in PARAMETERS if getattr(args, name)}
+    if 'walls' in swept:
+        swept['walls'] = [int(value) for value in swept['walls']]
+    configurations = [dict(zip(swept, values)) for values in itertools.product(*swept.values())]
+    ticks = int(args.seconds * args.tick_rate)
+    chunk_size = -(-args.games * len(configurations) // (args.workers * TASKS_PER_WORKER))
+    chunk_size = max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, chunk_size))
+    chunks = [min(chunk_size, args.games - start) for start in range(0, args.games, chunk_size)]
+    print(f"Level {args.level}, {len(configurations)} configuration(s) x {args.games} games, "
+          f"{args.bot} bot, {args.workers} worker(s)")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as pool:
+        # Chunk i of every configuration plays the same games
+        futures = [[pool.submit(run_chunk, args.level, settings, args.bot, games, ticks, 1 / args.tick_rate,
+                                f'{args.seed}:{i}')
+                    for i, games in enumerate(chunks)] for settings in configurations]
+        rows = []
+        game_ticks = 0
+        for settings, chunk_futures in zip(configurations, futures):
+            results = [future.result() for future in chunk_futures]
+            game_ticks += sum(result['ticks'] * len(result['won']) for result in results)
+            row = summarise(args.level, args.bot, settings, results)
+            rows.append(row)
+            described = ' '.join(f'{name}={value:g}' for name, value in settings.items()) or 'defaults'
+            median = row['time_to_node_median']
+            print(f"  {described}: {row['completion_rate']:.1%} reach the node"
+                  f"{'' if np.isnan(median) else f' (median {median:.1f}s)'}, "
+                  f"{row['damage_taken_mean']:.1f} damage")
+    elapsed = time.perf_counter() - start
+
+    write_rows(rows, args.output)
+    print(f"{len(rows)} row(s) written to {args.output} in {elapsed:.1f}s "
+          f"({game_ticks / max(elapsed, 1e-9):,.0f} game-ticks/second)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())